@@ -0,0 +1,40 @@
+# Helpers for calling the async pipeline from synchronous code.
+#
+# Sync wrappers (BankingAssistant.process_message, the CLI chat, tts_with_llm) run
+# their coroutines on one long-lived event loop in a background thread rather than
+# a fresh asyncio.run() per call, so pooled async HTTP clients stay bound to a single
+# loop and keep their connections alive between calls.
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="vyom-sync-bridge", daemon=True).start()
+        return _loop
+
+
+def run_sync(coroutine: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    Run `coroutine` to completion from synchronous code and return its result.
+
+    Safe to call from threads that have their own running loop, but not from a
+    coroutine running on the bridge loop itself (that would deadlock).
+    """
+    loop = _background_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coroutine.close()
+        raise RuntimeError("run_sync() called from the bridge event loop; await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coroutine, loop).result(timeout)
@@ -8,6 +8,7 @@ import asyncio
 from contextlib import asynccontextmanager
 import json
 import uvicorn
+from session_store import SessionStore, StateSync, get_session_store
 
 
 # ----- Models for request/response data -----
@@ -102,16 +103,22 @@ class ConnectionManager:
 class AuthenticationState:
     """Manages authentication state for voice assistant sessions"""
     
-    def __init__(self):
+    def __init__(self, backend: Optional[SessionStore] = None):
         self.state: Dict[str, Dict] = {}
         self.pending_challenges: Dict[str, PendingAuthRequest] = {}
         
+        # Persist sessions and challenges so every worker sees them (callbacks stay local)
+        self.backend = backend
+        self._sync = StateSync(backend, "edge_auth", self.state) if backend is not None else None
+        
         # For event callbacks
         self.auth_success_callbacks: Dict[str, List[Any]] = {}
         self.auth_failure_callbacks: Dict[str, List[Any]] = {}
     
     def get_state(self, session_id: str) -> Dict:
         """Get or initialize authentication state for a session"""
+        if self._sync is not None:
+            self._sync.refresh(session_id)
         if session_id not in self.state:
             self.state[session_id] = {
                 'authenticated': False,
@@ -136,6 +143,12 @@ class AuthenticationState:
                 'failed_attempts': 0,
                 'voice_chat_paused_at': None
             }
+            self._save(session_id)
+    
+    def _save(self, session_id: str) -> None:
+        """Write a changed session to the session store"""
+        if self._sync is not None:
+            self._sync.save(session_id)
     
     def mark_authenticated(self, session_id: str, auth_method: str, 
                           expiry_seconds: int = 300) -> None:
@@ -147,6 +160,7 @@ class AuthenticationState:
         state['auth_expiry'] = time.time() + expiry_seconds
         state['failed_attempts'] = 0
         state['voice_chat_paused_at'] = None
+        self._save(session_id)
         
         # Trigger success callbacks
         self._trigger_auth_success_callbacks(session_id)
@@ -164,6 +178,7 @@ class AuthenticationState:
             state['auth_timestamp'] = None
             state['auth_method'] = None
             state['auth_expiry'] = None
+            self._save(session_id)
             return False
             
         return True
@@ -172,18 +187,21 @@ class AuthenticationState:
         """Store a pending intent to be processed after successful auth"""
         state = self.get_state(session_id)
         state['pending_intent'] = intent_type
+        self._save(session_id)
     
     def get_pending_intent(self, session_id: str) -> Optional[str]:
         """Get and clear any pending intent"""
         state = self.get_state(session_id)
         pending = state.get('pending_intent')
         state['pending_intent'] = None
+        self._save(session_id)
         return pending
     
     def record_failed_attempt(self, session_id: str) -> int:
         """Record a failed authentication attempt and return total count"""
         state = self.get_state(session_id)
         state['failed_attempts'] += 1
+        self._save(session_id)
         
         # Trigger failure callbacks if too many attempts
         if state['failed_attempts'] >= 3:
@@ -195,6 +213,7 @@ class AuthenticationState:
         """Mark voice chat as paused for authentication"""
         state = self.get_state(session_id)
         state['voice_chat_paused_at'] = time.time()
+        self._save(session_id)
     
     def get_voice_chat_pause_time(self, session_id: str) -> Optional[float]:
         """Get the timestamp when voice chat was paused for this session"""
@@ -204,10 +223,18 @@ class AuthenticationState:
     def store_challenge(self, challenge: PendingAuthRequest) -> None:
         """Store a pending auth challenge"""
         self.pending_challenges[challenge.challenge_id] = challenge
+        if self.backend is not None:
+            self.backend.save("auth_challenge", challenge.challenge_id, challenge.model_dump())
     
     def get_challenge(self, challenge_id: str) -> Optional[PendingAuthRequest]:
         """Get a pending auth challenge"""
-        return self.pending_challenges.get(challenge_id)
+        challenge = self.pending_challenges.get(challenge_id)
+        if challenge is None and self.backend is not None:
+            # Issued by another worker
+            stored = self.backend.load("auth_challenge", challenge_id)
+            if stored is not None:
+                challenge = self.pending_challenges[challenge_id] = PendingAuthRequest(**stored)
+        return challenge
     
     def register_auth_success_callback(self, session_id: str, callback) -> None:
         """Register a callback for successful authentication"""
@@ -373,7 +400,7 @@ app = FastAPI(title="banking_auth")
 
 # Initialize state and managers
 connection_manager = ConnectionManager()
-auth_state = AuthenticationState()
+auth_state = AuthenticationState(get_session_store())
 edge_authenticator = EdgeAuthenticator(auth_state, connection_manager)
 
 # Create router
@@ -0,0 +1,132 @@
+import argparse
+import sqlite3
+import time
+from typing import Any, Iterable, Iterator, Optional, Union
+import numpy as np
+import pandas as pd
+from config import settings
+from model_registry import model_registry
+from predict_priority import FEATURE_COLUMNS, load_priority_model
+
+# Column written next to the input rows by the CLI
+SCORE_COLUMN = "Predicted Priority Score"
+
+def _load_model(model: Any = None) -> Any:
+    return model if model is not None else model_registry.get(settings.PRIORITY_MODEL_PATH, loader=load_priority_model)
+
+def _predict_matrix(features: np.ndarray, model: Any = None) -> np.ndarray:
+    """Run one vectorized predict over a (rows, 4) feature matrix and round every score up."""
+    loaded_model = _load_model(model)
+    started = time.perf_counter()
+    predicted = np.asarray(loaded_model.predict(features))
+    if model is None:
+        model_registry.record_latency(settings.PRIORITY_MODEL_PATH, time.perf_counter() - started)
+    return np.ceil(predicted).astype(np.int64)
+
+def predict_priority_scores(bank_balance, age, bank_joining_year, asset_value, model: Any = None) -> np.ndarray:
+    """
+    Predict priority scores for many customers at once from columnar inputs.
+
+    Parameters:
+        bank_balance (array-like): Bank balances in ₹
+        age (array-like): Ages of the customers
+        bank_joining_year (array-like): Years when the customers joined the bank
+        asset_value (array-like): Asset values in ₹
+        model (optional): Model to use instead of the cached priority model
+
+    Returns:
+        np.ndarray: Predicted Priority Scores (rounded up) as int64, one per customer
+    """
+    columns = [np.asarray(column, dtype=np.float32).ravel()
+               for column in (bank_balance, age, bank_joining_year, asset_value)]
+    lengths = {len(column) for column in columns}
+    if len(lengths) != 1:
+        raise ValueError(f"All feature arrays must have the same length, got lengths {sorted(lengths)}.")
+    if not columns[0].size:
+        return np.empty(0, dtype=np.int64)
+    return _predict_matrix(np.column_stack(columns), model)
+
+def predict_priority_frame(df: pd.DataFrame, model: Any = None) -> np.ndarray:
+    """
+    Predict priority scores for every row of a DataFrame holding the model's feature columns.
+    Extra columns (ids, the training target, ...) are ignored.
+    """
+    missing = [column for column in FEATURE_COLUMNS if column not in df.columns]
+    if missing:
+        raise KeyError(f"Input is missing feature columns: {missing}")
+    if df.empty:
+        return np.empty(0, dtype=np.int64)
+    return _predict_matrix(df[FEATURE_COLUMNS].to_numpy(dtype=np.float32), model)
+
+def predict_priority_chunks(chunks: Iterable[Union[pd.DataFrame, np.ndarray]], model: Any = None) -> Iterator[np.ndarray]:
+    """
+    Lazily score an iterator of row chunks, yielding one array of scores per chunk.
+
+    Each chunk is either a DataFrame with the feature columns or a (rows, 4) array whose
+    columns follow FEATURE_COLUMNS. The model is resolved once for the whole stream.
+    """
+    loaded_model = _load_model(model)
+    for chunk in chunks:
+        if isinstance(chunk, pd.DataFrame):
+            yield predict_priority_frame(chunk, loaded_model)
+        else:
+            chunk = np.asarray(chunk, dtype=np.float32)
+            if chunk.ndim != 2 or chunk.shape[1] != len(FEATURE_COLUMNS):
+                raise ValueError(f"Array chunks must have shape (rows, {len(FEATURE_COLUMNS)}), got {chunk.shape}.")
+            yield _predict_matrix(chunk, loaded_model) if len(chunk) else np.empty(0, dtype=np.int64)
+
+def score_csv(input_path: str, output_path: str, chunksize: int = 100_000, model: Any = None) -> int:
+    """
+    Stream a CSV through the model in fixed-size chunks and write it back with a score column.
+    Memory use is bounded by `chunksize` regardless of the file size.
+
+    Returns:
+        int: Number of rows scored
+    """
+    reader = pd.read_csv(input_path, chunksize=chunksize)
+    return _write_scored_chunks(reader, output_path, model)
+
+def score_sql(connection, query: str, output_path: str, chunksize: int = 100_000, model: Any = None) -> int:
+    """
+    Stream the rows returned by `query` through the model in fixed-size chunks.
+    The query must return the model's feature columns (alias them with AS if needed).
+
+    Returns:
+        int: Number of rows scored
+    """
+    reader = pd.read_sql_query(query, connection, chunksize=chunksize)
+    return _write_scored_chunks(reader, output_path, model)
+
+def _write_scored_chunks(reader: Iterable[pd.DataFrame], output_path: str, model: Any = None) -> int:
+    loaded_model = _load_model(model)
+    total_rows = 0
+    for index, chunk in enumerate(reader):
+        chunk[SCORE_COLUMN] = predict_priority_frame(chunk, loaded_model)
+        chunk.to_csv(output_path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+        total_rows += len(chunk)
+    return total_rows
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Rescore customers with the priority model in fixed-size chunks.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="CSV file with the priority feature columns")
+    source.add_argument("--sql", help="SQL query returning the priority feature columns (requires --db)")
+    parser.add_argument("--db", help="SQLite database file to run --sql against")
+    parser.add_argument("--output", required=True, help="Where to write the scored CSV")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="Rows scored per vectorized predict")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.csv:
+        rows = score_csv(args.csv, args.output, args.chunksize)
+    else:
+        if not args.db:
+            parser.error("--sql requires --db")
+        with sqlite3.connect(args.db) as connection:
+            rows = score_sql(connection, args.sql, args.output, args.chunksize)
+    elapsed = time.perf_counter() - started
+
+    print(f"Scored {rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s) -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# Bulk ticket submission for service requests imported by branch staff.
+#
+# Staff used to raise imported requests (e.g. everything that came in during an outage)
+# by calling generate_ticket in a loop: one LLM classification and one blocking HTTP call
+# at a time. aprocess_batch classifies all queries concurrently (bounded, through the
+# shared classification cache), drops repeats of the same (user, service) within a time
+# window, and hands the rest to TicketClient.submit_many in batches, which writes each
+# batch to the outbox in one transaction and sends it over the pooled connections.
+# Every input item gets its own result. Queries of tickets the ticket system confirmed
+# are learned by the agent's local service classifier, if it has one.
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from config import settings
+from result_cache import result_cache
+from ticket_client import TicketClient, get_ticket_client, is_confirmed
+
+# The service alone does not identify these requests, so they are never merged
+NON_DEDUPLICATED_SERVICES = {"general_banking_support"}
+
+
+class TicketDeduplicator:
+    """
+    Remembers the ticket raised for each (user, service) for `window_seconds`.
+
+    Parameters:
+        window_seconds (float): How long a repeat of the same request maps to the earlier ticket
+    """
+
+    def __init__(self, window_seconds: Optional[float] = None):
+        self.window_seconds = window_seconds or settings.TICKET_DEDUP_WINDOW_SECONDS
+        self._recent: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, username: str, service: str) -> Optional[str]:
+        """Ticket id raised for this user and service within the window, or None."""
+        if service in NON_DEDUPLICATED_SERVICES:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._recent.get((username, service))
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._recent[(username, service)]
+                return None
+            return entry[0]
+
+    def record(self, username: str, service: str, ticket_id: str) -> None:
+        if service in NON_DEDUPLICATED_SERVICES:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._recent[(username, service)] = (ticket_id, now + self.window_seconds)
+            # Drop expired entries now and then so the map stays small
+            if len(self._recent) > 10_000:
+                self._recent = {key: entry for key, entry in self._recent.items() if entry[1] > now}
+
+
+async def aclassify_many(service_agent, queries: List[str], concurrency: Optional[int] = None) -> List[Any]:
+    """
+    Classify `queries` with `service_agent.aget_service`, at most `concurrency` at a time.
+
+    Returns:
+        list: The service per query, or the exception its classification raised
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.BATCH_CLASSIFY_CONCURRENCY)
+
+    async def classify(query: str) -> str:
+        async with semaphore:
+            return await service_agent.aget_service(query)
+
+    return await asyncio.gather(*(classify(query) for query in queries), return_exceptions=True)
+
+
+def _status(ticket) -> Tuple[str, str]:
+    # (ticket id, status) from a TicketClient result
+    if ticket == "N/A":
+        return "N/A", "rejected"
+    return ticket[0], "created" if is_confirmed(ticket) else "queued"
+
+
+async def aprocess_batch(requests: List[Dict[str, str]], service_agent, ticket_client: Optional[TicketClient] = None,
+                         deduplicator: Optional[TicketDeduplicator] = None, concurrency: Optional[int] = None,
+                         batch_size: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Classify and raise tickets for many service requests.
+
+    Parameters:
+        requests (list): Dicts with "username" and "query"
+        service_agent (BankingServiceAgent): Classifies each query
+        ticket_client (TicketClient): Defaults to the shared client
+        deduplicator (TicketDeduplicator): Defaults to the shared one
+        concurrency (int): Classifications in flight (BATCH_CLASSIFY_CONCURRENCY)
+        batch_size (int): Tickets per submission batch (TICKET_BATCH_SIZE)
+
+    Returns:
+        list: Per request, in order: username, query, service, ticket_id and status, one of
+              "created", "queued" (in the outbox), "duplicate" (ticket_id is the earlier
+              ticket), "rejected" or "error" (with an "error" message)
+    """
+    ticket_client = ticket_client or get_ticket_client()
+    deduplicator = deduplicator or ticket_deduplicator
+    batch_size = batch_size or settings.TICKET_BATCH_SIZE
+
+    services = await aclassify_many(service_agent, [item.get("query", "") for item in requests], concurrency)
+    results: List[Dict[str, Any]] = []
+    to_submit: List[int] = []
+    # (user, service) -> index of the first request in this batch that raises it
+    first_in_batch: Dict[Tuple[str, str], int] = {}
+    for index, (item, service) in enumerate(zip(requests, services)):
+        username, query = item.get("username", "unknown_user"), item.get("query", "")
+        result = {"username": username, "query": query, "service": None, "ticket_id": None, "status": None}
+        results.append(result)
+        if isinstance(service, BaseException):
+            result.update(status="error", error=str(service))
+            continue
+        result["service"] = service
+        earlier = deduplicator.lookup(username, service)
+        if earlier is not None:
+            result.update(ticket_id=earlier, status="duplicate")
+        elif (username, service) in first_in_batch and service not in NON_DEDUPLICATED_SERVICES:
+            result.update(status="duplicate", duplicate_of=first_in_batch[(username, service)])
+        else:
+            first_in_batch[(username, service)] = index
+            to_submit.append(index)
+
+    for start in range(0, len(to_submit), batch_size):
+        chunk = to_submit[start:start + batch_size]
+        tickets = await ticket_client.submit_many(
+            [(results[i]["username"], results[i]["query"], results[i]["service"]) for i in chunk],
+            budget=settings.TICKET_BATCH_BUDGET_SECONDS)
+        for index, ticket in zip(chunk, tickets):
+            ticket_id, status = _status(ticket)
+            results[index].update(ticket_id=ticket_id, status=status)
+            if status != "rejected":
+                deduplicator.record(results[index]["username"], results[index]["service"], ticket_id)
+                result_cache.invalidate(results[index]["username"])
+            if status == "created" and getattr(service_agent, "local_classifier", None) is not None:
+                service_agent.local_classifier.learn(results[index]["query"], results[index]["service"])
+
+    # In-batch duplicates point at the ticket of their first occurrence
+    for result in results:
+        original = result.pop("duplicate_of", None)
+        if original is not None:
+            result["ticket_id"] = results[original]["ticket_id"]
+            if results[original]["status"] == "rejected":
+                result["status"] = "rejected"
+    return results
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Count of results per status."""
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return counts
+
+
+# Shared across batches so a re-import within the window is recognised
+ticket_deduplicator = TicketDeduplicator()
@@ -0,0 +1,81 @@
+# Load test for BankingAssistant: concurrent sessions through the blocking and the
+# async pipeline, all on one event loop as in the FastAPI handlers.
+#
+# Uses stub_llm_server with a simulated model latency. Blocking process_message calls
+# made from a coroutine stall the loop, so sessions run one after another; awaiting
+# aprocess_message lets them overlap.
+
+import argparse
+import asyncio
+import os
+import statistics
+import threading
+import time
+import uuid
+
+parser = argparse.ArgumentParser(description="Load test the sync vs async assistant pipeline.")
+parser.add_argument("--sessions", type=int, default=50)
+parser.add_argument("--llm-delay-ms", type=float, default=200)
+parser.add_argument("--port", type=int, default=8102)
+args = parser.parse_args()
+
+# The stub and the shared LLM pool read these at import time
+os.environ["STUB_LLM_DELAY_MS"] = str(args.llm_delay_ms)
+os.environ["STUB_LLM_REPLY"] = "general"
+os.environ["GROQ_API_BASE"] = f"http://127.0.0.1:{args.port}"
+os.environ.setdefault("GROQ_API_KEY", "stub")
+
+import uvicorn
+from llm_with_intent import BankingAssistant
+from stub_llm_server import app
+
+
+def _start_stub_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def _utterance() -> str:
+    # Distinct text per session so the classification cache does not short-circuit the LLM
+    return "tell me about " + " ".join(uuid.uuid4().hex[i:i + 4] for i in range(0, 16, 4))
+
+
+async def _run(assistant: BankingAssistant, use_async: bool, sessions: int):
+    latencies = []
+
+    async def session(i):
+        started = time.perf_counter()
+        if use_async:
+            await assistant.aprocess_message(f"load-{i}", _utterance())
+        else:
+            # What an async handler calling the blocking API does: it holds the loop
+            assistant.process_message(f"load-{i}", _utterance())
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    server = _start_stub_server(args.port)
+    assistant = BankingAssistant(os.environ["GROQ_API_KEY"])
+    # Warm up connections on both paths
+    assistant.process_message("warmup", _utterance())
+    asyncio.run(assistant.aprocess_message("warmup", _utterance()))
+
+    print(f"{args.sessions} concurrent sessions, 2 LLM calls each, {args.llm_delay_ms:.0f} ms per LLM call:")
+    for name, use_async in (("process_message (blocking)", False), ("aprocess_message (async)", True)):
+        elapsed, latencies = asyncio.run(_run(assistant, use_async, args.sessions))
+        latencies.sort()
+        print(f"  {name:<27} wall {elapsed:6.2f} s   {args.sessions / elapsed:7.1f} sessions/s   "
+              f"p50 {statistics.median(latencies) * 1e3:7.0f} ms   p95 {latencies[int(len(latencies) * 0.95) - 1] * 1e3:7.0f} ms")
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Bulk ticket throughput: serial generate_ticket loop vs aprocess_batch.
+#
+# Runs stub_llm_server (service classification after a simulated model latency) and a
+# stub ticket system that answers each ticket after a fixed delay. The serial baseline
+# classifies and raises one request at a time, as the staff import loop did; the batch
+# path classifies with bounded concurrency and submits deduplicated tickets in batches.
+# A share of the requests repeat an earlier (user, service) and are deduplicated.
+
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+parser = argparse.ArgumentParser(description="Compare serial and batched ticket submission.")
+parser.add_argument("--requests", type=int, default=200)
+parser.add_argument("--llm-delay-ms", type=float, default=200)
+parser.add_argument("--ticket-delay-ms", type=float, default=50)
+parser.add_argument("--duplicate-share", type=float, default=0.1)
+parser.add_argument("--llm-port", type=int, default=8104)
+parser.add_argument("--ticket-port", type=int, default=8105)
+args = parser.parse_args()
+
+# Read at import time by the stub, the LLM pool and the ticket client
+os.environ["STUB_LLM_DELAY_MS"] = str(args.llm_delay_ms)
+os.environ["STUB_LLM_REPLY"] = "debit_card_replacement"
+os.environ["GROQ_API_BASE"] = f"http://127.0.0.1:{args.llm_port}"
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ["TICKET_API_URL"] = f"http://127.0.0.1:{args.ticket_port}/query/process"
+os.environ["TICKET_OUTBOX_PATH"] = os.path.join(tempfile.mkdtemp(), "ticket_outbox.db")
+
+import uvicorn
+from fastapi import FastAPI, Request
+import stub_llm_server
+from batch_ticketing import TicketDeduplicator, aprocess_batch, summarize
+from llm_client import get_llm_pool
+from service_retrieval_agent import BankingServiceAgent
+from ticket_client import get_ticket_client
+
+ticket_app = FastAPI()
+_ticket_count = 0
+
+
+@ticket_app.post("/query/process")
+async def stub_ticket(request: Request):
+    global _ticket_count
+    await request.json()
+    await asyncio.sleep(args.ticket_delay_ms / 1000)
+    _ticket_count += 1
+    return {"query_id": f"T{_ticket_count}"}
+
+
+def _start_server(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def _requests(count: int):
+    # Distinct users and wording (so the classification cache does not answer), with a share
+    # of repeats of an earlier user's request
+    items = []
+    for i in range(count):
+        if items and i % max(1, round(1 / args.duplicate_share)) == 0:
+            items.append({"username": items[-1]["username"], "query": f"lost my card again {uuid.uuid4().hex[:6]}"})
+        else:
+            items.append({"username": f"user-{i}", "query": f"I lost my debit card {uuid.uuid4().hex[:6]}"})
+    return items
+
+
+async def _serial(service_agent, items):
+    client = get_ticket_client()
+    for item in items:
+        service = await service_agent.aget_service(item["query"])
+        await client.submit(item["username"], item["query"], service, budget=60)
+
+
+async def main():
+    _start_server(stub_llm_server.app, args.llm_port)
+    _start_server(ticket_app, args.ticket_port)
+    service_agent = BankingServiceAgent(get_llm_pool())
+
+    print(f"{args.requests} requests, {args.llm_delay_ms:.0f} ms per LLM call, "
+          f"{args.ticket_delay_ms:.0f} ms per ticket:")
+    started = time.perf_counter()
+    await _serial(service_agent, _requests(args.requests))
+    serial = time.perf_counter() - started
+    print(f"  serial loop     {serial:7.2f} s   {args.requests / serial:7.1f} requests/s")
+
+    started = time.perf_counter()
+    results = await aprocess_batch(_requests(args.requests), service_agent, deduplicator=TicketDeduplicator())
+    batched = time.perf_counter() - started
+    print(f"  aprocess_batch  {batched:7.2f} s   {args.requests / batched:7.1f} requests/s   "
+          f"({serial / batched:.1f}x)  {summarize(results)}")
+    print("  ticket client:", get_ticket_client().status())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
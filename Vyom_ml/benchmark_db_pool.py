@@ -0,0 +1,72 @@
+# Per-query connection setup vs the pooled connections used by query_postgresql.
+#
+# Runs the same query N times opening a fresh connection each time (the old behaviour)
+# and through ConnectionPool / AsyncConnectionPool. Defaults to the bundled
+# banking_system.db; pass a Postgres URL with --url to include network and TLS setup.
+
+import argparse
+import asyncio
+import statistics
+import time
+import psycopg
+from db_pool import ConnectionPool, connect_sqlite, get_async_db_pool, is_sqlite_url
+
+
+def _connect_per_query(url: str, query: str):
+    if is_sqlite_url(url):
+        conn = connect_sqlite(url)
+    else:
+        conn = psycopg.connect(url)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query)
+        return cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def _report(name: str, latencies):
+    latencies = sorted(latencies)
+    print(f"  {name:<26} mean {statistics.mean(latencies) * 1e3:8.3f} ms   "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1e3:8.3f} ms")
+
+
+def _measure(fn, queries: int):
+    latencies = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def _measure_async(url: str, query: str, queries: int):
+    pool = get_async_db_pool(url)
+    await pool.execute(query)  # warm up
+    latencies = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        await pool.execute(query)
+        latencies.append(time.perf_counter() - started)
+    await pool.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-query connections vs the connection pool.")
+    parser.add_argument("--url", default="sqlite:///banking_system.db")
+    parser.add_argument("--query", default="SELECT user_id, bank_balance FROM users")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    pool = ConnectionPool(args.url).open()
+    print(f"{args.queries} x {args.query!r} on {args.url.split('@')[-1]}:")
+    _report("connection per query", _measure(lambda: _connect_per_query(args.url, args.query), args.queries))
+    _report("ConnectionPool", _measure(lambda: pool.execute(args.query), args.queries))
+    _report("AsyncConnectionPool", asyncio.run(_measure_async(args.url, args.query, args.queries)))
+    print("  pool:", pool.status())
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Measures the per-request LLM setup overhead removed by the shared client pool.
+#
+# Starts stub_llm_server in-process, then sends the same prompt N times the old way
+# (new ChatPromptTemplate + ChatGroq per request) and through LLMClientPool, both
+# sequentially and from concurrent threads.
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import uvicorn
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_groq import ChatGroq
+from llm_client import LLMClientPool
+from stub_llm_server import app
+
+PROMPT_MESSAGES = [("system", "Classify the banking request into one category."), ("human", "{question}")]
+
+
+def _start_stub_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def _per_request_setup(base_url: str):
+    # What handle_service_request / get_query_from_llm used to do on every call
+    prompt = ChatPromptTemplate.from_messages(PROMPT_MESSAGES)
+    llm = ChatGroq(api_key="stub", model="llama-3.1-8b-instant", groq_api_base=base_url)
+    return (prompt | llm).invoke({"question": "what is my balance"})
+
+
+def _measure(fn, requests: int, concurrency: int):
+    latencies = []
+
+    def timed(_):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    if concurrency == 1:
+        for i in range(requests):
+            timed(i)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(timed, range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return statistics.mean(latencies), latencies[int(len(latencies) * 0.95) - 1], requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request ChatGroq setup vs the shared LLM pool.")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8100)
+    args = parser.parse_args()
+
+    server = _start_stub_server(args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    pool = LLMClientPool(api_key="stub", base_url=base_url)
+    pooled_chain = pool.chain("benchmark", ChatPromptTemplate.from_messages(PROMPT_MESSAGES))
+
+    cases = [
+        ("per-request ChatGroq", lambda: _per_request_setup(base_url)),
+        ("shared LLM pool", lambda: pooled_chain.invoke({"question": "what is my balance"})),
+    ]
+    # Warm up imports and the stub server
+    for _, fn in cases:
+        fn()
+
+    for concurrency in sorted({1, args.concurrency}):
+        print(f"{args.requests} requests, concurrency {concurrency}:")
+        for name, fn in cases:
+            mean, p95, throughput = _measure(fn, args.requests, concurrency)
+            print(f"  {name:<22} mean {mean * 1e3:7.2f} ms   p95 {p95 * 1e3:7.2f} ms   {throughput:8.1f} req/s")
+
+    pool.close()
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
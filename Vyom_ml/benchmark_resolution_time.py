@@ -0,0 +1,51 @@
+# Compares the learned resolution-time model with the static formula in
+# service_time_prediction.py: accuracy on the held-out split and batch/single latency.
+
+import argparse
+import time
+from sklearn.metrics import mean_absolute_error, r2_score
+from resolution_time_model import DATASET_PATH, TARGET_COLUMN, ResolutionTimeModel, train_resolution_time_model
+from model_artifact import load_model_artifact
+from service_time_prediction import resolution_time_estimator
+
+def _formula(df):
+    return resolution_time_estimator.predict(df["Priority Score"].to_numpy(), df["Department"].to_numpy(),
+                                             df["Sub-Department"].to_numpy(), df["Service Level"].to_numpy())
+
+def _best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark learned vs formula resolution-time estimates.")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--artifact", default="resolution_time_benchmark.vyom",
+                        help="Where to write the model trained for this benchmark")
+    parser.add_argument("--batch-rows", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    trained = train_resolution_time_model(args.dataset, args.artifact)
+    model = ResolutionTimeModel(load_model_artifact(args.artifact))
+    test_df = trained["test_df"]
+    y_test = test_df[TARGET_COLUMN].to_numpy()
+
+    print(f"Accuracy on {len(test_df)} held-out tickets:")
+    for name, predicted in (("formula", _formula(test_df)), ("learned model", model.predict(test_df))):
+        print(f"  {name:<14} MAE {mean_absolute_error(y_test, predicted):7.2f} min   "
+              f"R^2 {r2_score(y_test, predicted):6.3f}")
+
+    batch = test_df.sample(args.batch_rows, replace=True, random_state=0).reset_index(drop=True)
+    single = test_df.iloc[:1]
+    print("Latency (best of {}):".format(args.repeats))
+    print(f"  formula        single {_best_of(lambda: _formula(single), args.repeats * 20) * 1e3:8.3f} ms   "
+          f"{args.batch_rows:,} rows {_best_of(lambda: _formula(batch), args.repeats) * 1e3:9.1f} ms")
+    print(f"  learned model  single {_best_of(lambda: model.predict(single), args.repeats * 20) * 1e3:8.3f} ms   "
+          f"{args.batch_rows:,} rows {_best_of(lambda: model.predict(batch), args.repeats) * 1e3:9.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Turn latency of BankingAssistant with and without speculative handler execution.
+#
+# Uses stub_llm_server with a simulated model latency; the intent prompt is answered with
+# the scenario's intent and the SQL prompt with a fixed query. Sequentially a database turn
+# costs intent + SQL generation + reply; speculatively SQL generation overlaps the intent
+# call. Database sessions are pre-authenticated, and DATABASE_URL points at a closed local
+# port so query execution fails fast instead of adding network time.
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+import uuid
+
+parser = argparse.ArgumentParser(description="Compare sequential and speculative assistant turns.")
+parser.add_argument("--turns", type=int, default=40)
+parser.add_argument("--llm-delay-ms", type=float, default=200)
+parser.add_argument("--port", type=int, default=8103)
+args = parser.parse_args()
+
+# The stub, the shared LLM pool and the database helper read these at import time
+os.environ["STUB_LLM_DELAY_MS"] = str(args.llm_delay_ms)
+os.environ["GROQ_API_BASE"] = f"http://127.0.0.1:{args.port}"
+os.environ["DATABASE_URL"] = "postgresql://bench@127.0.0.1:9/bench?connect_timeout=1"
+os.environ.setdefault("GROQ_API_KEY", "stub")
+
+import uvicorn
+import stub_llm_server
+from llm_with_intent import BankingAssistant
+
+SCENARIOS = ["dbquery", "page_routing", "general"]
+
+
+def _start_stub_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(stub_llm_server.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def _utterance() -> str:
+    # Distinct text per turn so the classification cache does not short-circuit the LLM
+    return "show me " + " ".join(uuid.uuid4().hex[i:i + 4] for i in range(0, 16, 4))
+
+
+async def _run(assistant: BankingAssistant, intent: str, turns: int):
+    stub_llm_server.STUB_RULES.update({"intent classifier": intent, "PostgreSQL": "SELECT 1"})
+    for i in range(turns):
+        session_id = f"{intent}-{i}"
+        assistant.auth_state.get_state(session_id)["authenticated"] = True
+        await assistant.aprocess_message(session_id, _utterance())
+
+
+def main():
+    server = _start_stub_server(args.port)
+    assistants = {
+        "sequential": BankingAssistant(os.environ["GROQ_API_KEY"], speculative=False),
+        "speculative": BankingAssistant(os.environ["GROQ_API_KEY"], speculative=True),
+    }
+    for assistant in assistants.values():
+        # Measure the LLM path only; a trained fast-path model would answer some turns locally
+        assistant.intent_recognizer.fast_path = None
+
+    print(f"{args.turns} turns per intent, {args.llm_delay_ms:.0f} ms per LLM call:")
+    for intent in SCENARIOS:
+        for mode, assistant in assistants.items():
+            asyncio.run(_run(assistant, intent, 2))  # warm up connections
+            assistant.turn_latency.clear()
+            asyncio.run(_run(assistant, intent, args.turns))
+            latency = assistant.turn_latency.summary(mode)
+            print(f"  {intent:<13} {mode:<12} p50 {latency['p50_ms']:7.0f} ms   p95 {latency['p95_ms']:7.0f} ms")
+    print("Speculation:", assistants["speculative"].speculation_stats)
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# Compares the NumPy tree engine against XGBoost for the priority model:
+# checks the predictions are bit-for-bit identical, then times single-row and bulk scoring.
+
+import argparse
+import pickle
+import time
+import numpy as np
+import pandas as pd
+from dataset_cache import load_dataset
+from predict_priority import FEATURE_COLUMNS
+from tree_ensemble import export_xgboost_trees
+
+def _time_call(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings))
+
+def _synthetic_rows(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(0, 2_000_000, n_rows),       # Bank Balance (₹)
+        rng.integers(18, 90, n_rows),            # Age
+        rng.integers(1980, 2026, n_rows),        # Bank Joining Year
+        rng.uniform(0, 60_000_000, n_rows),      # Asset Value (₹)
+    ]).astype(np.float32)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NumPy tree inference against XGBoost.")
+    parser.add_argument("--model", default="vyom_ml/xgboost_priority_model.pkl")
+    parser.add_argument("--dataset", default="vyom_ml/data/bank_customer_priority_dataset.csv")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as file:
+        xgb_model = pickle.load(file)
+    ensemble = export_xgboost_trees(xgb_model)
+    print(f"Exported {ensemble.n_trees} trees, {len(ensemble.value)} nodes, depth {ensemble.max_depth}")
+
+    # Correctness: the dataset plus synthetic rows with some missing values
+    dataset = load_dataset(args.dataset, FEATURE_COLUMNS).to_numpy(dtype=np.float32)
+    bulk = _synthetic_rows(args.rows)
+    bulk[::101, 1] = np.nan
+    for name, X in (("dataset", dataset), ("synthetic", bulk)):
+        expected = xgb_model.predict(X)
+        actual = ensemble.predict(X)
+        mismatches = int(np.count_nonzero(expected.view(np.uint32) != actual.view(np.uint32)))
+        print(f"{name}: {len(X)} rows, {mismatches} bitwise mismatches")
+        if mismatches:
+            raise SystemExit("NumPy engine diverged from XGBoost")
+
+    # Latency
+    single = dataset[:1]
+    single_frame = pd.DataFrame(single, columns=FEATURE_COLUMNS)
+    results = [
+        ("single row  | xgboost (DataFrame)", _time_call(lambda: xgb_model.predict(single_frame), args.repeats * 20)),
+        ("single row  | xgboost (ndarray)", _time_call(lambda: xgb_model.predict(single), args.repeats * 20)),
+        ("single row  | numpy engine", _time_call(lambda: ensemble.predict(single), args.repeats * 20)),
+        (f"{args.rows:,} rows | xgboost", _time_call(lambda: xgb_model.predict(bulk), args.repeats)),
+        (f"{args.rows:,} rows | numpy engine", _time_call(lambda: ensemble.predict(bulk), args.repeats)),
+    ]
+    for label, seconds in results:
+        print(f"{label:<36} {seconds * 1000:10.3f} ms")
+
+if __name__ == "__main__":
+    main()
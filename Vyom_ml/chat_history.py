@@ -0,0 +1,245 @@
+# Bounded chat history for the banking assistant.
+#
+# Each session keeps a sliding window of recent messages under a token budget, so the
+# prompt replayed on every turn stays a roughly constant size. Messages that fall out of
+# the window can optionally be folded into a running summary. MessageStore evicts idle
+# sessions (TTL), the least recently used ones beyond a session cap, and LRU sessions
+# whenever the total retained tokens exceed a memory cap. With a session store backend
+# (see session_store.py) every change is written through, and sessions are reloaded
+# when another worker has updated them.
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, messages_from_dict, messages_to_dict
+from langchain_core.prompts import ChatPromptTemplate
+from config import settings
+from llm_client import compile_chain
+from session_store import SessionStore
+
+# Rough per-message framing cost (role, separators) in tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# (previous summary, messages dropped from the window) -> new summary
+Summarizer = Callable[[str, List[BaseMessage]], str]
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """
+    You maintain a running summary of a conversation between a bank customer and the bank's assistant.
+    Update the summary with the new messages. Keep facts the assistant may need later (what the customer
+    asked for, services requested, ticket numbers, unresolved issues) and drop pleasantries.
+    Reply with the updated summary only, in at most 80 words.
+    """),
+    ("human", "Current summary:\n{summary}\n\nNew messages:\n{messages}")
+])
+
+
+def estimate_tokens(message: BaseMessage) -> int:
+    """Approximate token count of a message (about 4 characters per token)."""
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return len(content) // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+def llm_summarizer(model_or_pool) -> Summarizer:
+    """
+    Build a summarizer that asks the LLM to fold dropped messages into the running summary.
+
+    Parameters:
+        model_or_pool: LLMClientPool or chat model used for the summary calls
+    """
+    chain = compile_chain(model_or_pool, "history_summary", SUMMARY_PROMPT)
+
+    def summarize(summary: str, dropped: List[BaseMessage]) -> str:
+        transcript = "\n".join(f"{message.type}: {message.content}" for message in dropped)
+        return chain.invoke({"summary": summary or "(none)", "messages": transcript}).content.strip()
+
+    return summarize
+
+
+# Chat history management
+class InMemoryHistory(BaseChatMessageHistory):
+    """
+    Sliding-window chat history with a token budget.
+
+    Parameters:
+        max_tokens (int): Token budget for the retained messages
+        max_messages (int): Most messages retained, regardless of size
+        summarizer (Summarizer): Optional; folds messages leaving the window into a summary
+        on_change (callable): Called after every change with the change in retained tokens
+                              (used by MessageStore)
+    """
+
+    def __init__(self, max_tokens: int = 2000, max_messages: int = 20, summarizer: Optional[Summarizer] = None,
+                 on_change: Optional[Callable[[int], None]] = None):
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        self.summarizer = summarizer
+        self.on_change = on_change
+        self.summary = ""
+        self.token_count = 0
+        # Changes on every write; tells a stale local copy from the stored one
+        self.revision = uuid.uuid4().hex
+        self._window: List[BaseMessage] = []
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        with self._lock:
+            window = list(self._window)
+            summary = self.summary
+        if summary:
+            return [SystemMessage(content=f"Summary of the earlier conversation: {summary}")] + window
+        return window
+
+    def add_message(self, message: BaseMessage) -> None:
+        with self._lock:
+            before = self.token_count
+            self._window.append(message)
+            self.token_count += estimate_tokens(message)
+            dropped = self._trim()
+            if dropped and self.summarizer is not None:
+                try:
+                    self.summary = self.summarizer(self.summary, dropped)
+                except Exception as e:
+                    print(f"History summarization failed, dropping {len(dropped)} messages: {e}")
+                self.token_count = self._window_tokens()
+            delta = self.token_count - before
+            self.revision = uuid.uuid4().hex
+        if self.on_change is not None:
+            self.on_change(delta)
+
+    def _trim(self) -> List[BaseMessage]:
+        # Drop the oldest messages until within budget, always keeping the newest one,
+        # then keep dropping until the window starts at a customer message
+        dropped = []
+        while len(self._window) > 1 and (len(self._window) > self.max_messages or self.token_count > self.max_tokens):
+            dropped.append(self._window.pop(0))
+            self.token_count -= estimate_tokens(dropped[-1])
+        while dropped and len(self._window) > 1 and not isinstance(self._window[0], HumanMessage):
+            dropped.append(self._window.pop(0))
+            self.token_count -= estimate_tokens(dropped[-1])
+        return dropped
+
+    def _window_tokens(self) -> int:
+        summary_tokens = len(self.summary) // 4 + MESSAGE_OVERHEAD_TOKENS if self.summary else 0
+        return summary_tokens + sum(estimate_tokens(message) for message in self._window)
+
+    def clear(self) -> None:
+        with self._lock:
+            delta = -self.token_count
+            self._window = []
+            self.summary = ""
+            self.token_count = 0
+            self.revision = uuid.uuid4().hex
+        if self.on_change is not None:
+            self.on_change(delta)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serialisable copy of the history, for a session store."""
+        with self._lock:
+            return {"summary": self.summary, "messages": messages_to_dict(self._window), "revision": self.revision}
+
+    def restore(self, snapshot: Dict[str, Any]) -> int:
+        """Replace the contents with a stored snapshot; returns the change in retained tokens."""
+        with self._lock:
+            before = self.token_count
+            self._window = messages_from_dict(snapshot.get("messages", []))
+            self.summary = snapshot.get("summary", "")
+            self.revision = snapshot.get("revision") or uuid.uuid4().hex
+            self.token_count = self._window_tokens()
+            return self.token_count - before
+
+
+# Message store that returns proper chat history objects
+class MessageStore:
+    """
+    Per-session histories with idle expiry, a session cap and a total token cap.
+
+    Parameters:
+        max_sessions (int): Sessions kept; least recently used are evicted beyond this
+        ttl_seconds (float): Sessions idle for longer than this are evicted
+        max_total_tokens (int): Cap on tokens retained across all sessions, enforced each
+                                time a session is accessed (so it may be exceeded by at
+                                most one session's budget in between)
+        max_tokens (int): Per-session token budget (see InMemoryHistory)
+        max_messages (int): Per-session message cap (see InMemoryHistory)
+        summarizer (Summarizer): Optional summarizer for messages leaving a session's window
+        backend (SessionStore): Optional persistent store the histories are written through to;
+                                local eviction only frees memory, the backend keeps the session
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None, ttl_seconds: Optional[float] = None,
+                 max_total_tokens: Optional[int] = None, max_tokens: Optional[int] = None,
+                 max_messages: Optional[int] = None, summarizer: Optional[Summarizer] = None,
+                 backend: Optional[SessionStore] = None):
+        self.max_sessions = max_sessions or settings.SESSION_MAX_COUNT
+        self.ttl_seconds = ttl_seconds or settings.SESSION_TTL_SECONDS
+        self.max_total_tokens = max_total_tokens or settings.HISTORY_TOTAL_MAX_TOKENS
+        self.max_tokens = max_tokens or settings.HISTORY_MAX_TOKENS
+        self.max_messages = max_messages or settings.HISTORY_MAX_MESSAGES
+        self.summarizer = summarizer
+        self.backend = backend
+        self.store: "OrderedDict[str, InMemoryHistory]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self.total_tokens = 0
+        self.evictions = {"expired": 0, "lru": 0, "memory": 0}
+        self._lock = threading.RLock()
+
+    def _changed(self, session_id: str, history: InMemoryHistory, delta: int) -> None:
+        with self._lock:
+            self.total_tokens += delta
+        if self.backend is not None:
+            self.backend.save("history", session_id, history.snapshot())
+
+    def get_session_history(self, session_id: str) -> BaseChatMessageHistory:
+        now = time.monotonic()
+        with self._lock:
+            history = self.store.get(session_id)
+            if history is None:
+                history = self.store[session_id] = InMemoryHistory(self.max_tokens, self.max_messages, self.summarizer)
+                history.on_change = partial(self._changed, session_id, history)
+            if self.backend is not None:
+                # Pick up the stored copy after a restart or when another worker changed it
+                snapshot = self.backend.load("history", session_id)
+                if snapshot is not None and snapshot.get("revision") != history.revision:
+                    self.total_tokens += history.restore(snapshot)
+            self.store.move_to_end(session_id)
+            self._last_used[session_id] = now
+            self._evict(now)
+            return history
+
+    def _evict(self, now: float) -> None:
+        # Oldest-used sessions sit at the front; the session just used is at the back
+        while len(self.store) > 1:
+            session_id = next(iter(self.store))
+            if now - self._last_used[session_id] > self.ttl_seconds:
+                reason = "expired"
+            elif len(self.store) > self.max_sessions:
+                reason = "lru"
+            elif self.total_tokens > self.max_total_tokens:
+                reason = "memory"
+            else:
+                break
+            self._drop(session_id)
+            self.evictions[reason] += 1
+
+    def _drop(self, session_id: str) -> None:
+        history = self.store.pop(session_id)
+        del self._last_used[session_id]
+        self.total_tokens -= history.token_count
+        history.on_change = None
+
+    def clear_session(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self.store:
+                self._drop(session_id)
+        if self.backend is not None:
+            self.backend.delete("history", session_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"sessions": len(self.store), "total_tokens": self.total_tokens, **self.evictions}
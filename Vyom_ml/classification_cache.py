@@ -0,0 +1,203 @@
+# Shared cache for short LLM classifications (intent, banking service, app screen).
+#
+# Customers phrase the same few requests over and over, so the classifiers ask the LLM
+# near-identical questions. Utterances are normalised (case, punctuation, whitespace,
+# numerals) and results are kept in a size-bounded LRU with a TTL, namespaced per
+# classifier. Lookups are exact on the normalised text; optionally a miss falls back to
+# the most similar cached utterance by cosine similarity of hashed n-gram vectors.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import numpy as np
+from config import settings
+from text_features import hashed_ngrams, normalize_utterance
+
+# Dimensions of the near-duplicate vectors; small, since they only compare short utterances
+SIMILARITY_FEATURES = 1024
+
+
+# Rows allocated when a namespace is first indexed; the table doubles up to its capacity
+INITIAL_INDEX_ROWS = 64
+
+
+class _VectorIndex:
+    """
+    Dense slot table of cached utterance vectors for one namespace. Rows are allocated
+    as entries arrive (doubling), so memory follows the number of cached utterances
+    rather than the cache's entry limit.
+    """
+
+    def __init__(self, capacity: int, dims: int):
+        self.dims = dims
+        self.capacity = capacity
+        rows = min(capacity, INITIAL_INDEX_ROWS)
+        self.matrix = np.zeros((rows, dims), dtype=np.float32)
+        self.slot_keys = [None] * rows
+        self.key_slots: Dict[str, int] = {}
+        self.free = list(range(rows - 1, -1, -1))
+
+    def _grow(self) -> None:
+        rows = len(self.slot_keys)
+        new_rows = min(self.capacity, rows * 2)
+        if new_rows <= rows:
+            return
+        matrix = np.zeros((new_rows, self.dims), dtype=np.float32)
+        matrix[:rows] = self.matrix
+        self.matrix = matrix
+        self.slot_keys.extend([None] * (new_rows - rows))
+        self.free = list(range(new_rows - 1, rows - 1, -1)) + self.free
+
+    @staticmethod
+    def vector(key: str, dims: int) -> np.ndarray:
+        indices, values = hashed_ngrams(key, dims)
+        dense = np.zeros(dims, dtype=np.float32)
+        dense[indices] = values
+        return dense
+
+    def add(self, key: str) -> None:
+        if key in self.key_slots:
+            return
+        if not self.free:
+            self._grow()
+            if not self.free:
+                return
+        slot = self.free.pop()
+        self.matrix[slot] = self.vector(key, self.dims)
+        self.slot_keys[slot] = key
+        self.key_slots[key] = slot
+
+    def remove(self, key: str) -> None:
+        slot = self.key_slots.pop(key, None)
+        if slot is not None:
+            self.matrix[slot] = 0.0
+            self.slot_keys[slot] = None
+            self.free.append(slot)
+
+    def nearest(self, key: str) -> Tuple[Optional[str], float]:
+        if not self.key_slots:
+            return None, 0.0
+        scores = self.matrix @ self.vector(key, self.dims)
+        slot = int(np.argmax(scores))
+        return self.slot_keys[slot], float(scores[slot])
+
+
+class ClassificationCache:
+    """
+    Size-bounded LRU + TTL cache of classification results, shared by all classifiers.
+
+    Parameters:
+        max_entries (int): Total entries across namespaces; least recently used are evicted
+        ttl_seconds (float): How long a cached classification stays valid
+        similarity_threshold (float): Cosine similarity needed for a near-duplicate hit;
+                                      0 disables near-duplicate matching
+    """
+
+    def __init__(self, max_entries: int = 10_000, ttl_seconds: float = 3600.0, similarity_threshold: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, float]]" = OrderedDict()
+        self._indexes: Dict[str, _VectorIndex] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, namespace: str, event: str) -> None:
+        counters = self._counters.setdefault(namespace, {"hits": 0, "near_hits": 0, "misses": 0,
+                                                         "expired": 0, "evictions": 0})
+        counters[event] += 1
+
+    def _drop(self, entry_key: Tuple[str, str]) -> None:
+        del self._entries[entry_key]
+        index = self._indexes.get(entry_key[0])
+        if index is not None:
+            index.remove(entry_key[1])
+
+    def _lookup(self, namespace: str, key: str, now: float):
+        entry_key = (namespace, key)
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at <= now:
+            self._drop(entry_key)
+            self._count(namespace, "expired")
+            return None
+        self._entries.move_to_end(entry_key)
+        return entry
+
+    def get(self, namespace: str, query: str) -> Optional[Any]:
+        """Cached classification for `query` in `namespace`, or None on a miss."""
+        key = normalize_utterance(query)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._lookup(namespace, key, now)
+            if entry is not None:
+                self._count(namespace, "hits")
+                return entry[0]
+            if self.similarity_threshold > 0 and namespace in self._indexes:
+                nearest, score = self._indexes[namespace].nearest(key)
+                if nearest is not None and score >= self.similarity_threshold:
+                    entry = self._lookup(namespace, nearest, now)
+                    if entry is not None:
+                        self._count(namespace, "near_hits")
+                        return entry[0]
+            self._count(namespace, "misses")
+            return None
+
+    def put(self, namespace: str, query: str, value: Any) -> None:
+        key = normalize_utterance(query)
+        with self._lock:
+            entry_key = (namespace, key)
+            self._entries[entry_key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(entry_key)
+            if self.similarity_threshold > 0:
+                if namespace not in self._indexes:
+                    self._indexes[namespace] = _VectorIndex(self.max_entries, SIMILARITY_FEATURES)
+                self._indexes[namespace].add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._count(oldest[0], "evictions")
+
+    def get_or_compute(self, namespace: str, query: str, compute: Callable[[str], Any]) -> Any:
+        """Return the cached classification, calling `compute(query)` and caching it on a miss."""
+        value = self.get(namespace, query)
+        if value is None:
+            value = compute(query)
+            self.put(namespace, query, value)
+        return value
+
+    async def aget_or_compute(self, namespace: str, query: str, compute: Callable[[str], Awaitable[Any]]) -> Any:
+        """Async variant of get_or_compute for coroutine classifiers."""
+        value = self.get(namespace, query)
+        if value is None:
+            value = await compute(query)
+            self.put(namespace, query, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._indexes.clear()
+
+    def stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        """Hit/miss counters per namespace; `saved_calls` is the number of LLM calls avoided."""
+        with self._lock:
+            report = {}
+            for name, counters in self._counters.items():
+                lookups = counters["hits"] + counters["near_hits"] + counters["misses"]
+                saved = counters["hits"] + counters["near_hits"]
+                report[name] = {**counters, "saved_calls": saved,
+                                "hit_rate": saved / lookups if lookups else 0.0}
+            report_all = {"entries": len(self._entries), "namespaces": report}
+            return report.get(namespace, {}) if namespace else report_all
+
+
+# Process-wide cache shared by IntentRecognizer, BankingServiceAgent and PageRoutingAgent
+classification_cache = ClassificationCache(
+    max_entries=settings.CLASSIFICATION_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.CLASSIFICATION_CACHE_TTL_SECONDS,
+    similarity_threshold=settings.CLASSIFICATION_CACHE_SIMILARITY,
+)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Dict
+from typing import Dict, List
 from dotenv import load_dotenv
 import os
 
@@ -30,8 +30,109 @@ class Settings(BaseSettings):
         "kn": "kn-IN"
     }
     
+    # LLM Client Settings
+    LLM_MODEL_NAME: str = "llama-3.1-8b-instant"
+    GROQ_API_BASE: str = os.getenv("GROQ_API_BASE", "")  # e.g. a local stub server for benchmarks
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_TIMEOUT_SECONDS: float = 30.0
+    LLM_KEEPALIVE_SECONDS: float = 60.0
+    
+    # Database Settings
+    # postgresql://... in production; relative sqlite:/// paths are taken from the repository root
+    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///banking_system.db")
+    DB_POOL_MIN_SIZE: int = 1
+    DB_POOL_MAX_SIZE: int = 10
+    DB_STATEMENT_TIMEOUT_MS: int = 5000
+    DB_HEALTH_CHECK_IDLE_SECONDS: float = 30.0  # ping connections idle longer than this on checkout
+    DB_MAX_CONNECTION_AGE_SECONDS: float = 1800.0
+    DB_ACQUIRE_TIMEOUT_SECONDS: float = 10.0
+    DB_FETCH_BATCH_SIZE: int = 500
+    SQL_TEMPLATE_CACHE_MAX_ENTRIES: int = 2000
+    SQL_MAX_ROWS: int = 200  # rows kept from an LLM-generated query (LIMIT is injected or clamped)
+    SQL_RESULT_MAX_BYTES: int = 1024 * 1024
+    SCHEMA_CHECK_INTERVAL_SECONDS: float = 300.0  # how often the introspected schema is checked for changes
+    SCHEMA_MAX_TABLES: int = 8  # most tables described to the SQL prompt for one question
+    RESULT_CACHE_TTL_SECONDS: float = 30.0  # how long a read-only query result is reused for the same user
+    RESULT_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    RESULT_CACHE_MAX_ENTRY_ROWS: int = 1000  # larger results are not cached
+    
+    # Ticket System Settings
+    TICKET_API_URL: str = "https://1998-42-106-207-28.ngrok-free.app/query/process"
+    TICKET_TIMEOUT_SECONDS: float = 5.0
+    TICKET_MAX_RETRIES: int = 3
+    TICKET_BACKOFF_BASE_SECONDS: float = 0.2
+    TICKET_BACKOFF_MAX_SECONDS: float = 30.0
+    TICKET_RESPONSE_BUDGET_SECONDS: float = 1.5  # longest a turn waits for the ticket id before replying "queued"
+    TICKET_BREAKER_FAILURES: int = 5
+    TICKET_BREAKER_RESET_SECONDS: float = 30.0
+    TICKET_MAX_CONNECTIONS: int = 10
+    TICKET_OUTBOX_PATH: str = "vyom_ml/data/ticket_outbox.db"
+    TICKET_OUTBOX_BATCH_SIZE: int = 50
+    TICKET_OUTBOX_FLUSH_INTERVAL: float = 5.0
+    # Seconds a ticket being sent is reserved for one worker; must outlast a live delivery
+    # ((TICKET_MAX_RETRIES + 1) * TICKET_TIMEOUT_SECONDS plus backoff)
+    TICKET_OUTBOX_LEASE_SECONDS: float = 60.0
+    TICKET_BATCH_SIZE: int = 100  # tickets per outbox transaction in bulk submissions
+    TICKET_BATCH_BUDGET_SECONDS: float = 30.0
+    TICKET_DEDUP_WINDOW_SECONDS: float = 600.0  # repeats of a (user, service) request map to the earlier ticket
+    BATCH_CLASSIFY_CONCURRENCY: int = 8
+    
     # File Paths
     TEMP_AUDIO_PATH: str = "temp_audio.wav"
+    PRIORITY_MODEL_PATH: str = "vyom_ml/xgboost_priority_model.pkl"
+    RESOLUTION_MODEL_PATH: str = "vyom_ml/resolution_time_model.vyom"
+    DATASET_CACHE_DIR: str = "vyom_ml/data/.cache"
+    
+    # Model Cache Settings
+    MODEL_CHECK_INTERVAL_SECONDS: float = 1.0
+    
+    # Intent Fast Path Settings
+    INTENT_MODEL_PATH: str = "vyom_ml/intent_fast_path.npz"
+    INTENT_LOG_PATH: str = "vyom_ml/data/intent_log.jsonl"
+    INTENT_FAST_PATH_THRESHOLD: float = 0.85
+    INTENT_SHADOW_RATE: float = 0.05  # share of fast-path answers re-checked by the LLM
+    
+    # Classification Cache Settings
+    CLASSIFICATION_CACHE_MAX_ENTRIES: int = 10000
+    CLASSIFICATION_CACHE_TTL_SECONDS: float = 3600.0
+    CLASSIFICATION_CACHE_SIMILARITY: float = 0.0  # cosine threshold for near-duplicate hits; 0 disables
+    
+    # Service Classifier Settings
+    SERVICE_CLASSIFIER_THRESHOLD: float = 0.5  # lowest phrase similarity answered without the LLM
+    SERVICE_CLASSIFIER_MARGIN: float = 0.1  # lowest lead over the second best service
+    SERVICE_CLASSIFIER_MAX_PHRASES: int = 1000  # phrases learned from confirmed tickets
+    SERVICE_PHRASE_LOG_PATH: str = "vyom_ml/data/service_phrases.jsonl"
+    
+    # Chat History Settings
+    HISTORY_MAX_TOKENS: int = 2000  # per-session prompt history budget (approximate tokens)
+    HISTORY_MAX_MESSAGES: int = 20
+    HISTORY_SUMMARIZE: bool = False  # fold messages leaving the window into an LLM summary
+    HISTORY_TOTAL_MAX_TOKENS: int = 5_000_000  # across all sessions; LRU sessions are evicted beyond this
+    SESSION_MAX_COUNT: int = 10000
+    SESSION_TTL_SECONDS: float = 7200.0
+    # Key the app backend presents to POST /sessions; session issuing is disabled while unset
+    SESSION_ISSUER_API_KEY: str = os.getenv("SESSION_ISSUER_API_KEY", "")
+    
+    # Session Store Settings
+    SESSION_STORE_BACKEND: str = "memory"  # memory, sqlite or shm (SQLite on /dev/shm, shared by workers)
+    SESSION_STORE_PATH: str = "vyom_ml/data/sessions.db"
+    SESSION_STORE_SHM_PATH: str = "/dev/shm/vyom_sessions.db"
+    SESSION_STORE_FLUSH_INTERVAL: float = 0.05  # seconds between write-behind commits
+    SESSION_STORE_BATCH_SIZE: int = 256
+    
+    # Streaming Reply Settings
+    STREAM_MIN_SENTENCE_CHARS: int = 20  # shorter sentences are merged with the next before TTS
+    STREAM_TTS_PREFETCH: int = 2  # sentences translated/synthesized ahead of the one being sent
+    
+    # Speculative Execution Settings
+    SPECULATIVE_EXECUTION: bool = True
+    # Side-effect-free handlers started while the intent is still being detected
+    # ("service" only classifies the request; tickets are never raised speculatively)
+    SPECULATIVE_HANDLERS: List[str] = ["dbquery", "page_routing"]
+    # SQL is only generated ahead when the fast-path model gives "dbquery" at least this
+    # probability (without a trained model: only when the schema is already cached)
+    SPECULATIVE_DBQUERY_MIN_PROBABILITY: float = 0.2
     
     class Config:
         env_file = ".env"
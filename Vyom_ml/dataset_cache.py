@@ -0,0 +1,244 @@
+# Columnar binary cache for the CSV training datasets.
+#
+# The first load of a CSV parses it once and writes every column as its own .npy file
+# under <cache dir>/<stem>-<sha256 prefix>/ with a manifest.json. Numeric columns keep
+# their inferred dtype; text columns (Department, Sub-Department, ...) are dictionary
+# encoded into small integer codes plus a category list. Later loads memory-map the
+# .npy files, so nothing is re-parsed or re-encoded until the CSV contents change.
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from config import settings
+from model_registry import file_hash
+
+CACHE_FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# Maps csv path -> [size, mtime_ns, sha256] so unchanged files are not re-hashed
+INDEX_NAME = "index.json"
+
+_index_lock = threading.Lock()
+
+
+def _codes_dtype(n_categories: int):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _read_index(cache_dir: str) -> Dict[str, list]:
+    try:
+        with open(os.path.join(cache_dir, INDEX_NAME)) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: str, data) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+def dataset_sha256(csv_path: str, cache_dir: Optional[str] = None) -> str:
+    """
+    SHA-256 of a CSV file. The digest is remembered per (size, mtime) in the cache
+    index, so repeated loads of an unchanged file only cost a stat.
+    """
+    cache_dir = cache_dir or settings.DATASET_CACHE_DIR
+    stat = os.stat(csv_path)
+    key = os.path.abspath(csv_path)
+    with _index_lock:
+        index = _read_index(cache_dir)
+        entry = index.get(key)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        sha256 = file_hash(csv_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        index[key] = [stat.st_size, stat.st_mtime_ns, sha256]
+        _write_json(os.path.join(cache_dir, INDEX_NAME), index)
+        return sha256
+
+
+class ColumnarDataset:
+    """
+    A cached dataset whose columns are memory-mapped .npy arrays.
+
+    Numeric columns are returned as-is; dictionary-encoded columns expose their
+    integer `codes()` and `categories()`, and are decoded only in `to_frame()`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, MANIFEST_NAME)) as file:
+            self.manifest = json.load(file)
+        if self.manifest.get("version") != CACHE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported dataset cache version in {path}")
+        self._columns = {column["name"]: column for column in self.manifest["columns"]}
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return [column["name"] for column in self.manifest["columns"]]
+
+    @property
+    def sha256(self) -> str:
+        return self.manifest["sha256"]
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    def _array(self, name: str) -> np.ndarray:
+        if name not in self._columns:
+            raise KeyError(f"Column '{name}' not in cached dataset {self.manifest['source']}")
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.path, self._columns[name]["file"]), mmap_mode="r")
+        return self._arrays[name]
+
+    def is_categorical(self, name: str) -> bool:
+        return "categories" in self._columns[name]
+
+    def codes(self, name: str) -> np.ndarray:
+        """Integer codes of a dictionary-encoded column (-1 marks missing values)."""
+        if not self.is_categorical(name):
+            raise TypeError(f"Column '{name}' is not dictionary encoded")
+        return self._array(name)
+
+    def categories(self, name: str) -> List[str]:
+        return self._columns[name]["categories"]
+
+    def column(self, name: str) -> np.ndarray:
+        """Numeric columns as a read-only memory map; encoded columns decoded to an object array."""
+        if self.is_categorical(name):
+            return np.asarray(self.categories(name) + [None], dtype=object)[self.codes(name)]
+        return self._array(name)
+
+    def to_frame(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Build a DataFrame. Encoded columns become pandas categoricals built from the
+        cached codes, so no strings are parsed or re-encoded.
+        """
+        data = {}
+        for name in columns or self.columns:
+            if self.is_categorical(name):
+                data[name] = pd.Categorical.from_codes(np.asarray(self.codes(name)), self.categories(name))
+            else:
+                data[name] = np.asarray(self._array(name))
+        return pd.DataFrame(data)
+
+
+def build_dataset_cache(csv_path: str, cache_dir: Optional[str] = None) -> str:
+    """
+    Parse a CSV once and write its columnar cache. Returns the cache directory.
+    The directory is written under a temporary name and renamed into place.
+    """
+    cache_dir = cache_dir or settings.DATASET_CACHE_DIR
+    sha256 = dataset_sha256(csv_path, cache_dir)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    target = os.path.join(cache_dir, f"{stem}-{sha256[:16]}")
+
+    df = pd.read_csv(csv_path)
+    tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix=f".{stem}-")
+    try:
+        columns = []
+        for index, name in enumerate(df.columns):
+            series = df[name]
+            entry = {"name": name, "file": f"col{index}.npy"}
+            if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                values = series.to_numpy()
+            else:
+                codes, categories = pd.factorize(series, sort=True)
+                values = codes.astype(_codes_dtype(len(categories)))
+                entry["categories"] = [str(category) for category in categories]
+            entry["dtype"] = str(values.dtype)
+            np.save(os.path.join(tmp_dir, entry["file"]), values)
+            columns.append(entry)
+
+        _write_json(os.path.join(tmp_dir, MANIFEST_NAME), {
+            "version": CACHE_FORMAT_VERSION,
+            "source": os.path.abspath(csv_path),
+            "sha256": sha256,
+            "rows": len(df),
+            "columns": columns,
+            "created_at": time.time(),
+        })
+        try:
+            os.rename(tmp_dir, target)
+        except OSError:
+            # Another process built the same cache first
+            if not os.path.exists(os.path.join(target, MANIFEST_NAME)):
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Drop caches of older versions of the same file
+    for entry in os.listdir(cache_dir):
+        if entry.startswith(f"{stem}-") and os.path.join(cache_dir, entry) != target:
+            old = os.path.join(cache_dir, entry)
+            if os.path.isfile(os.path.join(old, MANIFEST_NAME)):
+                with open(os.path.join(old, MANIFEST_NAME)) as file:
+                    if json.load(file).get("source") != os.path.abspath(csv_path):
+                        continue
+                shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+def open_dataset(csv_path: str, cache_dir: Optional[str] = None) -> ColumnarDataset:
+    """
+    Return the memory-mapped columnar cache for a CSV, building it on first use or
+    whenever the CSV contents change.
+    """
+    cache_dir = cache_dir or settings.DATASET_CACHE_DIR
+    sha256 = dataset_sha256(csv_path, cache_dir)
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    path = os.path.join(cache_dir, f"{stem}-{sha256[:16]}")
+    if not os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        path = build_dataset_cache(csv_path, cache_dir)
+    return ColumnarDataset(path)
+
+
+def load_dataset(csv_path: str, columns: Optional[List[str]] = None, cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load a CSV like pd.read_csv(csv_path), backed by the columnar cache.
+
+    Values and column order match read_csv, but text columns come back as pandas
+    Categorical (dtype "category") instead of object. Comparisons, .str, groupby and
+    get_dummies work the same; call .astype(str) on a column that must be object.
+    """
+    return open_dataset(csv_path, cache_dir).to_frame(columns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or inspect the columnar cache of CSV datasets.")
+    parser.add_argument("csv", nargs="+", help="CSV files to cache")
+    parser.add_argument("--cache-dir", default=None)
+    args = parser.parse_args()
+
+    for csv_path in args.csv:
+        started = time.perf_counter()
+        dataset = open_dataset(csv_path, args.cache_dir)
+        first = time.perf_counter() - started
+
+        started = time.perf_counter()
+        load_dataset(csv_path, cache_dir=args.cache_dir)
+        cached = time.perf_counter() - started
+
+        started = time.perf_counter()
+        pd.read_csv(csv_path)
+        parsed = time.perf_counter() - started
+
+        encoded = [name for name in dataset.columns if dataset.is_categorical(name)]
+        print(f"{csv_path}: {len(dataset):,} rows, {len(dataset.columns)} columns "
+              f"({len(encoded)} dictionary encoded) -> {dataset.path}")
+        print(f"  open {first * 1e3:.1f} ms, cached load {cached * 1e3:.1f} ms, read_csv {parsed * 1e3:.1f} ms")
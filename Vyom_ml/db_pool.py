@@ -0,0 +1,482 @@
+# Pooled database connections for the info retrieval agent.
+#
+# query_postgresql used to open a new connection (TCP, TLS and auth to Supabase) for every
+# question. ConnectionPool keeps between min_size and max_size connections open, health
+# checks connections that sat idle before handing them out, recycles old ones and applies
+# a statement timeout to every query. Postgres connections use psycopg 3, which prepares
+# statements server-side once the same query text has run a few times.
+# AsyncConnectionPool does the same for the async pipeline (one pool per event loop).
+#
+# Besides Postgres URLs, "sqlite:///path/to.db" opens a SQLite database, e.g. the bundled
+# banking_system.db, for local tests and benchmarks. Relative paths are resolved against
+# the repository root (not the working directory), and the file must already exist: a
+# mistyped path fails on connect instead of silently creating an empty database.
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+import psycopg
+from config import settings
+
+SQLITE_PREFIX = "sqlite:///"
+
+
+# The directory holding Vyom_ml/ and banking_system.db
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def is_sqlite_url(url: str) -> bool:
+    return url.startswith(SQLITE_PREFIX)
+
+
+def sqlite_path(url: str) -> str:
+    """Absolute path of the database file of a sqlite:/// URL; relative paths are taken from REPO_ROOT."""
+    return os.path.join(REPO_ROOT, url[len(SQLITE_PREFIX):])
+
+
+def connect_sqlite(url: str, **kwargs) -> sqlite3.Connection:
+    """Open an existing SQLite database for reading and writing; a missing file raises sqlite3.OperationalError."""
+    return sqlite3.connect(f"file:{quote(sqlite_path(url))}?mode=rw", uri=True, **kwargs)
+
+
+class PooledConnection:
+    """A raw DB-API connection plus the bookkeeping the pool needs."""
+
+    def __init__(self, raw, is_sqlite: bool):
+        self.raw = raw
+        self.is_sqlite = is_sqlite
+        self.created_at = self.last_used = time.monotonic()
+        # SQLite has no server-side statement timeout; the progress handler checks this
+        self.deadline: Optional[float] = None
+
+    def broken(self) -> bool:
+        if self.is_sqlite:
+            return False
+        return self.raw.closed or self.raw.broken
+
+
+def _execute(cursor, query: str, params: Optional[Sequence[Any]]) -> None:
+    # Without params psycopg leaves '%' alone, so LLM SQL with LIKE '%x%' still works
+    if params is None:
+        cursor.execute(query)
+    else:
+        cursor.execute(query, params)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of database connections.
+
+    Parameters:
+        url (str): Postgres connection URL or "sqlite:///path"
+        min_size (int): Connections opened up front by open()
+        max_size (int): Most connections open at once; further callers wait
+        statement_timeout_ms (int): Per-statement limit; 0 disables
+        health_check_idle_seconds (float): Connections idle longer than this are pinged on checkout
+        max_age_seconds (float): Connections older than this are closed and replaced
+        acquire_timeout (float): Seconds to wait for a free connection before TimeoutError
+    """
+
+    def __init__(self, url: str, min_size: Optional[int] = None, max_size: Optional[int] = None,
+                 statement_timeout_ms: Optional[int] = None, health_check_idle_seconds: Optional[float] = None,
+                 max_age_seconds: Optional[float] = None, acquire_timeout: Optional[float] = None):
+        self.url = url
+        self.is_sqlite = is_sqlite_url(url)
+        self.min_size = settings.DB_POOL_MIN_SIZE if min_size is None else min_size
+        self.max_size = max_size or settings.DB_POOL_MAX_SIZE
+        self.statement_timeout_ms = (settings.DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None
+                                     else statement_timeout_ms)
+        self.health_check_idle_seconds = (settings.DB_HEALTH_CHECK_IDLE_SECONDS if health_check_idle_seconds is None
+                                          else health_check_idle_seconds)
+        self.max_age_seconds = max_age_seconds or settings.DB_MAX_CONNECTION_AGE_SECONDS
+        self.acquire_timeout = acquire_timeout or settings.DB_ACQUIRE_TIMEOUT_SECONDS
+        # Bind parameter placeholder for this driver
+        self.placeholder = "?" if self.is_sqlite else "%s"
+
+        self._idle: List[PooledConnection] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {"opened": 0, "closed": 0, "checkouts": 0, "waits": 0, "health_check_failures": 0}
+
+    def _connect(self) -> PooledConnection:
+        if self.is_sqlite:
+            conn = PooledConnection(connect_sqlite(self.url, check_same_thread=False), True)
+            conn.raw.set_progress_handler(
+                lambda: int(conn.deadline is not None and time.monotonic() > conn.deadline), 1000)
+            return conn
+        raw = psycopg.connect(self.url, autocommit=True)
+        if self.statement_timeout_ms:
+            raw.execute(f"SET statement_timeout = {int(self.statement_timeout_ms)}")
+        return PooledConnection(raw, False)
+
+    def open(self) -> "ConnectionPool":
+        """Open min_size connections now; failures are reported and retried on demand."""
+        connections = []
+        try:
+            for _ in range(self.min_size):
+                with self._cond:
+                    if self._size >= self.max_size:
+                        break
+                    self._size += 1
+                try:
+                    connections.append(self._connect())
+                    self.stats["opened"] += 1
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                    raise
+        except Exception as e:
+            print(f"Could not pre-open database connections: {e}")
+        with self._cond:
+            self._idle.extend(connections)
+        return self
+
+    def _healthy(self, conn: PooledConnection) -> bool:
+        now = time.monotonic()
+        if conn.broken() or now - conn.created_at > self.max_age_seconds:
+            return False
+        if now - conn.last_used < self.health_check_idle_seconds:
+            return True
+        try:
+            conn.raw.execute("SELECT 1").fetchall()
+            return True
+        except Exception:
+            self.stats["health_check_failures"] += 1
+            return False
+
+    def _discard(self, conn: PooledConnection) -> None:
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self.stats["closed"] += 1
+            self._cond.notify()
+
+    def _acquire(self) -> PooledConnection:
+        deadline = time.monotonic() + self.acquire_timeout
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No database connection free within {self.acquire_timeout}s")
+                    self.stats["waits"] += 1
+                    self._cond.wait(remaining)
+                conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    self._size += 1
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                self.stats["opened"] += 1
+            elif not self._healthy(conn):
+                self._discard(conn)
+                continue
+            self.stats["checkouts"] += 1
+            return conn
+
+    def _release(self, conn: PooledConnection) -> None:
+        conn.deadline = None
+        conn.last_used = time.monotonic()
+        try:
+            if conn.is_sqlite and conn.raw.in_transaction:
+                conn.raw.rollback()
+            elif not conn.is_sqlite and not conn.broken() and conn.raw.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+                conn.raw.rollback()
+        except Exception:
+            pass
+        if self._closed or conn.broken():
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """Check a connection out for the duration of the `with` block."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def _start_statement(self, conn: PooledConnection) -> None:
+        if conn.is_sqlite and self.statement_timeout_ms:
+            conn.deadline = time.monotonic() + self.statement_timeout_ms / 1000
+
+    def execute(self, query: str, params: Optional[Sequence[Any]] = None) -> Tuple[List[str], List[tuple]]:
+        """
+        Run one statement and fetch all rows.
+
+        Returns:
+            tuple: (column names, rows); both empty for statements without a result set
+        """
+        with self.connection() as conn:
+            cursor = conn.raw.cursor()
+            try:
+                self._start_statement(conn)
+                _execute(cursor, query, params)
+                column_names = [desc[0] for desc in cursor.description] if cursor.description else []
+                rows = cursor.fetchall() if cursor.description else []
+            finally:
+                cursor.close()
+        return column_names, rows
+
+    def iter_batches(self, query: str, params: Optional[Sequence[Any]] = None,
+                     batch_size: Optional[int] = None, read_only: bool = False) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        Stream a large result in batches of `batch_size` rows with fetchmany, yielding
+        (column names, rows); an empty result yields one empty batch. On Postgres a
+        server-side cursor is used, so rows are only transferred as they are consumed. The connection is held until the generator is
+        exhausted or closed.
+
+        With `read_only` the statement runs in a READ ONLY transaction (Postgres) or with
+        PRAGMA query_only (SQLite), so the database itself rejects any write.
+        """
+        batch_size = batch_size or settings.DB_FETCH_BATCH_SIZE
+        with self.connection() as conn, ExitStack() as stack:
+            if conn.is_sqlite:
+                if read_only:
+                    conn.raw.execute("PRAGMA query_only = ON")
+                    # The connection goes back to the pool; don't leave it read-only
+                    stack.callback(conn.raw.execute, "PRAGMA query_only = OFF")
+                cursor = conn.raw.cursor()
+                stack.callback(cursor.close)
+            else:
+                # Named cursors live inside a transaction
+                stack.enter_context(conn.raw.transaction())
+                if read_only:
+                    conn.raw.execute("SET TRANSACTION READ ONLY")
+                cursor = stack.enter_context(conn.raw.cursor(name=f"vyom_{uuid.uuid4().hex[:12]}"))
+            self._start_statement(conn)
+            _execute(cursor, query, params)
+            column_names = [desc[0] for desc in cursor.description] if cursor.description else []
+            while column_names:
+                rows = cursor.fetchmany(batch_size)
+                # An empty result still yields once, so callers get the column names
+                yield column_names, rows
+                if len(rows) < batch_size:
+                    break
+                self._start_statement(conn)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+    def status(self) -> Dict[str, int]:
+        with self._cond:
+            return {"size": self._size, "idle": len(self._idle), **self.stats}
+
+
+class AsyncConnectionPool:
+    """
+    Async counterpart of ConnectionPool for one event loop, using psycopg's AsyncConnection.
+    SQLite URLs are served by a ConnectionPool in worker threads.
+    Takes the same parameters as ConnectionPool.
+    """
+
+    def __init__(self, url: str, **kwargs):
+        self.url = url
+        self.is_sqlite = is_sqlite_url(url)
+        # Sizes, timeouts and counters are shared with the sync implementation
+        self._sync = ConnectionPool(url, **kwargs)
+        self.placeholder = self._sync.placeholder
+        self._idle: List[PooledConnection] = []
+        self._size = 0
+        self._closed = False
+        self._cond = asyncio.Condition()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return self._sync.stats
+
+    async def _connect(self) -> PooledConnection:
+        raw = await psycopg.AsyncConnection.connect(self.url, autocommit=True)
+        if self._sync.statement_timeout_ms:
+            await raw.execute(f"SET statement_timeout = {int(self._sync.statement_timeout_ms)}")
+        return PooledConnection(raw, False)
+
+    async def _healthy(self, conn: PooledConnection) -> bool:
+        now = time.monotonic()
+        if conn.broken() or now - conn.created_at > self._sync.max_age_seconds:
+            return False
+        if now - conn.last_used < self._sync.health_check_idle_seconds:
+            return True
+        try:
+            await (await conn.raw.execute("SELECT 1")).fetchall()
+            return True
+        except Exception:
+            self.stats["health_check_failures"] += 1
+            return False
+
+    async def _discard(self, conn: PooledConnection) -> None:
+        try:
+            await conn.raw.close()
+        except Exception:
+            pass
+        async with self._cond:
+            self._size -= 1
+            self.stats["closed"] += 1
+            self._cond.notify()
+
+    async def _acquire(self) -> PooledConnection:
+        deadline = time.monotonic() + self._sync.acquire_timeout
+        while True:
+            async with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                while not self._idle and self._size >= self._sync.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No database connection free within {self._sync.acquire_timeout}s")
+                    self.stats["waits"] += 1
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    self._size += 1
+            if conn is None:
+                try:
+                    conn = await self._connect()
+                except BaseException:
+                    async with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                self.stats["opened"] += 1
+            elif not await self._healthy(conn):
+                await self._discard(conn)
+                continue
+            self.stats["checkouts"] += 1
+            return conn
+
+    async def _release(self, conn: PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        try:
+            if not conn.broken() and conn.raw.info.transaction_status != psycopg.pq.TransactionStatus.IDLE:
+                await conn.raw.rollback()
+        except Exception:
+            pass
+        if self._closed or conn.broken():
+            await self._discard(conn)
+            return
+        async with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[PooledConnection]:
+        """Check a Postgres connection out for the duration of the `async with` block."""
+        if self.is_sqlite:
+            raise RuntimeError("SQLite connections are not async; use execute()/iter_batches()")
+        conn = await self._acquire()
+        try:
+            yield conn
+        finally:
+            await self._release(conn)
+
+    async def execute(self, query: str, params: Optional[Sequence[Any]] = None) -> Tuple[List[str], List[tuple]]:
+        """Async variant of ConnectionPool.execute."""
+        if self.is_sqlite:
+            return await asyncio.to_thread(self._sync.execute, query, params)
+        async with self.connection() as conn:
+            async with conn.raw.cursor() as cursor:
+                if params is None:
+                    await cursor.execute(query)
+                else:
+                    await cursor.execute(query, params)
+                column_names = [desc[0] for desc in cursor.description] if cursor.description else []
+                rows = await cursor.fetchall() if cursor.description else []
+        return column_names, rows
+
+    async def iter_batches(self, query: str, params: Optional[Sequence[Any]] = None,
+                           batch_size: Optional[int] = None, read_only: bool = False) -> AsyncIterator[Tuple[List[str], List[tuple]]]:
+        """Async variant of ConnectionPool.iter_batches."""
+        batch_size = batch_size or settings.DB_FETCH_BATCH_SIZE
+        if self.is_sqlite:
+            batches = self._sync.iter_batches(query, params, batch_size, read_only)
+            try:
+                while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+                    yield batch
+            finally:
+                await asyncio.to_thread(batches.close)
+            return
+        async with self.connection() as conn:
+            async with conn.raw.transaction():
+                if read_only:
+                    await conn.raw.execute("SET TRANSACTION READ ONLY")
+                async with conn.raw.cursor(name=f"vyom_{uuid.uuid4().hex[:12]}") as cursor:
+                    if params is None:
+                        await cursor.execute(query)
+                    else:
+                        await cursor.execute(query, params)
+                    column_names = [desc[0] for desc in cursor.description] if cursor.description else []
+                    while column_names:
+                        rows = await cursor.fetchmany(batch_size)
+                        yield column_names, rows
+                        if len(rows) < batch_size:
+                            break
+
+    async def close(self) -> None:
+        async with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._discard(conn)
+        self._sync.close()
+
+    def status(self) -> Dict[str, int]:
+        if self.is_sqlite:
+            return self._sync.status()
+        return {"size": self._size, "idle": len(self._idle), **self.stats}
+
+
+_pools: Dict[str, ConnectionPool] = {}
+# One async pool per event loop and URL; asyncio primitives and connections belong to a loop
+_async_pools: "weakref.WeakKeyDictionary[Any, Dict[str, AsyncConnectionPool]]" = weakref.WeakKeyDictionary()
+_pools_lock = threading.Lock()
+
+
+def get_db_pool(url: str) -> ConnectionPool:
+    """Process-wide ConnectionPool for `url`, opened on first use."""
+    with _pools_lock:
+        pool = _pools.get(url)
+        if pool is None:
+            pool = _pools[url] = ConnectionPool(url)
+            created = True
+        else:
+            created = False
+    return pool.open() if created else pool
+
+
+def get_async_db_pool(url: str) -> AsyncConnectionPool:
+    """AsyncConnectionPool for `url` on the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _pools_lock:
+        pools = _async_pools.setdefault(loop, {})
+        if url not in pools:
+            pools[url] = AsyncConnectionPool(url)
+        return pools[url]
@@ -0,0 +1,176 @@
+import itertools
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import xgboost as xgb
+from sklearn.model_selection import KFold
+
+# Same search space as the GridSearchCV in priority_prediction.py. n_estimators is not
+# searched directly: every candidate trains up to max_rounds and early stopping on the
+# validation fold picks the number of trees.
+PARAM_GRID = {
+    'max_depth': [3, 5, 7],
+    'learning_rate': [0.01, 0.1, 0.2],
+    'subsample': [0.7, 0.8, 1.0],
+    'colsample_bytree': [0.7, 0.8, 1.0]
+}
+
+
+def _r2(y_true: np.ndarray, y_pred: np.ndarray) -> float:
+    residual = np.sum((y_true - y_pred) ** 2)
+    total = np.sum((y_true - np.mean(y_true)) ** 2)
+    return float(1 - residual / total) if total else 0.0
+
+
+def _candidate_key(params: Dict[str, Any]) -> str:
+    return json.dumps(params, sort_keys=True)
+
+
+class SuccessiveHalvingSearch:
+    """
+    Successive-halving hyperparameter search for XGBoost regressors.
+
+    Every candidate is first trained with a small boosting-round budget on each fold;
+    only the best 1/eta are promoted to the next rung, where the budget grows eta-fold,
+    until the last rung trains with `max_rounds`. Each fit uses early stopping on its
+    validation fold.
+
+    The fold DMatrix objects (and their quantile sketches) are built once and shared by
+    every candidate. Results are appended to `results_path` as JSON lines, so an
+    interrupted search resumes where it stopped.
+    """
+
+    def __init__(self, param_grid: Dict[str, List[Any]] = None, n_folds: int = 3, max_rounds: int = 300,
+                 eta: int = 3, n_rungs: int = 3, early_stopping_rounds: int = 20,
+                 results_path: Optional[str] = None, random_state: int = 42, verbose: bool = True):
+        self.param_grid = param_grid or PARAM_GRID
+        self.n_folds = n_folds
+        self.max_rounds = max_rounds
+        self.eta = eta
+        self.n_rungs = n_rungs
+        self.early_stopping_rounds = early_stopping_rounds
+        self.results_path = results_path
+        self.random_state = random_state
+        self.verbose = verbose
+
+        self.best_params_: Optional[Dict[str, Any]] = None
+        self.best_score_: Optional[float] = None
+        self.history_: List[Dict[str, Any]] = []
+        self.elapsed_: Optional[float] = None
+
+    def candidates(self) -> List[Dict[str, Any]]:
+        names = sorted(self.param_grid)
+        return [dict(zip(names, values)) for values in itertools.product(*(self.param_grid[n] for n in names))]
+
+    def rung_budgets(self) -> List[int]:
+        return [max(1, math.ceil(self.max_rounds / self.eta ** (self.n_rungs - 1 - rung)))
+                for rung in range(self.n_rungs)]
+
+    def fit(self, X, y) -> "SuccessiveHalvingSearch":
+        started = time.perf_counter()
+        X = np.asarray(X, dtype=np.float32)
+        y = np.asarray(y, dtype=np.float32)
+        folds = self._build_folds(X, y)
+        completed = self._load_results()
+
+        survivors = self.candidates()
+        for rung, budget in enumerate(self.rung_budgets()):
+            scored = []
+            for params in survivors:
+                key = _candidate_key(params)
+                record = completed.get((key, budget))
+                if record is None:
+                    record = self._evaluate(params, rung, budget, folds)
+                    self._save_result(record)
+                    completed[(key, budget)] = record
+                self.history_.append(record)
+                scored.append(record)
+
+            scored.sort(key=lambda r: r["score"], reverse=True)
+            if self.verbose:
+                print(f"Rung {rung}: {len(scored)} candidates x {budget} rounds, best R^2 {scored[0]['score']:.4f}")
+            survivors = [r["params"] for r in scored[:max(1, len(scored) // self.eta)]]
+
+        best = scored[0]
+        self.best_params_ = {**best["params"], "n_estimators": best["n_estimators"]}
+        self.best_score_ = best["score"]
+        self.elapsed_ = time.perf_counter() - started
+        return self
+
+    def best_estimator(self, X, y) -> xgb.XGBRegressor:
+        """Refit an XGBRegressor with the best parameters on the full training data."""
+        model = xgb.XGBRegressor(objective='reg:squarederror', random_state=self.random_state,
+                                 **self.best_params_)
+        model.fit(X, y)
+        return model
+
+    def _build_folds(self, X: np.ndarray, y: np.ndarray) -> List[Tuple[Any, Any, np.ndarray]]:
+        folds = []
+        splitter = KFold(n_splits=self.n_folds, shuffle=True, random_state=self.random_state)
+        for train_index, valid_index in splitter.split(X):
+            dtrain = xgb.QuantileDMatrix(X[train_index], y[train_index])
+            # Sharing the training sketch keeps validation bins aligned and skips re-sketching
+            dvalid = xgb.QuantileDMatrix(X[valid_index], y[valid_index], ref=dtrain)
+            folds.append((dtrain, dvalid, y[valid_index]))
+        return folds
+
+    def _evaluate(self, params: Dict[str, Any], rung: int, budget: int,
+                  folds: List[Tuple[Any, Any, np.ndarray]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        booster_params = {
+            "objective": "reg:squarederror",
+            "tree_method": "hist",
+            "eval_metric": "rmse",
+            "seed": self.random_state,
+            "max_depth": params["max_depth"],
+            "eta": params["learning_rate"],
+            "subsample": params["subsample"],
+            "colsample_bytree": params["colsample_bytree"],
+        }
+        fold_scores, best_rounds = [], []
+        for dtrain, dvalid, y_valid in folds:
+            booster = xgb.train(booster_params, dtrain, num_boost_round=budget,
+                                evals=[(dvalid, "valid")],
+                                early_stopping_rounds=self.early_stopping_rounds, verbose_eval=False)
+            rounds = booster.best_iteration + 1
+            predictions = booster.predict(dvalid, iteration_range=(0, rounds))
+            fold_scores.append(_r2(y_valid, predictions))
+            best_rounds.append(rounds)
+
+        return {
+            "key": _candidate_key(params),
+            "params": params,
+            "rung": rung,
+            "budget": budget,
+            "fold_scores": fold_scores,
+            "score": float(np.mean(fold_scores)),
+            "n_estimators": int(round(np.mean(best_rounds))),
+            "seconds": time.perf_counter() - started,
+        }
+
+    def _load_results(self) -> Dict[Tuple[str, int], Dict[str, Any]]:
+        completed = {}
+        if self.results_path and os.path.exists(self.results_path):
+            with open(self.results_path, "r", encoding="utf-8") as file:
+                for line in file:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A partially written last line from an interrupted run
+                        continue
+                    completed[(record["key"], record["budget"])] = record
+            if self.verbose and completed:
+                print(f"Resuming search: {len(completed)} candidate results loaded from {self.results_path}")
+        return completed
+
+    def _save_result(self, record: Dict[str, Any]) -> None:
+        if not self.results_path:
+            return
+        with open(self.results_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps(record) + "\n")
@@ -0,0 +1,329 @@
+# Local fast-path intent classifier for IntentRecognizer.
+#
+# A softmax (multinomial logistic) regression over hashed character n-grams, trained
+# with NumPy from logged (utterance, intent) pairs. Scoring one utterance is a sparse
+# gather over ~100 weight rows, well under a millisecond, so confident predictions skip
+# the Groq round trip; anything below the confidence threshold falls back to the LLM.
+#
+# Every LLM classification is appended to the intent log, which is the training data
+# for the next model. A small share of fast-path answers is re-checked against the LLM
+# in the background to measure agreement without adding latency.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config import settings
+from model_registry import model_registry
+from text_features import DEFAULT_N_FEATURES, DEFAULT_NGRAM_RANGE, hashed_ngram_matrix, hashed_ngrams, normalize_utterance
+
+INTENTS = ["dbquery", "service", "page_routing", "general"]
+SEED_LOG_PATH = "vyom_ml/data/intent_seed.jsonl"
+
+
+class FastIntentClassifier:
+    """Softmax regression over hashed n-gram features."""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, labels: Sequence[str],
+                 n_features: int = DEFAULT_N_FEATURES, ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)  # (n_features, n_labels)
+        self.bias = np.asarray(bias, dtype=np.float32)
+        self.labels = list(labels)
+        self.n_features = int(n_features)
+        self.ngram_range = tuple(int(n) for n in ngram_range)
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        logits = logits - logits.max(axis=-1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[str], n_features: int = DEFAULT_N_FEATURES,
+              ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE, epochs: int = 300,
+              learning_rate: float = 0.1, l2: float = 1e-4) -> "FastIntentClassifier":
+        """
+        Fit the classifier with full-batch Adam on the softmax cross-entropy.
+
+        Parameters:
+            texts: Raw utterances (normalised here)
+            labels: Intent label for each utterance
+        """
+        label_names = sorted(set(labels), key=lambda name: (INTENTS + [name]).index(name))
+        label_index = {name: i for i, name in enumerate(label_names)}
+        y = np.array([label_index[label] for label in labels], dtype=np.intp)
+        n_rows, n_labels = len(y), len(label_names)
+
+        indptr, indices, values = hashed_ngram_matrix((normalize_utterance(t) for t in texts), n_features, ngram_range)
+        row_of_value = np.repeat(np.arange(n_rows), np.diff(indptr))
+        targets = np.zeros((n_rows, n_labels), dtype=np.float32)
+        targets[np.arange(n_rows), y] = 1.0
+
+        weights = np.zeros((n_features, n_labels), dtype=np.float32)
+        bias = np.zeros(n_labels, dtype=np.float32)
+        params = [weights, bias]
+        moments = [(np.zeros_like(p), np.zeros_like(p)) for p in params]
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+        for step in range(1, epochs + 1):
+            logits = np.add.reduceat(weights[indices] * values[:, None], indptr[:-1], axis=0) + bias
+            error = (cls._softmax(logits) - targets) / n_rows
+            grad_w = np.stack([np.bincount(indices, weights=values * error[row_of_value, k], minlength=n_features)
+                               for k in range(n_labels)], axis=1).astype(np.float32) + l2 * weights
+            grad_b = error.sum(axis=0)
+            for param, grad, (m, v) in zip(params, (grad_w, grad_b), moments):
+                m *= beta1
+                m += (1 - beta1) * grad
+                v *= beta2
+                v += (1 - beta2) * grad * grad
+                param -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+
+        return cls(weights, bias, label_names, n_features, ngram_range)
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Class probabilities for a batch of raw utterances, shape (rows, labels)."""
+        indptr, indices, values = hashed_ngram_matrix((normalize_utterance(t) for t in texts),
+                                                      self.n_features, self.ngram_range)
+        if len(indptr) == 1:
+            return np.empty((0, len(self.labels)), dtype=np.float32)
+        logits = np.add.reduceat(self.weights[indices] * values[:, None], indptr[:-1], axis=0) + self.bias
+        return self._softmax(logits)
+
+    def classify(self, query: str) -> Tuple[str, float]:
+        """Most likely intent and its probability for a single utterance."""
+        indices, values = hashed_ngrams(normalize_utterance(query), self.n_features, self.ngram_range)
+        probabilities = self._softmax(values @ self.weights[indices] + self.bias)
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            np.savez(file, weights=self.weights, bias=self.bias, labels=np.array(self.labels),
+                     n_features=self.n_features, ngram_range=np.array(self.ngram_range))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "FastIntentClassifier":
+        with np.load(path) as data:
+            return cls(data["weights"], data["bias"], [str(label) for label in data["labels"]],
+                       int(data["n_features"]), tuple(data["ngram_range"]))
+
+
+def load_intent_log(*paths: str) -> Tuple[List[str], List[str]]:
+    """Read (utterance, intent) pairs from JSON-lines logs; later entries win for repeated utterances."""
+    pairs: Dict[str, Tuple[str, str]] = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if record.get("intent") in INTENTS:
+                    pairs[normalize_utterance(record["utterance"])] = (record["utterance"], record["intent"])
+    texts = [utterance for utterance, _ in pairs.values()]
+    labels = [intent for _, intent in pairs.values()]
+    return texts, labels
+
+
+class FastPathMetrics:
+    """Thread-safe counters for fast-path hit rate and agreement with the LLM."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.fast_hits = 0
+        self.llm_fallbacks = 0
+        self.fast_seconds = 0.0
+        # Fast-path answers re-checked by the LLM in the background
+        self.shadow_checks = 0
+        self.shadow_agreements = 0
+        # Below-threshold guesses compared with the LLM answer that replaced them
+        self.fallback_agreements = 0
+
+    def record(self, **increments) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "fast_hits": self.fast_hits,
+                "llm_fallbacks": self.llm_fallbacks,
+                "hit_rate": self.fast_hits / self.requests if self.requests else 0.0,
+                "mean_fast_ms": 1e3 * self.fast_seconds / self.requests if self.requests else 0.0,
+                "shadow_checks": self.shadow_checks,
+                "shadow_agreement": self.shadow_agreements / self.shadow_checks if self.shadow_checks else None,
+                "fallback_agreement": self.fallback_agreements / self.llm_fallbacks if self.llm_fallbacks else None,
+            }
+
+
+class IntentFastPath:
+    """
+    Confidence-gated local classifier placed in front of the LLM intent chain.
+
+    The model file is loaded through the model registry, so retraining it swaps the
+    classifier in without a restart; if it does not exist yet every query goes to the LLM.
+    """
+
+    def __init__(self, model_path: Optional[str] = None, threshold: Optional[float] = None,
+                 shadow_rate: Optional[float] = None, log_path: Optional[str] = None):
+        self.model_path = model_path or settings.INTENT_MODEL_PATH
+        self.threshold = settings.INTENT_FAST_PATH_THRESHOLD if threshold is None else threshold
+        self.shadow_rate = settings.INTENT_SHADOW_RATE if shadow_rate is None else shadow_rate
+        self.log_path = settings.INTENT_LOG_PATH if log_path is None else log_path
+        directory = os.path.dirname(self.log_path)
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                print(f"Could not create intent log directory {directory}: {e}")
+        self.metrics = FastPathMetrics()
+        self._log_lock = threading.Lock()
+        self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="intent-shadow")
+        self._shadow_slot = threading.Semaphore(1)
+
+    @property
+    def model(self) -> Optional[FastIntentClassifier]:
+        if not os.path.exists(self.model_path):
+            return None
+        return model_registry.get(self.model_path, loader=FastIntentClassifier.load)
+
+    def log(self, query: str, intent: str, source: str) -> None:
+        """Append an LLM-labelled utterance to the training log."""
+        if not self.log_path:
+            return
+        record = json.dumps({"utterance": query, "intent": intent, "source": source, "ts": time.time()})
+        try:
+            with self._log_lock:
+                with open(self.log_path, "a", encoding="utf-8") as file:
+                    file.write(record + "\n")
+        except OSError as e:
+            print(f"Could not write intent log {self.log_path}: {e}")
+
+    def _predict(self, query: str) -> Tuple[Optional[str], bool]:
+        """Fast-path guess for `query` and whether it clears the confidence threshold."""
+        model = self.model
+        if model is None:
+            self.metrics.record(requests=1)
+            return None, False
+        started = time.perf_counter()
+        guess, confidence = model.classify(query)
+        self.metrics.record(requests=1, fast_seconds=time.perf_counter() - started)
+        if confidence >= self.threshold:
+            self.metrics.record(fast_hits=1)
+            return guess, True
+        return guess, False
+
+    def probability(self, query: str, intent: str) -> Optional[float]:
+        """Fast-path probability of `intent` for `query`, or None while no model is trained."""
+        model = self.model
+        if model is None:
+            return None
+        if intent not in model.labels:
+            return 0.0
+        return float(model.predict_proba([query])[0, model.labels.index(intent)])
+
+    def _record_fallback(self, query: str, guess: Optional[str], intent: str) -> None:
+        self.metrics.record(llm_fallbacks=1, fallback_agreements=int(guess == intent))
+        self.log(query, intent, "llm")
+
+    def _record_shadow(self, query: str, guess: str, intent: str) -> None:
+        self.metrics.record(shadow_checks=1, shadow_agreements=int(intent == guess))
+        self.log(query, intent, "shadow")
+
+    def _sample_shadow(self) -> bool:
+        # Drop the sample rather than queue up LLM calls when a shadow check is still running
+        return bool(self.shadow_rate) and random.random() < self.shadow_rate and self._shadow_slot.acquire(blocking=False)
+
+    def classify(self, query: str, llm_classify: Callable[[str], str]) -> str:
+        """
+        Return the intent for `query`, answering locally when the classifier is confident
+        and calling `llm_classify` otherwise.
+        """
+        guess, confident = self._predict(query)
+        if confident:
+            if self._sample_shadow():
+                self._shadow_pool.submit(self._shadow_check, query, guess, llm_classify)
+            return guess
+
+        intent = llm_classify(query)
+        self._record_fallback(query, guess, intent)
+        return intent
+
+    async def aclassify(self, query: str, llm_classify: Callable[[str], Awaitable[str]]) -> str:
+        """Async variant of classify; shadow checks run as background tasks on the current loop."""
+        guess, confident = self._predict(query)
+        if confident:
+            if self._sample_shadow():
+                asyncio.get_running_loop().create_task(self._ashadow_check(query, guess, llm_classify))
+            return guess
+
+        intent = await llm_classify(query)
+        self._record_fallback(query, guess, intent)
+        return intent
+
+    def _shadow_check(self, query: str, guess: str, llm_classify: Callable[[str], str]) -> None:
+        try:
+            self._record_shadow(query, guess, llm_classify(query))
+        except Exception as e:
+            print(f"Intent shadow check failed: {e}")
+        finally:
+            self._shadow_slot.release()
+
+    async def _ashadow_check(self, query: str, guess: str, llm_classify: Callable[[str], Awaitable[str]]) -> None:
+        try:
+            self._record_shadow(query, guess, await llm_classify(query))
+        except Exception as e:
+            print(f"Intent shadow check failed: {e}")
+        finally:
+            self._shadow_slot.release()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the fast-path intent classifier from logged utterances.")
+    parser.add_argument("--log", nargs="+", default=[SEED_LOG_PATH, settings.INTENT_LOG_PATH],
+                        help="JSON-lines files of {\"utterance\": ..., \"intent\": ...}")
+    parser.add_argument("--output", default=settings.INTENT_MODEL_PATH)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--holdout", type=float, default=0.2,
+                        help="Share of utterances held out to report accuracy and threshold coverage")
+    args = parser.parse_args()
+
+    texts, labels = load_intent_log(*args.log)
+    if not texts:
+        raise SystemExit(f"No labelled utterances found in {args.log}")
+    print(f"Loaded {len(texts)} labelled utterances")
+
+    order = np.random.default_rng(0).permutation(len(texts))
+    n_holdout = int(len(texts) * args.holdout)
+    if n_holdout:
+        held, train = order[:n_holdout], order[n_holdout:]
+        model = FastIntentClassifier.train([texts[i] for i in train], [labels[i] for i in train], epochs=args.epochs)
+        probabilities = model.predict_proba([texts[i] for i in held])
+        predicted = np.array(model.labels)[probabilities.argmax(axis=1)]
+        expected = np.array([labels[i] for i in held])
+        confident = probabilities.max(axis=1) >= settings.INTENT_FAST_PATH_THRESHOLD
+        print(f"Holdout accuracy {np.mean(predicted == expected):.3f}; "
+              f"{confident.mean():.1%} above threshold {settings.INTENT_FAST_PATH_THRESHOLD} "
+              f"with accuracy {np.mean(predicted[confident] == expected[confident]) if confident.any() else float('nan'):.3f}")
+
+    model = FastIntentClassifier.train(texts, labels, epochs=args.epochs)
+    model.save(args.output)
+
+    started = time.perf_counter()
+    for text in texts[:1000]:
+        model.classify(text)
+    print(f"Single-utterance latency: {1e3 * (time.perf_counter() - started) / min(len(texts), 1000):.3f} ms")
+    print(f"Model saved as {args.output}")
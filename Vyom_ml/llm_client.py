@@ -0,0 +1,126 @@
+# Shared LLM client for all agents.
+#
+# One ChatGroq instance per process, backed by keep-alive httpx clients so TLS
+# connections to Groq are reused across requests. Prompt chains are compiled once by
+# name and every call goes through a concurrency limit, so a burst of conversations
+# cannot open an unbounded number of upstream requests.
+
+import asyncio
+import threading
+import weakref
+from typing import Any, Dict, Optional
+import httpx
+from langchain_groq import ChatGroq
+from config import settings
+
+
+class PooledChain:
+    """A compiled runnable whose invoke/ainvoke/astream calls share the pool's concurrency limit."""
+
+    def __init__(self, pool: "LLMClientPool", name: str, runnable):
+        self.pool = pool
+        self.name = name
+        self.runnable = runnable
+
+    def invoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None):
+        with self.pool._semaphore:
+            return self.runnable.invoke(inputs, config=config)
+
+    async def ainvoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None):
+        async with self.pool._async_semaphore():
+            return await self.runnable.ainvoke(inputs, config=config)
+
+    async def astream(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None):
+        # The concurrency slot is held until the stream is exhausted or closed
+        async with self.pool._async_semaphore():
+            async for chunk in self.runnable.astream(inputs, config=config):
+                yield chunk
+
+
+class LLMClientPool:
+    """
+    Process-wide LLM client with keep-alive HTTP connections and bounded concurrency.
+
+    Create it once at startup (or use `get_llm_pool()`) and pass it to the agents;
+    `chain(name, prompt)` compiles `prompt | model` on first use and returns the same
+    PooledChain afterwards.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None, base_url: Optional[str] = None,
+                 max_connections: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        max_connections = max_connections or settings.LLM_MAX_CONNECTIONS
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY
+        timeout = timeout or settings.LLM_TIMEOUT_SECONDS
+
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                              keepalive_expiry=settings.LLM_KEEPALIVE_SECONDS)
+        self.http_client = httpx.Client(limits=limits, timeout=timeout)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+        self.model = ChatGroq(
+            api_key=api_key or settings.GROQ_API_KEY,
+            model=model or settings.LLM_MODEL_NAME,
+            groq_api_base=base_url or settings.GROQ_API_BASE or None,
+            request_timeout=timeout,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+        )
+
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        # asyncio semaphores belong to one event loop, so keep one per loop
+        self._async_semaphores: "weakref.WeakKeyDictionary[Any, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+        self._chains: Dict[str, PooledChain] = {}
+        self._lock = threading.Lock()
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._async_semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._async_semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+            return semaphore
+
+    def chain(self, name: str, prompt) -> PooledChain:
+        """Return the compiled `prompt | model` chain registered under `name`."""
+        with self._lock:
+            if name not in self._chains:
+                self._chains[name] = PooledChain(self, name, prompt | self.model)
+            return self._chains[name]
+
+    def wrap(self, name: str, runnable) -> PooledChain:
+        """
+        Put an already-built runnable (e.g. a RunnableWithMessageHistory) behind the pool's
+        limit. Unlike `chain`, the result is not registered, since it may hold per-caller state.
+        """
+        return PooledChain(self, name, runnable)
+
+    def close(self) -> None:
+        self.http_client.close()
+        try:
+            asyncio.get_running_loop().create_task(self.http_async_client.aclose())
+        except RuntimeError:
+            asyncio.run(self.http_async_client.aclose())
+
+
+def compile_chain(model, name: str, prompt):
+    """
+    Compile `prompt` against either an LLMClientPool (cached, pooled chain) or a plain
+    chat model (`prompt | model`), so agents accept both.
+    """
+    if isinstance(model, LLMClientPool):
+        return model.chain(name, prompt)
+    return prompt | model
+
+
+_pools: Dict[str, LLMClientPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_llm_pool(api_key: Optional[str] = None) -> LLMClientPool:
+    """Return the process-wide LLMClientPool (one per API key), creating it on first use."""
+    api_key = api_key or settings.GROQ_API_KEY
+    with _pools_lock:
+        if api_key not in _pools:
+            _pools[api_key] = LLMClientPool(api_key=api_key)
+        return _pools[api_key]
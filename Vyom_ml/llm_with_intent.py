@@ -1,7 +1,8 @@
 import os
+import asyncio
+import time
 # import sqlite3
-from typing import Dict, List, Optional, Tuple, Any
-from langchain_groq import ChatGroq
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Any
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import AIMessage, HumanMessage, BaseMessage, SystemMessage
 from langchain_core.runnables.history import RunnableWithMessageHistory
@@ -14,40 +15,35 @@ from config import settings
 # from service_handler import handle_service_request
 # from page_routing_handler import handle_page_routing
 
-from info_retrieval_agent import get_query_from_llm
+from info_retrieval_agent import adescribe_schema, aget_query_from_llm, aquery_postgresql, query_postgresql
+from info_retrieval_agent import schema_is_cached, schema_version
 from service_retrieval_agent import BankingServiceAgent
-from service_retrieval_agent import generate_ticket
+from service_retrieval_agent import agenerate_ticket, generate_ticket, service_classifier
 from routing_agent import PageRoutingAgent
-
-# Chat history management
-class InMemoryHistory(BaseChatMessageHistory):
-    def __init__(self):
-        self.messages: List[BaseMessage] = []
-    
-    def add_message(self, message: BaseMessage) -> None:
-        self.messages.append(message)
-    
-    def clear(self) -> None:
-        self.messages = []
-
-# Message store that returns proper chat history objects
-class MessageStore:
-    def __init__(self):
-        self.store: Dict[str, InMemoryHistory] = {}
-    
-    def get_session_history(self, session_id: str) -> BaseChatMessageHistory:
-        if session_id not in self.store:
-            self.store[session_id] = InMemoryHistory()
-        return self.store[session_id]
+from intent_fast_path import IntentFastPath
+from classification_cache import ClassificationCache, classification_cache
+from llm_client import LLMClientPool, compile_chain, get_llm_pool
+from async_utils import run_sync
+from turn_metrics import LatencyRecorder
+from chat_history import InMemoryHistory, MessageStore, llm_summarizer
+from session_store import SessionStore, StateSync, get_session_store
+from sql_template_cache import sql_template_cache
+from result_cache import result_cache
+from ticket_client import is_confirmed
 
 # Authentication state management
 class AuthenticationState:
-    def __init__(self):
+    def __init__(self, backend: Optional[SessionStore] = None):
         self.state: Dict[str, Dict] = {}
+        # Persist state so a restart or another worker can continue the session
+        self._sync = StateSync(backend, "assistant_auth", self.state) if backend is not None else None
     
     def get_state(self, session_id: str) -> Dict:
+        if self._sync is not None:
+            self._sync.refresh(session_id)
         if session_id not in self.state:
             self.state[session_id] = {
+                'user_id': None,  # Customer the server bound to this session
                 'authenticated': False,
                 'pending_intent': None,
                 'pending_query': None,
@@ -57,17 +53,29 @@ class AuthenticationState:
     
     def reset_state(self, session_id: str) -> None:
         if session_id in self.state:
+            # The session still belongs to the same customer
             self.state[session_id] = {
+                'user_id': self.state[session_id].get('user_id'),
                 'authenticated': False,
                 'pending_intent': None,
                 'pending_query': None,
                 'system_response': None
             }
+            self.save_state(session_id)
+    
+    def save_state(self, session_id: str) -> None:
+        """Write the session's state to the session store after changing it."""
+        if self._sync is not None:
+            self._sync.save(session_id)
 
 # Intent recognition using Groq LLM
 class IntentRecognizer:
-    def __init__(self, model):
+    def __init__(self, model, fast_path: Optional[IntentFastPath] = None, cache: Optional[ClassificationCache] = None):
         self.model = model
+        # Local classifier that answers confident queries without calling the LLM
+        self.fast_path = fast_path
+        # Shared cache of earlier LLM classifications
+        self.cache = cache
         
         # Improved prompt template for intent detection
         self.intent_prompt = ChatPromptTemplate.from_messages([
@@ -96,16 +104,56 @@ class IntentRecognizer:
             ("human", "{question}")
         ])
         
-        self.intent_chain = self.intent_prompt | self.model
+        self.intent_chain = compile_chain(self.model, "intent", self.intent_prompt)
     
     def detect_intent(self, query: str) -> str:
+        """
+        Classify the user query into one of the predefined intents.
+        Confident fast-path predictions are returned directly; otherwise the Groq LLama model is used.
+        Returns the intent as a string.
+        """
+        if self.fast_path is not None:
+            return self.fast_path.classify(query, self.detect_intent_with_llm)
+        return self.detect_intent_with_llm(query)
+    
+    def detect_intent_with_llm(self, query: str) -> str:
+        """
+        Use the Groq LLama model to classify the user query, reusing a cached answer when available.
+        Returns the intent as a string.
+        """
+        if self.cache is not None:
+            return self.cache.get_or_compute("intent", query, self.classify_with_llm)
+        return self.classify_with_llm(query)
+    
+    def classify_with_llm(self, query: str) -> str:
         """
         Use the Groq LLama model to classify the user query into one of the predefined intents.
         Returns the intent as a string.
         """
         response = self.intent_chain.invoke({"question": query})
+        return self._parse_intent(response.content)
+    
+    async def adetect_intent(self, query: str) -> str:
+        """
+        Async variant of detect_intent.
+        """
+        if self.fast_path is not None:
+            return await self.fast_path.aclassify(query, self.adetect_intent_with_llm)
+        return await self.adetect_intent_with_llm(query)
+    
+    async def adetect_intent_with_llm(self, query: str) -> str:
+        if self.cache is not None:
+            return await self.cache.aget_or_compute("intent", query, self.aclassify_with_llm)
+        return await self.aclassify_with_llm(query)
+    
+    async def aclassify_with_llm(self, query: str) -> str:
+        response = await self.intent_chain.ainvoke({"question": query})
+        return self._parse_intent(response.content)
+    
+    @staticmethod
+    def _parse_intent(content: str) -> str:
         # Extract the intent from the response and normalize
-        intent = response.content.strip().lower()
+        intent = content.strip().lower()
         
         # Validate that the response is one of our expected intents
         valid_intents = ["dbquery", "service", "page_routing", "general"]
@@ -162,26 +210,56 @@ class AuthRequirementChecker:
         return default_requirement
 
 # db query integrate karunga 
-def handle_db_query(session_id: str, user_input: str, query_details: Dict = None) -> str:
+def handle_db_query(user_id: str, user_input: str, query_details: Dict = None, llm=None) -> Dict:
     """
-    Simulate database query handler that returns mock data.
-    In a real implementation, this function would be imported from db_query_handler.py
+    Generate SQL for the user's question and run it against the customer database.
+    `user_id` is the session's customer (BankingAssistant.session_user), given to the SQL prompt as the username.
     """
-    result = get_query_from_llm(user_input, "user121")
-    return result
+    return query_postgresql(user_input, username=user_id, llm=llm)
+
+
+async def ahandle_db_query(user_id: str, user_input: str, query_details: Dict = None, llm=None, query: Optional[str] = None) -> Dict:
+    """
+    Async variant of handle_db_query. A `query` generated ahead of time skips the SQL LLM call.
+    """
+    return await aquery_postgresql(user_input, username=user_id, llm=llm, query=query)
                                                            
             
 
-def handle_service_request(session_id: str, user_input: str) -> str:
+def handle_service_request(user_id: str, user_input: str, service_agent: Optional[BankingServiceAgent] = None) -> str:
     """
     Simulate service request handler.
     In a real implementation, this function would be imported from service_handler.py
     """
-    # Initialize LLM Model
-    LLM_MODEL = ChatGroq(api_key=settings.GROQ_API_KEY, model="llama-3.1-8b-instant")
-    service_agent = BankingServiceAgent(LLM_MODEL)
+    # Reuse the caller's agent; otherwise build one on the shared pool (its chain is compiled once)
+    if service_agent is None:
+        service_agent = BankingServiceAgent(get_llm_pool(), cache=classification_cache,
+                                            local_classifier=service_classifier)
     identified_service = service_agent.get_service(user_input)
-    ticket_number = generate_ticket("user123",user_input,identified_service)
+    ticket_number = generate_ticket(user_id,user_input,identified_service)
+    if is_confirmed(ticket_number):
+        service_classifier.learn(user_input, identified_service)
+    # The request may change the customer's data; drop their cached results
+    result_cache.invalidate(user_id)
+    
+    return [identified_service,ticket_number]
+
+
+async def ahandle_service_request(user_id: str, user_input: str, service_agent: Optional[BankingServiceAgent] = None,
+                                  identified_service: Optional[str] = None) -> str:
+    """
+    Async variant of handle_service_request. An `identified_service` classified ahead of
+    time skips the classification call; the ticket is always raised here.
+    """
+    if identified_service is None:
+        if service_agent is None:
+            service_agent = BankingServiceAgent(get_llm_pool(), cache=classification_cache,
+                                                local_classifier=service_classifier)
+        identified_service = await service_agent.aget_service(user_input)
+    ticket_number = await agenerate_ticket(user_id,user_input,identified_service)
+    if is_confirmed(ticket_number):
+        service_classifier.learn(user_input, identified_service)
+    result_cache.invalidate(user_id)
     
     return [identified_service,ticket_number]
     
@@ -218,17 +296,27 @@ def perform_face_authentication(session_id: str) -> bool:
 
 # Main application class
 class BankingAssistant:
-    def __init__(self, groq_api_key):
-        # Create the LLM model using Groq
-        self.model = ChatGroq(
-            api_key=groq_api_key,
-            model="llama-3.1-8b-instant"
-        )
+    def __init__(self, groq_api_key, llm_pool: Optional[LLMClientPool] = None, speculative: Optional[bool] = None):
+        # Shared Groq client with keep-alive connections and pre-compiled chains
+        self.llm_pool = llm_pool or get_llm_pool(groq_api_key)
+        self.model = self.llm_pool.model
+        
+        # Start side-effect-free handlers while the intent is still being detected
+        self.speculative = settings.SPECULATIVE_EXECUTION if speculative is None else speculative
+        self.speculative_handlers = set(settings.SPECULATIVE_HANDLERS) - {"general"}
+        self.speculation_stats = {"turns": 0, "skipped": 0, "launched": 0, "used": 0, "cancelled": 0}
+        # Per-turn latency, labelled "speculative" or "sequential"
+        self.turn_latency = LatencyRecorder()
         
         # Initialize components
-        self.message_store = MessageStore()
-        self.auth_state = AuthenticationState()
-        self.intent_recognizer = IntentRecognizer(self.model)
+        # Bounded per-session history; RunnableWithMessageHistory records both sides of each turn
+        summarizer = llm_summarizer(self.llm_pool) if settings.HISTORY_SUMMARIZE else None
+        session_store = get_session_store()
+        self.message_store = MessageStore(summarizer=summarizer, backend=session_store)
+        self.auth_state = AuthenticationState(session_store)
+        self.intent_recognizer = IntentRecognizer(self.llm_pool, fast_path=IntentFastPath(), cache=classification_cache)
+        self.service_agent = BankingServiceAgent(self.llm_pool, cache=classification_cache,
+                                                 local_classifier=service_classifier)
         self.auth_checker = AuthRequirementChecker()
         
         # Create an improved prompt template for general conversations
@@ -256,33 +344,184 @@ class BankingAssistant:
         ])
         
         # Create the chain with history for general conversations
-        self.chain_with_history = RunnableWithMessageHistory(
+        self.chain_with_history = self.llm_pool.wrap("general", RunnableWithMessageHistory(
             self.prompt | self.model,
             self.message_store.get_session_history,
             input_messages_key="question",
             history_messages_key="history"
-        )
+        ))
     
-    def handle_general_query(self, session_id: str, user_input: str, system_info: str = "") -> str:
+    async def ahandle_general_query(self, session_id: str, user_input: str, system_info: str = "") -> str:
         """
         Use the Groq LLama model to handle general banking queries.
         """
-        response = self.chain_with_history.invoke(
+        response = await self.chain_with_history.ainvoke(
             {"question": user_input, "system_info": system_info},
             config={"configurable": {"session_id": session_id}}
         )
         return response.content
     
-    def process_message(self, session_id: str, user_input: str) -> str:
+    async def astream_general_query(self, session_id: str, user_input: str, system_info: str = "") -> AsyncIterator[str]:
+        """
+        Stream the reply to a general query as text chunks while the model generates it.
+        The question and the full reply are saved to the session history when the stream completes.
+        """
+        async for chunk in self.chain_with_history.astream(
+            {"question": user_input, "system_info": system_info},
+            config={"configurable": {"session_id": session_id}}
+        ):
+            if chunk.content:
+                yield chunk.content
+    
+    def handle_general_query(self, session_id: str, user_input: str, system_info: str = "") -> str:
+        """
+        Synchronous wrapper around ahandle_general_query.
+        """
+        return run_sync(self.ahandle_general_query(session_id, user_input, system_info))
+    
+    def bind_user(self, session_id: str, user_id: Optional[str]) -> None:
+        """
+        Record the customer the server authenticated for `session_id` (see session_auth).
+        A session is never handed to a different customer: its state starts over instead.
+        """
+        if not user_id:
+            return
+        state = self.auth_state.get_state(session_id)
+        if state.get('user_id') not in (None, user_id):
+            self.auth_state.reset_state(session_id)
+            self.message_store.clear_session(session_id)
+        self.auth_state.get_state(session_id)['user_id'] = user_id
+
+    def session_user(self, session_id: str) -> str:
+        """
+        Customer whose data the session may query and whose tickets it raises: the user bound
+        by bind_user, or for in-process callers that bind none, the session itself.
+        """
+        return self.auth_state.get_state(session_id).get('user_id') or session_id
+
+    async def aprocess_message(self, session_id: str, user_input: str, user_id: Optional[str] = None) -> str:
         """
         Main function to process user messages and route them to appropriate handlers.
+        Every LLM, database and ticket call is awaited, so concurrent sessions share the event loop.
+        The turn latency is recorded in self.turn_latency.
+        `user_id` is the customer the server authenticated for the session (see bind_user).
+        """
+        started = time.perf_counter()
+        try:
+            self.bind_user(session_id, user_id)
+            system_info = await self._aprepare_turn(session_id, user_input)
+            return await self.ahandle_general_query(session_id, user_input, system_info)
+        finally:
+            self.auth_state.save_state(session_id)
+            self.turn_latency.record(self._latency_label(), time.perf_counter() - started)
+    
+    async def astream_message(self, session_id: str, user_input: str, user_id: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Streaming variant of aprocess_message: runs the same pipeline, then yields the reply
+        text as the LLM generates it. History is updated once the stream completes.
+        Time to the first chunk is recorded in self.turn_latency under "<mode>_first_chunk".
+        """
+        started = time.perf_counter()
+        label = self._latency_label()
+        try:
+            self.bind_user(session_id, user_id)
+            system_info = await self._aprepare_turn(session_id, user_input)
+            first_chunk = True
+            async for text in self.astream_general_query(session_id, user_input, system_info):
+                if first_chunk:
+                    self.turn_latency.record(f"{label}_first_chunk", time.perf_counter() - started)
+                    first_chunk = False
+                yield text
+        finally:
+            self.auth_state.save_state(session_id)
+            self.turn_latency.record(label, time.perf_counter() - started)
+    
+    def _latency_label(self) -> str:
+        return "speculative" if self.speculative else "sequential"
+    
+    async def _adetect_intent_speculatively(self, session_id: str, user_input: str) -> Tuple[str, Dict[str, Any]]:
+        """
+        Detect the intent while the side-effect-free handlers it may lead to run alongside.
+        
+        Returns:
+            tuple: (intent, prepared) where prepared holds the detected intent's head start
+                   (a result or a still-running task), if any; the other branches are cancelled.
+        """
+        intent_task = asyncio.ensure_future(self.intent_recognizer.adetect_intent(user_input))
+        # Fast-path and cached intents resolve without waiting; don't pay for speculation then
+        await asyncio.sleep(0)
+        if intent_task.done():
+            self.speculation_stats["skipped"] += 1
+            return intent_task.result(), {}
+        
+        # Only handlers without side effects: SQL is generated but not executed, the service
+        # is classified but no ticket is raised, routing is a local lookup
+        branches: Dict[str, Any] = {}
+        if "dbquery" in self.speculative_handlers and self._dbquery_likely(user_input):
+            branches["dbquery"] = asyncio.ensure_future(self._aspeculate_sql(session_id, user_input))
+        if "service" in self.speculative_handlers:
+            branches["service"] = asyncio.ensure_future(self.service_agent.aget_service(user_input))
+        if "page_routing" in self.speculative_handlers:
+            branches["page_routing"] = handle_page_routing(session_id, user_input)
+        self.speculation_stats["launched"] += len(branches)
+        
+        try:
+            intent = await intent_task
+        except BaseException:
+            self._cancel_branches(branches.values())
+            raise
+        prepared = {intent: branches.pop(intent)} if intent in branches else {}
+        self.speculation_stats["used"] += len(prepared)
+        self._cancel_branches(branches.values())
+        return intent, prepared
+    
+    def _dbquery_likely(self, user_input: str) -> bool:
+        """
+        Whether generating SQL ahead is worth an LLM call: the fast-path model gives
+        "dbquery" a fair chance or, without a model, the schema needs no database round trip.
+        """
+        fast_path = self.intent_recognizer.fast_path
+        probability = fast_path.probability(user_input, "dbquery") if fast_path is not None else None
+        if probability is None:
+            return schema_is_cached()
+        return probability >= settings.SPECULATIVE_DBQUERY_MIN_PROBABILITY
+
+    async def _aspeculate_sql(self, session_id: str, user_input: str) -> Optional[str]:
+        # The schema lookup runs inside the branch, so a slow database never delays the turn.
+        # A cached SQL template answers the question without the LLM: nothing to generate.
+        schema_description = await adescribe_schema(user_input)
+        if sql_template_cache.contains(user_input, schema_version()):
+            return None
+        return await aget_query_from_llm(user_input, schema_description, self.session_user(session_id), llm=self.llm_pool)
+
+    def _cancel_branches(self, branches) -> None:
+        for branch in branches:
+            if isinstance(branch, asyncio.Future) and not branch.done():
+                branch.cancel()
+                self.speculation_stats["cancelled"] += 1
+    
+    @staticmethod
+    async def _aprepared_result(prepared: Optional[Dict[str, Any]], intent: str) -> Any:
+        # Result of a speculative branch, or None when there is none or it failed
+        if not prepared or intent not in prepared:
+            return None
+        branch = prepared[intent]
+        if not isinstance(branch, asyncio.Future):
+            return branch
+        try:
+            return await branch
+        except Exception as e:
+            print(f"Speculative {intent} branch failed, running it again: {e}")
+            return None
+    
+    async def _aprepare_turn(self, session_id: str, user_input: str) -> str:
+        """
+        Run intent detection, authentication and the intent's handler for one turn.
+        Returns the system_info for the reply prompt.
         """
         # Get authentication state
         state = self.auth_state.get_state(session_id)
         
-        # Add user message to history
-        self.message_store.get_session_history(session_id).add_message(HumanMessage(content=user_input))
-        
         # If we have a pending intent and are now returning from authentication
         if state.get('pending_intent') and state.get('authenticated'):
             intent = state['pending_intent']
@@ -293,20 +532,20 @@ class BankingAssistant:
             state['pending_query'] = None
             
             # Process the original request now that authentication is complete
-            system_response = self.process_intent(session_id, intent, user_input, query_details)
+            system_response = await self.aprocess_intent(session_id, intent, user_input, query_details)
             
             # Store system response data for LLM to use
             state['system_response'] = system_response
             
             # Use LLM to generate natural response using the system data
-            return self.handle_general_query(
-                session_id, 
-                user_input, 
-                f"System response: {system_response}"
-            )
+            return f"System response: {system_response}"
         
-        # Step 1: Use LLM to recognize intent
-        intent = self.intent_recognizer.detect_intent(user_input)
+        # Step 1: Use LLM to recognize intent, speculatively preparing the likely handlers
+        self.speculation_stats["turns"] += 1
+        if self.speculative:
+            intent, prepared = await self._adetect_intent_speculatively(session_id, user_input)
+        else:
+            intent, prepared = await self.intent_recognizer.adetect_intent(user_input), {}
         
         # Step 2: Get additional query details if needed
         query_details = {"query": user_input}  # Simplified; your actual implementation may vary
@@ -317,6 +556,7 @@ class BankingAssistant:
         # Step 4: Handle authentication if needed
         if requires_auth and not state['authenticated']:
             # Store the intent and query for after authentication
+            # (speculative work only survives if authentication succeeds right away)
             state['pending_intent'] = intent
             state['pending_query'] = query_details
             
@@ -327,70 +567,58 @@ class BankingAssistant:
                 state['authenticated'] = True
                 
                 # Process the original intent now that authentication is successful
-                system_response = self.process_intent(session_id, intent, user_input, query_details)
+                system_response = await self.aprocess_intent(session_id, intent, user_input, query_details, prepared)
                 
                 # Store system response data for LLM to use
                 state['system_response'] = system_response
                 
                 # Use LLM to generate natural response that includes authentication success
-                llm_prompt = f"The user has been successfully authenticated. System response: {system_response}"
-                response = self.handle_general_query(session_id, user_input, llm_prompt)
-                
-                # Add response to history
-                self.message_store.get_session_history(session_id).add_message(AIMessage(content=response))
-                
-                return response
+                return f"The user has been successfully authenticated. System response: {system_response}"
             else:
                 # Authentication failed
+                self._cancel_branches(prepared.values())
                 state['pending_intent'] = None
                 state['pending_query'] = None
                 
                 # Use LLM to generate a natural response for auth failure
-                response = self.handle_general_query(
-                    session_id, 
-                    user_input, 
-                    "Authentication has failed. Please advise the user to try again or contact customer support."
-                )
-                
-                # Add response to history
-                self.message_store.get_session_history(session_id).add_message(AIMessage(content=response))
-                
-                return response
+                return "Authentication has failed. Please advise the user to try again or contact customer support."
         
         # Step 5: Process the intent if no authentication needed or already authenticated
-        system_response = self.process_intent(session_id, intent, user_input, query_details)
+        system_response = await self.aprocess_intent(session_id, intent, user_input, query_details, prepared)
         
         # Store system response data for LLM to use
         state['system_response'] = system_response
         
         # Use LLM to generate natural response using the system data
-        response = self.handle_general_query(
-            session_id, 
-            user_input, 
-            f"System response: {system_response}"
-        )
-        
-        # Add response to history
-        self.message_store.get_session_history(session_id).add_message(AIMessage(content=response))
-        
-        return response
+        return f"System response: {system_response}"
     
-    def process_intent(self, session_id: str, intent: str, user_input: str, query_details: Dict[str, Any] = None) -> Dict:
+    def process_message(self, session_id: str, user_input: str, user_id: Optional[str] = None) -> str:
+        """
+        Synchronous wrapper around aprocess_message for existing callers.
+        """
+        return run_sync(self.aprocess_message(session_id, user_input, user_id))
+    
+    async def aprocess_intent(self, session_id: str, intent: str, user_input: str, query_details: Dict[str, Any] = None,
+                              prepared: Optional[Dict[str, Any]] = None) -> Dict:
         """
         Process the recognized intent and route to the appropriate handler.
+        `prepared` holds speculative work for the intent (generated SQL, classified service,
+        routing result), which is used instead of repeating it.
         Returns structured data that the LLM can use to generate a natural response.
         """
+        head_start = await self._aprepared_result(prepared, intent)
+        
         if intent == "dbquery":
            
-            return handle_db_query(session_id, user_input, query_details)
+            return await ahandle_db_query(self.session_user(session_id), user_input, query_details, llm=self.llm_pool, query=head_start)
         
         elif intent == "service":
            
-            return handle_service_request(session_id, user_input)
+            return await ahandle_service_request(self.session_user(session_id), user_input, self.service_agent, identified_service=head_start)
         
         elif intent == "page_routing":
             
-            return handle_page_routing(session_id, user_input)
+            return head_start or handle_page_routing(session_id, user_input)
         
         else:  
             # For general queries, just pass basic info for the LLM to use
@@ -398,6 +626,12 @@ class BankingAssistant:
                 "status": "general_query",
                 "message": "This is a general banking query that doesn't require system data."
             }
+    
+    def process_intent(self, session_id: str, intent: str, user_input: str, query_details: Dict[str, Any] = None) -> Dict:
+        """
+        Synchronous wrapper around aprocess_intent.
+        """
+        return run_sync(self.aprocess_intent(session_id, intent, user_input, query_details))
 
 # chat func which can be imported 
 def create_chat_session(groq_api_key=None, session_id=None):
@@ -0,0 +1,253 @@
+# Versioned, pickle-free model artifact format.
+#
+# Layout of a .vyom file (all offsets absolute, every section 64-byte aligned):
+#   magic      8 bytes   b"VYOMMDL1"
+#   length     8 bytes   little-endian uint64 size of the JSON header
+#   header     JSON      format version, feature schema, metadata, metrics, section table
+#   sections   raw bytes the native XGBoost booster (UBJ) and, optionally, the flat
+#                        node arrays of the NumPy tree engine
+#
+# Loading memory-maps the file read-only, so worker processes share the same page-cache
+# pages and the NumPy node arrays are used in place without copying.
+
+import datetime
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+MAGIC = b"VYOMMDL1"
+FORMAT_VERSION = 1
+ARTIFACT_EXTENSION = ".vyom"
+_ALIGNMENT = 64
+
+
+class ArtifactError(ValueError):
+    """Raised when a model artifact is malformed or written by an unsupported version."""
+
+
+class ArtifactSchemaError(ArtifactError):
+    """Raised when an artifact's feature columns differ from what the caller expects."""
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+class ModelArtifact:
+    """
+    A loaded model artifact backed by a read-only memory map.
+
+    The XGBoost booster is only deserialized (and xgboost only imported) on first use;
+    artifacts that embed NumPy tree arrays predict without xgboost at all.
+    """
+
+    def __init__(self, path: str, buffer: mmap.mmap, header: Dict[str, Any]):
+        self.path = path
+        self.header = header
+        self.feature_names: List[str] = header["feature_names"]
+        self.target: Optional[str] = header.get("target")
+        self.metadata: Dict[str, Any] = header.get("metadata", {})
+        self.metrics: Dict[str, Any] = header.get("metrics", {})
+        self._buffer = buffer
+        self._booster = None
+        self._tree_ensemble = None
+
+    @property
+    def format_version(self) -> int:
+        return self.header["format_version"]
+
+    def section(self, name: str) -> memoryview:
+        """Zero-copy view of a raw section."""
+        if name not in self.header["sections"]:
+            raise KeyError(f"Artifact {self.path} has no '{name}' section.")
+        entry = self.header["sections"][name]
+        return memoryview(self._buffer)[entry["offset"]:entry["offset"] + entry["length"]]
+
+    def array(self, name: str) -> np.ndarray:
+        """Read-only NumPy view of an array section, backed by the memory map."""
+        entry = self.header["sections"][name]
+        count = int(np.prod(entry["shape"])) if entry["shape"] else 1
+        array = np.frombuffer(self._buffer, dtype=np.dtype(entry["dtype"]), count=count, offset=entry["offset"])
+        return array.reshape(entry["shape"])
+
+    @property
+    def booster(self):
+        if self._booster is None:
+            import xgboost as xgb
+            booster = xgb.Booster()
+            booster.load_model(bytearray(self.section("booster")))
+            booster.feature_names = self.feature_names
+            self._booster = booster
+        return self._booster
+
+    @property
+    def tree_ensemble(self):
+        """The embedded NumPy tree engine, or None if the artifact was saved without it."""
+        if self._tree_ensemble is None and "trees.feature" in self.header["sections"]:
+            from tree_ensemble import CompiledTreeEnsemble
+            trees = self.header["trees"]
+            self._tree_ensemble = CompiledTreeEnsemble(
+                feature=self.array("trees.feature"),
+                threshold=self.array("trees.threshold"),
+                left=self.array("trees.left"),
+                right=self.array("trees.right"),
+                default_left=self.array("trees.default_left"),
+                value=self.array("trees.value"),
+                roots=self.array("trees.roots"),
+                base_score=trees["base_score"],
+                max_depth=trees["max_depth"],
+                feature_names=self.feature_names,
+            )
+        return self._tree_ensemble
+
+    def predict(self, X: Any) -> np.ndarray:
+        """
+        Predict for a DataFrame with the artifact's feature columns or a matrix whose
+        columns follow `feature_names`.
+        """
+        if hasattr(X, "columns"):
+            missing = [name for name in self.feature_names if name not in X.columns]
+            if missing:
+                raise ArtifactSchemaError(f"Input is missing feature columns: {missing}")
+            X = X[self.feature_names].to_numpy(dtype=np.float32)
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if self.tree_ensemble is not None:
+            return self.tree_ensemble.predict(X)
+        return self.booster.inplace_predict(X, validate_features=False)
+
+    def close(self) -> None:
+        self._booster = None
+        self._tree_ensemble = None
+        self._buffer.close()
+
+
+def save_model_artifact(model: Any, path: str, feature_names: List[str], target: Optional[str] = None,
+                        metadata: Optional[Dict[str, Any]] = None, metrics: Optional[Dict[str, Any]] = None,
+                        include_tree_arrays: bool = True) -> None:
+    """
+    Write a trained XGBRegressor/Booster to `path` in the artifact format.
+
+    Parameters:
+        model: Trained XGBRegressor or xgboost.Booster
+        path (str): Destination file (conventionally ending in .vyom)
+        feature_names (list): Ordered feature columns the model expects
+        target (str): Name of the predicted column
+        metadata (dict): Training metadata (hyperparameters, dataset, timestamps, ...)
+        metrics (dict): Evaluation metrics (e.g. {"mae": ..., "r2": ...})
+        include_tree_arrays (bool): Also embed the flat node arrays for the NumPy engine
+    """
+    import xgboost as xgb
+
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    payloads: Dict[str, bytes] = {"booster": bytes(booster.save_raw("ubj"))}
+    array_info: Dict[str, Dict[str, Any]] = {}
+    header: Dict[str, Any] = {
+        "format_version": FORMAT_VERSION,
+        "model_type": "xgboost",
+        "booster_format": "ubj",
+        "feature_names": list(feature_names),
+        "target": target,
+        "metadata": {
+            "xgboost_version": xgb.__version__,
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            **(metadata or {}),
+        },
+        "metrics": metrics or {},
+    }
+
+    if include_tree_arrays:
+        from tree_ensemble import export_xgboost_trees
+        ensemble = export_xgboost_trees(booster)
+        header["trees"] = {"base_score": float(ensemble.base_score), "max_depth": ensemble.max_depth}
+        for name in ("feature", "threshold", "left", "right", "default_left", "value", "roots"):
+            array = np.ascontiguousarray(getattr(ensemble, name))
+            payloads[f"trees.{name}"] = array.tobytes()
+            array_info[f"trees.{name}"] = {"dtype": array.dtype.str, "shape": list(array.shape)}
+
+    # The header embeds the section offsets, which depend on the header size; iterate
+    # until the layout is stable (it converges after one or two passes).
+    header_size = 0
+    while True:
+        offset = _align(len(MAGIC) + 8 + header_size)
+        sections = {}
+        for name, payload in payloads.items():
+            sections[name] = {"offset": offset, "length": len(payload), **array_info.get(name, {})}
+            offset = _align(offset + len(payload))
+        header["sections"] = sections
+        encoded = json.dumps(header).encode("utf-8")
+        if len(encoded) <= header_size:
+            break
+        header_size = len(encoded) + 256
+
+    # Write to a temporary file and rename, so readers never see a partial artifact
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<Q", header_size))
+        file.write(encoded.ljust(header_size, b" "))
+        for name, payload in payloads.items():
+            file.seek(sections[name]["offset"])
+            file.write(payload)
+        file.truncate(offset)
+    os.replace(temp_path, path)
+
+
+def load_model_artifact(path: str, expected_features: Optional[List[str]] = None) -> ModelArtifact:
+    """
+    Memory-map an artifact read-only and validate its header.
+
+    Parameters:
+        path (str): Artifact file
+        expected_features (list): If given, the exact ordered feature columns the caller
+                                  will pass; a mismatch raises ArtifactSchemaError
+
+    Returns:
+        ModelArtifact
+    """
+    with open(path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise ArtifactError(f"{path} is not a model artifact (bad magic bytes).")
+        (header_size,) = struct.unpack_from("<Q", buffer, len(MAGIC))
+        start = len(MAGIC) + 8
+        header = json.loads(bytes(buffer[start:start + header_size]).decode("utf-8"))
+
+        if header.get("format_version") != FORMAT_VERSION:
+            raise ArtifactError(f"{path} uses artifact format version {header.get('format_version')}; "
+                                f"this loader supports version {FORMAT_VERSION}.")
+        for name, entry in header["sections"].items():
+            if entry["offset"] + entry["length"] > len(buffer):
+                raise ArtifactError(f"{path} is truncated: section '{name}' extends past the end of the file.")
+        if expected_features is not None and list(header["feature_names"]) != list(expected_features):
+            raise ArtifactSchemaError(f"{path} was trained on features {header['feature_names']}, "
+                                      f"expected {list(expected_features)}.")
+    except Exception:
+        buffer.close()
+        raise
+
+    return ModelArtifact(path, buffer, header)
+
+
+if __name__ == "__main__":
+    import argparse
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Convert a pickled XGBoost model into a .vyom artifact.")
+    parser.add_argument("model", help="Pickled XGBRegressor")
+    parser.add_argument("output", help="Destination .vyom file")
+    parser.add_argument("--target", default=None, help="Name of the predicted column")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as file:
+        xgb_model = pickle.load(file)
+    booster = xgb_model.get_booster()
+    save_model_artifact(xgb_model, args.output, booster.feature_names, target=args.target,
+                        metadata={"source": os.path.basename(args.model)})
+    print(f"Wrote {args.output}")
@@ -0,0 +1,174 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from config import settings
+
+
+def _pickle_loader(path: str) -> Any:
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def _tree_ensemble_loader(path: str) -> Any:
+    # Imported lazily so pickle-only deployments don't need the NumPy engine
+    from tree_ensemble import load_tree_ensemble
+    return load_tree_ensemble(path)
+
+
+def _artifact_loader(path: str) -> Any:
+    from model_artifact import load_model_artifact
+    return load_model_artifact(path)
+
+
+def file_hash(path: str) -> str:
+    """Return the SHA-256 hex digest of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _CachedModel:
+    def __init__(self, model: Any, mtime_ns: int, size: int, sha256: str, checked_at: float):
+        self.model = model
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.sha256 = sha256
+        self.checked_at = checked_at
+
+
+# Process-wide cache of model artifacts
+class ModelRegistry:
+    """
+    Loads each model artifact once per process and keeps it warm.
+
+    A cached model is reused until the file on disk changes. Every lookup stats the
+    file (at most once per `check_interval` seconds); when the mtime or size differs
+    the file is hashed and only reloaded if its contents actually changed, so a
+    retrained model goes live without restarting the workers.
+    """
+
+    def __init__(self, check_interval: float = 1.0):
+        self.check_interval = check_interval
+        self._models: Dict[str, _CachedModel] = {}
+        self._loaders: Dict[str, Callable[[str], Any]] = {
+            ".pkl": _pickle_loader,
+            ".npz": _tree_ensemble_loader,
+            ".vyom": _artifact_loader,
+        }
+        self._lock = threading.RLock()
+        self._stats_hooks: List[Callable[[str, Dict[str, Any]], None]] = []
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def register_loader(self, extension: str, loader: Callable[[str], Any]) -> None:
+        """Register the function used to load files with the given extension (e.g. '.pkl')."""
+        with self._lock:
+            self._loaders[extension.lower()] = loader
+
+    def register_stats_hook(self, hook: Callable[[str, Dict[str, Any]], None]) -> None:
+        """
+        Register a callback invoked as hook(event, data) on every cache event.
+        Events are 'hit', 'load', 'reload', 'unchanged' and 'predict'.
+        """
+        self._stats_hooks.append(hook)
+
+    def get(self, path: str, loader: Optional[Callable[[str], Any]] = None) -> Any:
+        """
+        Return the model stored at `path`, loading or reloading it only when needed.
+        """
+        key = os.path.abspath(path)
+        now = time.monotonic()
+
+        cached = self._models.get(key)
+        if cached is not None and now - cached.checked_at < self.check_interval:
+            self._emit("hit", key)
+            return cached.model
+
+        with self._lock:
+            cached = self._models.get(key)
+            stat = os.stat(key)
+
+            if cached is not None and (cached.mtime_ns, cached.size) == (stat.st_mtime_ns, stat.st_size):
+                cached.checked_at = now
+                self._emit("hit", key)
+                return cached.model
+
+            sha256 = file_hash(key)
+            if cached is not None and cached.sha256 == sha256:
+                # Touched but not modified; keep the warm model
+                cached.mtime_ns, cached.size, cached.checked_at = stat.st_mtime_ns, stat.st_size, now
+                self._emit("unchanged", key)
+                return cached.model
+
+            loader = loader or self.loader_for(key)
+            started = time.perf_counter()
+            model = loader(key)
+            load_seconds = time.perf_counter() - started
+
+            self._models[key] = _CachedModel(model, stat.st_mtime_ns, stat.st_size, sha256, now)
+            self._emit("reload" if cached is not None else "load", key,
+                       load_seconds=load_seconds, sha256=sha256)
+            return model
+
+    def record_latency(self, path: str, seconds: float) -> None:
+        """Record the latency of one prediction served by the model at `path`."""
+        self._emit("predict", os.path.abspath(path), latency_seconds=seconds)
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop one cached model, or every cached model when no path is given."""
+        with self._lock:
+            if path is None:
+                self._models.clear()
+            else:
+                self._models.pop(os.path.abspath(path), None)
+
+    def stats(self, path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Return cache statistics, either for one model path or keyed by every path seen.
+
+        Each entry holds hits, loads, reloads, total/last load time, prediction count
+        and total/last prediction latency (seconds).
+        """
+        with self._lock:
+            if path is not None:
+                return dict(self._stats.get(os.path.abspath(path), {}))
+            return {key: dict(value) for key, value in self._stats.items()}
+
+    def loader_for(self, path: str) -> Callable[[str], Any]:
+        """Return the loader registered for the file's extension."""
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in self._loaders:
+            raise ValueError(f"No model loader registered for '{extension}' files ({path}).")
+        return self._loaders[extension]
+
+    def _emit(self, event: str, key: str, **data: Any) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(key, {
+                "hits": 0, "loads": 0, "reloads": 0,
+                "load_seconds_total": 0.0, "last_load_seconds": None,
+                "predictions": 0, "predict_seconds_total": 0.0, "last_predict_seconds": None,
+            })
+            if event in ("hit", "unchanged"):
+                stats["hits"] += 1
+            elif event in ("load", "reload"):
+                stats["loads" if event == "load" else "reloads"] += 1
+                stats["load_seconds_total"] += data["load_seconds"]
+                stats["last_load_seconds"] = data["load_seconds"]
+            elif event == "predict":
+                stats["predictions"] += 1
+                stats["predict_seconds_total"] += data["latency_seconds"]
+                stats["last_predict_seconds"] = data["latency_seconds"]
+
+        for hook in self._stats_hooks:
+            try:
+                hook(event, {"path": key, **data})
+            except Exception as e:
+                print(f"Model registry stats hook failed: {e}")
+
+
+# Shared registry used by every serving entry point in this process
+model_registry = ModelRegistry(check_interval=settings.MODEL_CHECK_INTERVAL_SECONDS)
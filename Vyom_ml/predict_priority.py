@@ -1,10 +1,29 @@
-import pickle
 import math
+import os
+import time
 import pandas as pd
+from config import settings
+from model_artifact import ARTIFACT_EXTENSION, load_model_artifact
+from model_registry import model_registry
+
+# Feature columns the priority model was trained on, in order
+FEATURE_COLUMNS = ['Bank Balance (₹)', 'Age', 'Bank Joining Year', 'Asset Value (₹)']
+
+def load_priority_model(path):
+    """
+    Registry loader for the priority model. Artifacts are checked against FEATURE_COLUMNS
+    when they are (re)loaded; other formats use the registry's default loader.
+    """
+    if os.path.splitext(path)[1].lower() == ARTIFACT_EXTENSION:
+        return load_model_artifact(path, expected_features=FEATURE_COLUMNS)
+    return model_registry.loader_for(path)(path)
 
 def predict_priority_score(bank_balance, age, bank_joining_year, asset_value):
     """
-    Load the trained model and predict the priority score for a given manual input.
+    Predict the priority score for a given manual input using the cached trained model.
+
+    The model is loaded once per process through the shared model registry and is
+    only reloaded when the model file changes on disk.
 
     Parameters:
         bank_balance (float): Bank balance in ₹
@@ -15,21 +34,24 @@ def predict_priority_score(bank_balance, age, bank_joining_year, asset_value):
     Returns:
         int: Predicted Priority Score (rounded up)
     """
-    
-    model_filename = "vyom_ml/xgboost_priority_model.pkl"
-    # Load the trained model
-    with open(model_filename, "rb") as file:
-        loaded_model = pickle.load(file)
+    model_filename = settings.PRIORITY_MODEL_PATH
+    loaded_model = model_registry.get(model_filename, loader=load_priority_model)
+
+    started = time.perf_counter()
 
     # Create DataFrame from manual input
     input_data = pd.DataFrame([[bank_balance, age, bank_joining_year, asset_value]],
-                            columns=['Bank Balance (₹)', 'Age', 'Bank Joining Year', 'Asset Value (₹)'])  # Ensure feature names match # Ensure feature names match
+                            columns=FEATURE_COLUMNS)  # Ensure feature names match
 
     # Make prediction
     predicted_score = loaded_model.predict(input_data)[0]
+
+    model_registry.record_latency(model_filename, time.perf_counter() - started)
     # Round up to the nearest whole number
     return math.ceil(predicted_score)
 
-# # Example manual input
-example_prediction = predict_priority_score(50000, 68, 2024, 1000)
-print(f"Predicted Priority Score: {example_prediction}")
\ No newline at end of file
+if __name__ == "__main__":
+    # # Example manual input
+    example_prediction = predict_priority_score(50000, 68, 2024, 1000)
+    print(f"Predicted Priority Score: {example_prediction}")
+    print(f"Model cache stats: {model_registry.stats(settings.PRIORITY_MODEL_PATH)}")
@@ -1,22 +1,15 @@
+import argparse
+import time
 import pandas as pd
 import xgboost as xgb
-import pickle
 import math
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.metrics import mean_absolute_error, r2_score
+from hyperparameter_search import SuccessiveHalvingSearch
+from model_artifact import save_model_artifact
+from dataset_cache import dataset_sha256, load_dataset
 
-# Load dataset
-df = pd.read_csv("vyom_ml/data/bank_customer_priority_dataset.csv")  # Replace with actual dataset filename
-
-# Define features and target variable
-X = df.drop(columns=["Priority Score"])
-y = df["Priority Score"]
-
-# Train-test split
-X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-# Define XGBoost model
-xgb_model = xgb.XGBRegressor(objective='reg:squarederror', random_state=42)
+DATASET_PATH = "vyom_ml/data/bank_customer_priority_dataset.csv"
 
 # Define hyperparameter grid
 param_grid = {
@@ -27,32 +20,98 @@ param_grid = {
     'colsample_bytree': [0.7, 0.8, 1.0]
 }
 
-# Perform GridSearchCV
-grid_search = GridSearchCV(xgb_model, param_grid, cv=5, scoring='r2', n_jobs=-1, verbose=1)
-grid_search.fit(X_train, y_train)
+def load_training_data(path=DATASET_PATH):
+    """Load the priority dataset and return the train/test split."""
+    # Load dataset
+    df = load_dataset(path)
+
+    # Define features and target variable
+    X = df.drop(columns=["Priority Score"])
+    y = df["Priority Score"]
+
+    # Train-test split
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+def run_grid_search(X_train, y_train):
+    """Exhaustive GridSearchCV over param_grid (243 combinations x 5 folds)."""
+    # Define XGBoost model
+    xgb_model = xgb.XGBRegressor(objective='reg:squarederror', random_state=42)
+
+    # Perform GridSearchCV
+    grid_search = GridSearchCV(xgb_model, param_grid, cv=5, scoring='r2', n_jobs=-1, verbose=1)
+    grid_search.fit(X_train, y_train)
+
+    # Best parameters & best model
+    return grid_search.best_params_, grid_search.best_estimator_
+
+def run_halving_search(X_train, y_train, results_path=None):
+    """
+    Successive-halving search with early stopping on a validation fold.
+    Pass results_path to persist per-candidate results and resume an interrupted search.
+    """
+    search = SuccessiveHalvingSearch(max_rounds=max(param_grid['n_estimators']), results_path=results_path)
+    search.fit(X_train, y_train)
+    return search.best_params_, search.best_estimator(X_train, y_train)
+
+def evaluate(model, X_test, y_test):
+    # Predictions on test set
+    y_pred = model.predict(X_test)
+
+    # Model evaluation
+    mae = mean_absolute_error(y_test, y_pred)
+    r2 = r2_score(y_test, y_pred)
+    return mae, r2
 
-# Best parameters & best model
-best_params = grid_search.best_params_
-best_model = grid_search.best_estimator_
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the XGBoost priority model.")
+    parser.add_argument("--search", choices=["grid", "halving"], default="grid",
+                        help="Hyperparameter search strategy")
+    parser.add_argument("--results", default=None,
+                        help="JSON-lines file for per-candidate halving results (enables resume)")
+    parser.add_argument("--compare", action="store_true",
+                        help="Run both searches and report wall-clock and test R^2 side by side")
+    parser.add_argument("--output", default=None,
+                        help="Save the best model as a .vyom artifact (e.g. vyom_ml/xgboost_priority_model.vyom)")
+    args = parser.parse_args()
 
-print("Best Hyperparameters:", best_params)
+    X_train, X_test, y_train, y_test = load_training_data()
 
-# Save the best model as a pickle file
-# model_filename = "xgboost_priority_model.pkl"
-# with open(model_filename, "wb") as file:
-#     pickle.dump(best_model, file)
+    searches = ["grid", "halving"] if args.compare else [args.search]
+    report = {}
+    for search in searches:
+        started = time.perf_counter()
+        if search == "grid":
+            best_params, best_model = run_grid_search(X_train, y_train)
+        else:
+            best_params, best_model = run_halving_search(X_train, y_train, args.results)
+        elapsed = time.perf_counter() - started
 
-# print(f"Model saved as {model_filename}")
+        print(f"[{search}] Best Hyperparameters:", best_params)
 
-# Predictions on test set
-y_pred = best_model.predict(X_test)
+        mae, r2 = evaluate(best_model, X_test, y_test)
+        report[search] = (elapsed, mae, r2)
 
-# Model evaluation
-mae = mean_absolute_error(y_test, y_pred)
-r2 = r2_score(y_test, y_pred)
+        # Save the best model with its feature schema, training metadata and metrics
+        if args.output and search == searches[-1]:
+            save_model_artifact(
+                best_model, args.output,
+                feature_names=list(X_train.columns),
+                target="Priority Score",
+                metadata={"search": search, "best_params": best_params, "search_seconds": elapsed,
+                          "dataset": DATASET_PATH, "dataset_sha256": dataset_sha256(DATASET_PATH),
+                          "train_rows": len(X_train), "test_rows": len(X_test)},
+                metrics={"mae": float(mae), "r2": float(r2)},
+            )
+            print(f"Model saved as {args.output}")
 
-print("Mean Absolute Error:", mae)
-print("R^2 Score:", r2)
-print(X.columns)
-# Function to load the model and make predictions for manual input
+        print(f"[{search}] Mean Absolute Error:", mae)
+        print(f"[{search}] R^2 Score:", r2)
+        print(f"[{search}] Wall-clock: {elapsed:.1f}s")
 
+    if args.compare:
+        grid_time, _, grid_r2 = report["grid"]
+        halving_time, _, halving_r2 = report["halving"]
+        print(f"Halving search: {halving_time:.1f}s vs grid {grid_time:.1f}s "
+              f"({grid_time / max(halving_time, 1e-9):.1f}x faster), "
+              f"test R^2 {halving_r2:.4f} vs {grid_r2:.4f}")
+    print(X_train.columns)
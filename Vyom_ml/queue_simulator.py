@@ -0,0 +1,246 @@
+# Priority-aware branch queue simulator.
+#
+# Customers arrive with service requests; each arrival is scored in batch with the
+# priority model (who goes first) and the resolution-time estimator (how long the
+# officer is busy). Every department has N officers and a heap of waiting requests
+# ordered by (priority score, arrival time), so priority 1 customers are served first.
+# The simulation reports wait-time percentiles and can search for the smallest
+# staffing that meets a wait-time target.
+
+import argparse
+import heapq
+import math
+import time
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from batch_priority_scoring import predict_priority_frame
+from dataset_cache import load_dataset
+from predict_priority import FEATURE_COLUMNS
+from service_time_prediction import BASE_RESOLUTION_TIMES, resolution_time_estimator
+
+DAY_MINUTES = 8 * 60
+PERCENTILES = (50, 90, 95, 99)
+
+
+def known_requests(requests: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Request mix the resolution-time estimator can score. Without `requests`, every
+    (Department, Sub-Department, Service Level) in BASE_RESOLUTION_TIMES is equally
+    likely; otherwise rows with combinations the estimator does not know are dropped.
+    """
+    if requests is None:
+        return pd.DataFrame([
+            {"Department": dept, "Sub-Department": sub_dept, "Service Level": level}
+            for dept, subs in BASE_RESOLUTION_TIMES.items()
+            for sub_dept, levels in subs.items()
+            for level in levels
+        ])
+    valid = [(dept, sub_dept) in resolution_time_estimator.sub_department_codes
+             and level in resolution_time_estimator.service_level_codes
+             for dept, sub_dept, level in zip(requests["Department"], requests["Sub-Department"],
+                                              requests["Service Level"])]
+    known = requests[valid]
+    if known.empty:
+        raise ValueError("No request rows match a known department, sub-department and service level.")
+    return known
+
+
+def generate_arrivals(n_arrivals: int, customers: pd.DataFrame, requests: Optional[pd.DataFrame] = None,
+                      day_minutes: float = DAY_MINUTES, seed: int = 0) -> pd.DataFrame:
+    """
+    Build a synthetic day of arrivals by resampling customer profiles and service requests.
+
+    Parameters:
+        n_arrivals (int): Number of arrivals in the day
+        customers (DataFrame): Rows with the priority model's FEATURE_COLUMNS
+        requests (DataFrame): Optional rows with Department, Sub-Department and Service Level
+                              columns to resample (see known_requests)
+        day_minutes (float): Length of the day; arrivals follow a Poisson process over it
+
+    Returns:
+        DataFrame sorted by 'Arrival Minute'
+    """
+    rng = np.random.default_rng(seed)
+    requests = known_requests(requests)
+    arrivals = customers[FEATURE_COLUMNS].iloc[rng.integers(0, len(customers), n_arrivals)].reset_index(drop=True)
+    sampled = requests.iloc[rng.integers(0, len(requests), n_arrivals)].reset_index(drop=True)
+    for column in ("Department", "Sub-Department", "Service Level"):
+        arrivals[column] = sampled[column].to_numpy()
+    arrivals["Arrival Minute"] = np.sort(rng.uniform(0, day_minutes, n_arrivals))
+    return arrivals
+
+
+def score_arrivals(arrivals: pd.DataFrame) -> pd.DataFrame:
+    """Add 'Priority Score' and 'Service Minutes' columns using the batch predictors."""
+    scored = arrivals.copy()
+    scored["Priority Score"] = predict_priority_frame(arrivals)
+    scored["Service Minutes"] = resolution_time_estimator.predict(
+        scored["Priority Score"].to_numpy(), arrivals["Department"].to_numpy(),
+        arrivals["Sub-Department"].to_numpy(), arrivals["Service Level"].to_numpy())
+    return scored
+
+
+def _simulate_department(arrival: np.ndarray, priority: np.ndarray, service: np.ndarray, officers: int):
+    """
+    Event loop for one department. Arrivals are already sorted, so only officer
+    completions go through a heap; waiting requests sit in a (priority, arrival, id) heap.
+    Returns (wait minutes, start minutes) per request in input order.
+    """
+    n = len(arrival)
+    wait = np.empty(n)
+    start = np.empty(n)
+    arrival_list, priority_list, service_list = arrival.tolist(), priority.tolist(), service.tolist()
+
+    completions = []  # (finish time, request id)
+    waiting = []      # (priority, arrival time, request id)
+    free = officers
+    next_arrival = 0
+
+    def begin(request_id, now):
+        start[request_id] = now
+        wait[request_id] = now - arrival_list[request_id]
+        heapq.heappush(completions, (now + service_list[request_id], request_id))
+
+    while next_arrival < n or completions:
+        if next_arrival < n and (not completions or arrival_list[next_arrival] < completions[0][0]):
+            request_id = next_arrival
+            next_arrival += 1
+            if free:
+                free -= 1
+                begin(request_id, arrival_list[request_id])
+            else:
+                heapq.heappush(waiting, (priority_list[request_id], arrival_list[request_id], request_id))
+        else:
+            now, _ = heapq.heappop(completions)
+            if waiting:
+                _, _, request_id = heapq.heappop(waiting)
+                begin(request_id, now)
+            else:
+                free += 1
+
+    return wait, start
+
+
+def simulate(scored: pd.DataFrame, officers: Dict[str, int]) -> pd.DataFrame:
+    """
+    Run the queue simulation over scored arrivals.
+
+    Parameters:
+        scored (DataFrame): Output of score_arrivals (needs Department, Arrival Minute,
+                            Priority Score and Service Minutes)
+        officers (dict): Number of officers per department
+
+    Returns:
+        Copy of `scored` with 'Start Minute', 'Wait Minutes' and 'Finish Minute' columns
+    """
+    result = scored.copy()
+    result["Start Minute"] = np.nan
+    result["Wait Minutes"] = np.nan
+    for department, rows in result.groupby("Department").indices.items():
+        if officers.get(department, 0) < 1:
+            raise ValueError(f"Department '{department}' has arrivals but no officers.")
+        order = rows[np.argsort(result["Arrival Minute"].to_numpy()[rows], kind="stable")]
+        wait, start = _simulate_department(result["Arrival Minute"].to_numpy()[order],
+                                           result["Priority Score"].to_numpy()[order],
+                                           result["Service Minutes"].to_numpy()[order],
+                                           officers[department])
+        result.loc[result.index[order], "Wait Minutes"] = wait
+        result.loc[result.index[order], "Start Minute"] = start
+    result["Finish Minute"] = result["Start Minute"] + result["Service Minutes"]
+    return result
+
+
+def summarize(result: pd.DataFrame, officers: Dict[str, int]) -> pd.DataFrame:
+    """Wait-time percentiles, mean wait and officer utilisation per department and overall."""
+    rows = []
+    groups = list(result.groupby("Department")) + [("All", result)]
+    for department, group in groups:
+        waits = group["Wait Minutes"].to_numpy()
+        staff = sum(officers.values()) if department == "All" else officers[department]
+        span = max(group["Finish Minute"].max() - group["Arrival Minute"].min(), 1e-9)
+        row = {"Department": department, "Requests": len(group), "Officers": staff,
+               "Mean Wait": waits.mean(), "Max Wait": waits.max(),
+               "Utilisation": group["Service Minutes"].sum() / (staff * span)}
+        for q, value in zip(PERCENTILES, np.percentile(waits, PERCENTILES)):
+            row[f"P{q} Wait"] = value
+        rows.append(row)
+    return pd.DataFrame(rows).set_index("Department").round(2)
+
+
+def recommend_staffing(scored: pd.DataFrame, target_p95_wait: float, max_officers: int = 10_000) -> Dict[str, int]:
+    """
+    Smallest number of officers per department whose simulated p95 wait is within the target.
+    Departments are independent queues, so each is searched on its own with bisection.
+    """
+    staffing = {}
+    for department, group in scored.groupby("Department"):
+        group = group.sort_values("Arrival Minute", kind="stable")
+        arrival = group["Arrival Minute"].to_numpy()
+        priority = group["Priority Score"].to_numpy()
+        service = group["Service Minutes"].to_numpy()
+
+        def p95(officers):
+            wait, _ = _simulate_department(arrival, priority, service, officers)
+            return np.percentile(wait, 95)
+
+        # Start from the offered load and double until the target is met. Over a finite
+        # day fewer officers than the load can still meet it, so the bracket starts at 1.
+        span = max(arrival.max() - arrival.min(), 1e-9)
+        low, high = 1, min(max(1, math.floor(service.sum() / span)), max_officers)
+        while p95(high) > target_p95_wait:
+            if high >= max_officers:
+                raise ValueError(f"{department} needs more than {max_officers} officers to reach the target.")
+            low, high = high + 1, min(high * 2, max_officers)
+        while low < high:
+            middle = (low + high) // 2
+            if p95(middle) <= target_p95_wait:
+                high = middle
+            else:
+                low = middle + 1
+        staffing[department] = high
+    return staffing
+
+
+def _parse_officers(values) -> Dict[str, int]:
+    officers = {}
+    for value in values or []:
+        department, _, count = value.rpartition("=")
+        officers[department] = int(count)
+    return officers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate a day of branch queues.")
+    parser.add_argument("--arrivals", type=int, default=100_000)
+    parser.add_argument("--customers", default="vyom_ml/data/bank_customer_priority_dataset.csv")
+    parser.add_argument("--requests", default=None,
+                        help="CSV of requests to resample (default: uniform over the known request types)")
+    parser.add_argument("--officers", nargs="*", metavar="DEPARTMENT=N",
+                        help="Officers per department, e.g. Credit=40 Forex=20")
+    parser.add_argument("--target-p95", type=float, default=None,
+                        help="Recommend the smallest staffing with p95 wait <= this many minutes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    arrivals = generate_arrivals(args.arrivals, load_dataset(args.customers),
+                                 load_dataset(args.requests) if args.requests else None, seed=args.seed)
+    scored = score_arrivals(arrivals)
+    scored_at = time.perf_counter()
+
+    if args.target_p95 is not None:
+        officers = recommend_staffing(scored, args.target_p95)
+        print(f"Recommended staffing for p95 wait <= {args.target_p95} min: {officers}")
+    else:
+        officers = _parse_officers(args.officers)
+        # Default: enough officers to keep each department roughly 90% busy
+        for department, group in scored.groupby("Department"):
+            officers.setdefault(department, max(1, math.ceil(group["Service Minutes"].sum() / DAY_MINUTES / 0.9)))
+
+    result = simulate(scored, officers)
+    finished = time.perf_counter()
+
+    print(summarize(result, officers).to_string())
+    print(f"\nScored {len(scored):,} arrivals in {scored_at - started:.2f}s, "
+          f"simulated in {finished - scored_at:.2f}s")
@@ -0,0 +1,168 @@
+# Learned resolution-time model trained on bank_query_resolution_time_new.csv.
+#
+# Unlike the static formula in service_time_prediction.py, this model also uses staff
+# availability, peak hours, documentation completeness and the number of departments
+# involved. Categorical columns are integer-encoded with vocabularies fitted once at
+# training time and stored in the model artifact.
+
+import argparse
+import os
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from config import settings
+from dataset_cache import dataset_sha256, load_dataset
+from model_artifact import load_model_artifact, save_model_artifact
+from model_registry import model_registry
+
+DATASET_PATH = "vyom_ml/data/bank_query_resolution_time_new.csv"
+TARGET_COLUMN = "Resolution Time (Minutes)"
+CATEGORICAL_COLUMNS = ["Department", "Sub-Department", "Service Request"]
+NUMERIC_COLUMNS = ["Priority Score", "Service Level", "Staff Availability", "Peak Hours",
+                   "Documentation Complete", "Departments Involved"]
+FEATURE_COLUMNS = NUMERIC_COLUMNS + CATEGORICAL_COLUMNS
+
+
+class CategoryEncoder:
+    """
+    Maps categorical columns to integer codes with vocabularies fixed at training time.
+    Values not seen during training are encoded as NaN, which the trees treat as missing.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = {column: list(values) for column, values in categories.items()}
+        # Built once; every batch reuses the same pandas category dtypes
+        self._dtypes = {column: pd.CategoricalDtype(values) for column, values in self.categories.items()}
+
+    @classmethod
+    def fit(cls, df: pd.DataFrame, columns: List[str]) -> "CategoryEncoder":
+        return cls({column: sorted(df[column].astype(str).unique()) for column in columns})
+
+    def encode_column(self, column: str, values) -> np.ndarray:
+        codes = pd.Series(values, dtype=object).astype(str).astype(self._dtypes[column]).cat.codes.to_numpy()
+        encoded = codes.astype(np.float32)
+        encoded[codes < 0] = np.nan
+        return encoded
+
+
+def build_feature_matrix(df: pd.DataFrame, encoder: CategoryEncoder) -> np.ndarray:
+    """Return the (rows, len(FEATURE_COLUMNS)) float32 matrix the model is trained on."""
+    missing = [column for column in FEATURE_COLUMNS if column not in df.columns]
+    if missing:
+        raise KeyError(f"Input is missing feature columns: {missing}")
+    matrix = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float32)
+    for index, column in enumerate(FEATURE_COLUMNS):
+        if column in encoder.categories:
+            matrix[:, index] = encoder.encode_column(column, df[column].to_numpy())
+        else:
+            matrix[:, index] = df[column].to_numpy(dtype=np.float32)
+    return matrix
+
+
+class ResolutionTimeModel:
+    """
+    Serving wrapper around a trained resolution-time artifact.
+
+    Load it through `load_resolution_time_model()` so the artifact and the compiled
+    category encoder are cached per process by the model registry.
+    """
+
+    def __init__(self, artifact):
+        self.artifact = artifact
+        self.encoder = CategoryEncoder(artifact.metadata["categories"])
+
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        return self.artifact.metrics
+
+    def predict(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Predict resolution times (minutes, rounded to one decimal) for every row of a
+        DataFrame with the FEATURE_COLUMNS.
+        """
+        if df.empty:
+            return np.empty(0, dtype=float)
+        predicted = self.artifact.predict(build_feature_matrix(df, self.encoder))
+        return np.round(predicted.astype(float), 1)
+
+    def predict_one(self, priority_score, dept, sub_dept, service_request, service_level,
+                    staff_availability, peak_hours, documentation_complete, departments_involved) -> float:
+        row = pd.DataFrame([{
+            "Priority Score": priority_score,
+            "Department": dept,
+            "Sub-Department": sub_dept,
+            "Service Request": service_request,
+            "Service Level": service_level,
+            "Staff Availability": staff_availability,
+            "Peak Hours": peak_hours,
+            "Documentation Complete": documentation_complete,
+            "Departments Involved": departments_involved,
+        }])
+        return float(self.predict(row)[0])
+
+
+def _load_resolution_artifact(path: str) -> ResolutionTimeModel:
+    return ResolutionTimeModel(load_model_artifact(path, expected_features=FEATURE_COLUMNS))
+
+
+def load_resolution_time_model(path: Optional[str] = None) -> ResolutionTimeModel:
+    """Return the process-wide cached resolution-time model (reloaded when the file changes)."""
+    return model_registry.get(path or settings.RESOLUTION_MODEL_PATH, loader=_load_resolution_artifact)
+
+
+def train_resolution_time_model(dataset_path: str = DATASET_PATH, output_path: Optional[str] = None,
+                                test_size: float = 0.2, random_state: int = 42, **params) -> Dict[str, Any]:
+    """
+    Train a gradient-boosted resolution-time model and save it as a .vyom artifact.
+
+    Returns:
+        dict with the fitted model, encoder, held-out test frame and test metrics
+    """
+    import xgboost as xgb
+    from sklearn.metrics import mean_absolute_error, r2_score
+    from sklearn.model_selection import train_test_split
+
+    df = load_dataset(dataset_path)
+    train_df, test_df = train_test_split(df, test_size=test_size, random_state=random_state)
+
+    encoder = CategoryEncoder.fit(train_df, CATEGORICAL_COLUMNS)
+    X_train = build_feature_matrix(train_df, encoder)
+    X_test = build_feature_matrix(test_df, encoder)
+    y_train = train_df[TARGET_COLUMN].to_numpy()
+    y_test = test_df[TARGET_COLUMN].to_numpy()
+
+    model_params = {"n_estimators": 300, "max_depth": 4, "learning_rate": 0.05,
+                    "subsample": 0.8, "colsample_bytree": 0.8, **params}
+    model = xgb.XGBRegressor(objective="reg:squarederror", random_state=random_state, **model_params)
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - started
+
+    y_pred = model.predict(X_test)
+    metrics = {"mae": float(mean_absolute_error(y_test, y_pred)), "r2": float(r2_score(y_test, y_pred))}
+
+    if output_path:
+        save_model_artifact(
+            model, output_path,
+            feature_names=FEATURE_COLUMNS,
+            target=TARGET_COLUMN,
+            metadata={"categories": encoder.categories, "params": model_params,
+                      "dataset": dataset_path, "dataset_sha256": dataset_sha256(dataset_path),
+                      "train_rows": len(train_df), "test_rows": len(test_df),
+                      "train_seconds": train_seconds},
+            metrics=metrics,
+        )
+
+    return {"model": model, "encoder": encoder, "test_df": test_df, "metrics": metrics}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the resolution-time model.")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    parser.add_argument("--output", default=settings.RESOLUTION_MODEL_PATH)
+    args = parser.parse_args()
+
+    result = train_resolution_time_model(args.dataset, args.output)
+    print("Test metrics:", result["metrics"])
+    print(f"Model saved as {os.path.abspath(args.output)}")
@@ -0,0 +1,186 @@
+# Short-lived per-user cache of database query results.
+#
+# Within one conversation a customer often asks for the same data again ("what's my
+# balance" ... "and my balance now?"). Results of read-only queries are kept for a few
+# seconds, keyed by (user, canonical SQL, bind parameters), so a repeat is answered
+# without a database round trip; together with the SQL template cache the repeat also
+# skips the LLM. Entries are bounded by a total size estimate (least recently used are
+# evicted), and every entry of a user is dropped as soon as a write path touches that
+# user (a ticket raised, a statement that is not read-only).
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from config import settings
+
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_WRITE_KEYWORDS = re.compile(
+    r"(?i)\b(insert|update|delete|merge|upsert|alter|drop|create|truncate|grant|revoke|call|copy|lock|nextval|setval)\b")
+
+# Fixed cost of an entry (key, tuple and list headers) in the size estimate
+ENTRY_OVERHEAD_BYTES = 200
+
+
+def canonical_sql(sql: str) -> str:
+    """SQL with whitespace collapsed and keywords lower-cased outside string literals, no trailing ';'."""
+    parts, position = [], 0
+    for match in _SQL_STRING.finditer(sql):
+        parts.append(_WHITESPACE.sub(" ", sql[position:match.start()]).lower())
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_WHITESPACE.sub(" ", sql[position:]).lower())
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def _sql_literal(value: Any) -> str:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _inline_params(sql: str, params: Sequence[Any]) -> str:
+    # Bind parameters written into the statement, so "WHERE user_id = 'u1'" from the LLM and
+    # "WHERE user_id = ?" with ('u1',) from a SQL template share a cache entry
+    values = iter(params)
+    parts, position = [], 0
+    for match in _SQL_STRING.finditer(sql):
+        parts.append(_PLACEHOLDER.sub(lambda m: _sql_literal(next(values, m.group(0))), sql[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_PLACEHOLDER.sub(lambda m: _sql_literal(next(values, m.group(0))), sql[position:]))
+    return "".join(parts).replace("%%", "%")
+
+
+def is_read_only(sql: str) -> bool:
+    """Whether `sql` is a plain SELECT (or WITH ... SELECT) with no data-modifying keyword."""
+    outside_strings = _SQL_STRING.sub("''", canonical_sql(sql))
+    return (outside_strings.startswith(("select", "with", "(select"))
+            and ";" not in outside_strings and not _WRITE_KEYWORDS.search(outside_strings))
+
+
+def _estimate_bytes(column_names: Sequence[str], rows: Sequence[Sequence[Any]]) -> int:
+    # Rough footprint: text length of every value plus per-value object overhead
+    cells = sum(len(str(value)) + 16 for row in rows for value in row)
+    return ENTRY_OVERHEAD_BYTES + cells + sum(len(name) for name in column_names)
+
+
+class ResultCache:
+    """
+    Read-through TTL cache of query results, partitioned by user.
+
+    Parameters:
+        ttl_seconds (float): How long a result is served from the cache
+        max_bytes (int): Cap on the estimated size of all cached results
+        max_entry_rows (int): Results with more rows than this are not cached
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_bytes: Optional[int] = None,
+                 max_entry_rows: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds or settings.RESULT_CACHE_TTL_SECONDS
+        self.max_bytes = max_bytes or settings.RESULT_CACHE_MAX_BYTES
+        self.max_entry_rows = max_entry_rows or settings.RESULT_CACHE_MAX_ENTRY_ROWS
+        # (user, canonical SQL with params inlined) -> (column names, rows, expires at, size)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[List[str], List[Tuple], float, int]]" = OrderedDict()
+        self._user_keys: Dict[str, set] = {}
+        # Bumped on every invalidation; a result read before it is not stored after it
+        self._generations: Dict[str, int] = {}
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0,
+                         "invalidations": 0, "skipped": 0}
+
+    @staticmethod
+    def _key(user: str, sql: str, params: Optional[Sequence[Any]]) -> Tuple[str, str]:
+        return (user, canonical_sql(_inline_params(sql, params) if params else sql))
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        _, _, _, size = self._entries.pop(key)
+        self.total_bytes -= size
+        keys = self._user_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[key[0]]
+
+    def generation(self, user: str) -> int:
+        """Current invalidation generation of `user`; pass it back to put()."""
+        with self._lock:
+            return self._generations.get(user, 0)
+
+    def get(self, user: str, sql: str, params: Optional[Sequence[Any]] = None) -> Optional[Tuple[List[str], List[Tuple]]]:
+        """(column names, rows) cached for this user and statement, or None."""
+        key = self._key(user, sql, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            column_names, rows, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._drop(key)
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return list(column_names), list(rows)
+
+    def put(self, user: str, sql: str, params: Optional[Sequence[Any]], column_names: Sequence[str],
+            rows: Sequence[Tuple], generation: Optional[int] = None) -> bool:
+        """
+        Cache a result; returns whether it was stored.
+
+        Parameters:
+            generation (int): Value of generation(user) taken before the query ran; the
+                              result is discarded if the user was invalidated since
+        """
+        if not is_read_only(sql) or len(rows) > self.max_entry_rows:
+            with self._lock:
+                self.counters["skipped"] += 1
+            return False
+        key = self._key(user, sql, params)
+        size = _estimate_bytes(column_names, rows)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(user, 0):
+                self.counters["skipped"] += 1
+                return False
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (list(column_names), list(rows), time.monotonic() + self.ttl_seconds, size)
+            self._user_keys.setdefault(user, set()).add(key)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.counters["evictions"] += 1
+        return key in self._entries
+
+    def invalidate(self, user: str) -> int:
+        """Drop every cached result of `user` (call after anything that may change their data)."""
+        with self._lock:
+            self._generations[user] = self._generations.get(user, 0) + 1
+            keys = list(self._user_keys.get(user, ()))
+            for key in keys:
+                self._drop(key)
+            self.counters["invalidations"] += 1
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus `hit_rate` (hits / lookups) and the current size."""
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {**self.counters, "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+                    "entries": len(self._entries), "users": len(self._user_keys), "bytes": self.total_bytes}
+
+
+# Shared by query_postgresql, aquery_postgresql and the ticket write paths
+result_cache = ResultCache()
@@ -1,10 +1,11 @@
 import asyncio
 import json
 from fastapi import FastAPI, WebSocket
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 import websockets  # For connecting to Flutter's WebSocket server
 from config import settings
+from classification_cache import classification_cache
+from llm_client import compile_chain, get_llm_pool
 
 app = FastAPI()
 
@@ -35,8 +36,10 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
 
 # Routing Agent using LLM
 class PageRoutingAgent:
-    def __init__(self, model):
+    def __init__(self, model, cache=None):
         self.model = model
+        # Optional ClassificationCache shared across agents
+        self.cache = cache
         self.routing_prompt = ChatPromptTemplate.from_messages([
             ("system", """
             You are an AI assistant that helps users navigate an app by understanding their requests.
@@ -55,11 +58,29 @@ class PageRoutingAgent:
             """),
             ("human", "{query}")
         ])
-        self.routing_chain = self.routing_prompt | self.model
+        self.routing_chain = compile_chain(self.model, "routing", self.routing_prompt)
 
     def get_screen(self, query: str) -> str:
+        if self.cache is not None:
+            return self.cache.get_or_compute("screen", query, self.classify_screen)
+        return self.classify_screen(query)
+
+    def classify_screen(self, query: str) -> str:
         response = self.routing_chain.invoke({"query": query})
-        screen = response.content.strip().lower()
+        return self._parse_screen(response.content)
+
+    async def aget_screen(self, query: str) -> str:
+        if self.cache is not None:
+            return await self.cache.aget_or_compute("screen", query, self.aclassify_screen)
+        return await self.aclassify_screen(query)
+
+    async def aclassify_screen(self, query: str) -> str:
+        response = await self.routing_chain.ainvoke({"query": query})
+        return self._parse_screen(response.content)
+
+    @staticmethod
+    def _parse_screen(content: str) -> str:
+        screen = content.strip().lower()
         return screen if screen in SCREENS else "home"
 
 # Function to manually trigger routing and send WebSocket message to Flutter
@@ -67,13 +88,11 @@ async def process_manual_query(user_query: str):
     """
     Manually input a query, determine the target screen, and send a WebSocket message to Flutter.
     """
-    # Remove hardcoded API key
-    # groq_api_key = "your_groq_api_key_here"  # Replace with your API Key
-    model = ChatGroq(api_key=settings.GROQ_API_KEY, model="llama-3.1-8b-instant")
-    routing_agent = PageRoutingAgent(model)
+    # Shared pooled client; the routing chain is compiled once per process
+    routing_agent = PageRoutingAgent(get_llm_pool(), cache=classification_cache)
 
     # Determine screen
-    target_screen = routing_agent.get_screen(user_query)
+    target_screen = await routing_agent.aget_screen(user_query)
 
     # Create WebSocket message
     message = json.dumps({
@@ -0,0 +1,228 @@
+# Database schema for the SQL generation prompt, read from the database itself.
+#
+# The prompt used to carry a hand-written description of a 'customer' table that drifted
+# from the real database (banking_system.db has users/transactions) and was sent in full
+# with every question. SchemaIntrospector reads the tables and columns once (Postgres
+# information_schema, SQLite pragmas), renders each table as one compact line:
+#   transactions(transaction_id integer pk, user_id text ->users.user_id, date text, amount real)
+# and rebuilds that rendering only when the schema version changes (checked at most every
+# SCHEMA_CHECK_INTERVAL_SECONDS). For each question only the tables whose names or columns
+# it mentions are included, plus the tables they reference through foreign keys (so
+# "my transactions" still shows how transactions join to users); when none match, every
+# table is.
+
+import asyncio
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from config import settings
+from db_pool import ConnectionPool, get_db_pool
+
+# Verbose Postgres type names and their short forms
+_TYPE_ABBREVIATIONS = {
+    "character varying": "varchar",
+    "character": "char",
+    "timestamp with time zone": "timestamptz",
+    "timestamp without time zone": "timestamp",
+    "time without time zone": "time",
+    "double precision": "float8",
+    "boolean": "bool",
+    "integer": "int",
+    "numeric": "numeric",
+}
+_WORD = re.compile(r"[a-z0-9]+")
+
+_POSTGRES_COLUMNS = """
+    SELECT c.table_name, c.column_name, c.data_type
+    FROM information_schema.columns c
+    JOIN information_schema.tables t ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+    WHERE c.table_schema = 'public' AND t.table_type = 'BASE TABLE'
+    ORDER BY c.table_name, c.ordinal_position
+"""
+_POSTGRES_KEYS = """
+    SELECT tc.constraint_type, kcu.table_name, kcu.column_name, ccu.table_name, ccu.column_name
+    FROM information_schema.table_constraints tc
+    JOIN information_schema.key_column_usage kcu
+      ON kcu.constraint_name = tc.constraint_name AND kcu.table_schema = tc.table_schema
+    JOIN information_schema.constraint_column_usage ccu
+      ON ccu.constraint_name = tc.constraint_name AND ccu.table_schema = tc.table_schema
+    WHERE tc.table_schema = 'public' AND tc.constraint_type IN ('PRIMARY KEY', 'FOREIGN KEY')
+"""
+# Changes whenever a table or column is added, dropped, renamed or retyped
+_POSTGRES_VERSION = """
+    SELECT md5(string_agg(table_name || '.' || column_name || ':' || data_type, ',' ORDER BY table_name, ordinal_position))
+    FROM information_schema.columns WHERE table_schema = 'public'
+"""
+
+
+def _words(text: str) -> set:
+    # Lowercase word stems; "transactions" and "transaction" both give "transaction"
+    return {word[:-1] if len(word) > 3 and word.endswith("s") else word
+            for word in _WORD.findall(text.lower().replace("_", " "))}
+
+
+class TableSchema:
+    """
+    Columns of one table.
+
+    Parameters:
+        name (str): Table name
+        columns (list): (column name, type) pairs in table order
+        primary_key (set): Primary key column names
+        foreign_keys (dict): Column name -> "table.column" it references
+    """
+
+    def __init__(self, name: str, columns: List[Tuple[str, str]], primary_key: Optional[set] = None,
+                 foreign_keys: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.columns = columns
+        self.primary_key = primary_key or set()
+        self.foreign_keys = foreign_keys or {}
+        self.name_words = _words(name)
+        self.words = self.name_words | set().union(*(_words(column) for column, _ in columns))
+        self.rendered = self.render()
+
+    def render(self) -> str:
+        parts = []
+        for column, data_type in self.columns:
+            data_type = _TYPE_ABBREVIATIONS.get(data_type.lower(), data_type.lower()) or "any"
+            part = f"{column} {data_type}"
+            if column in self.primary_key:
+                part += " pk"
+            if column in self.foreign_keys:
+                part += f" ->{self.foreign_keys[column]}"
+            parts.append(part)
+        return f"{self.name}({', '.join(parts)})"
+
+    def relevance(self, question_words: set) -> int:
+        # A mention of the table itself outweighs words shared with column names
+        return len(self.words & question_words) + 2 * len(self.name_words & question_words)
+
+
+class SchemaIntrospector:
+    """
+    Cached, compact schema of one database.
+
+    Parameters:
+        pool (ConnectionPool): Pool of the database to introspect
+        check_interval (float): Seconds between schema version checks
+        max_tables (int): Most matching tables included for one question (before the
+                          tables they reference); a question matching none gets every table
+        fallback (str): Description used while the database cannot be introspected
+    """
+
+    def __init__(self, pool: ConnectionPool, check_interval: Optional[float] = None,
+                 max_tables: Optional[int] = None, fallback: str = ""):
+        self.pool = pool
+        self.check_interval = settings.SCHEMA_CHECK_INTERVAL_SECONDS if check_interval is None else check_interval
+        self.max_tables = max_tables or settings.SCHEMA_MAX_TABLES
+        self.fallback = fallback
+        self.version: Optional[str] = None
+        self.tables: List[TableSchema] = []
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self.stats = {"introspections": 0, "version_checks": 0, "failures": 0}
+
+    def _read_version(self) -> str:
+        if self.pool.is_sqlite:
+            _, rows = self.pool.execute("PRAGMA schema_version")
+            return str(rows[0][0])
+        _, rows = self.pool.execute(_POSTGRES_VERSION)
+        return rows[0][0] or ""
+
+    def _read_tables(self) -> List[TableSchema]:
+        if self.pool.is_sqlite:
+            _, names = self.pool.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+            tables = []
+            for (name,) in names:
+                quoted = '"' + name.replace('"', '""') + '"'
+                # table_info: (cid, name, type, notnull, default, pk)
+                _, columns = self.pool.execute(f"PRAGMA table_info({quoted})")
+                # foreign_key_list: (id, seq, table, from, to, ...)
+                _, keys = self.pool.execute(f"PRAGMA foreign_key_list({quoted})")
+                tables.append(TableSchema(name, [(column[1], column[2]) for column in columns],
+                                          {column[1] for column in columns if column[5]},
+                                          {key[3]: f"{key[2]}.{key[4]}" for key in keys}))
+            return tables
+
+        _, columns = self.pool.execute(_POSTGRES_COLUMNS)
+        _, keys = self.pool.execute(_POSTGRES_KEYS)
+        by_table: Dict[str, List[Tuple[str, str]]] = {}
+        for table, column, data_type in columns:
+            by_table.setdefault(table, []).append((column, data_type))
+        primary_keys: Dict[str, set] = {}
+        foreign_keys: Dict[str, Dict[str, str]] = {}
+        for constraint, table, column, referenced_table, referenced_column in keys:
+            if constraint == "PRIMARY KEY":
+                primary_keys.setdefault(table, set()).add(column)
+            else:
+                foreign_keys.setdefault(table, {})[column] = f"{referenced_table}.{referenced_column}"
+        return [TableSchema(table, table_columns, primary_keys.get(table), foreign_keys.get(table))
+                for table, table_columns in by_table.items()]
+
+    def _due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+    def is_fresh(self) -> bool:
+        """Whether describe() can answer (from the tables or the fallback) without touching the database."""
+        return not self._due()
+
+    def refresh(self, force: bool = False) -> None:
+        """Re-read the tables if the schema version changed (at most once per check_interval)."""
+        with self._lock:
+            if not force and not self._due():
+                return
+            self._checked_at = time.monotonic()
+            try:
+                self.stats["version_checks"] += 1
+                version = self._read_version()
+                if force or version != self.version:
+                    self.tables = self._read_tables()
+                    self.version = version
+                    self.stats["introspections"] += 1
+            except Exception as e:
+                # Keep what we had (or the fallback) and try again after check_interval
+                self.stats["failures"] += 1
+                print(f"Schema introspection failed: {e}")
+
+    def describe(self, question: str = "") -> str:
+        """Compact schema for the SQL prompt, limited to the tables relevant to `question`."""
+        self.refresh()
+        tables = self.tables
+        if not tables:
+            return self.fallback
+        question_words = _words(question)
+        scored = sorted(((table.relevance(question_words), index, table) for index, table in enumerate(tables)),
+                        key=lambda item: (-item[0], item[1]))
+        selected = [table for score, _, table in scored if score > 0][:self.max_tables]
+        if not selected:
+            # Nothing to narrow the schema down by; the LLM needs all of it
+            return "\n".join(table.rendered for table in tables)
+        # Referenced tables are always included, even past max_tables
+        by_name = {table.name: table for table in tables}
+        for table in selected:
+            for reference in table.foreign_keys.values():
+                referenced = by_name.get(reference.split(".", 1)[0])
+                if referenced is not None and referenced not in selected:
+                    selected.append(referenced)
+        return "\n".join(table.rendered for table in selected)
+
+    async def adescribe(self, question: str = "") -> str:
+        """Async variant of describe; a due version check runs in a worker thread."""
+        if self._due():
+            await asyncio.to_thread(self.refresh)
+        return self.describe(question)
+
+
+_introspectors: Dict[str, SchemaIntrospector] = {}
+_introspectors_lock = threading.Lock()
+
+
+def get_schema_introspector(url: str, fallback: str = "") -> SchemaIntrospector:
+    """Process-wide SchemaIntrospector for `url`."""
+    with _introspectors_lock:
+        if url not in _introspectors:
+            _introspectors[url] = SchemaIntrospector(get_db_pool(url), fallback=fallback)
+        return _introspectors[url]
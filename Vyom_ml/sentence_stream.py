@@ -0,0 +1,47 @@
+# Groups streamed LLM text into sentences for the voice pipeline.
+#
+# Translation and TTS work per utterance, not per token, so token chunks are buffered
+# until a sentence boundary. A minimum length keeps very short fragments ("Sure.") from
+# becoming separate TTS requests.
+
+import re
+from typing import AsyncIterator
+
+# End punctuation (Latin or Devanagari danda) followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?।])\s+")
+
+
+def pop_sentences(buffer: str, min_chars: int = 20):
+    """
+    Split complete sentences off the front of `buffer`.
+
+    Parameters:
+        buffer (str): Text received so far
+        min_chars (int): Shortest piece emitted; shorter sentences are joined to the next
+
+    Returns:
+        tuple: (list of sentences, remaining incomplete text)
+    """
+    sentences = []
+    start = 0
+    for boundary in SENTENCE_BOUNDARY.finditer(buffer):
+        sentence = buffer[start:boundary.start()].strip()
+        if len(sentence) >= min_chars:
+            sentences.append(sentence)
+            start = boundary.end()
+    return sentences, buffer[start:]
+
+
+async def astream_sentences(chunks: AsyncIterator[str], min_chars: int = 20) -> AsyncIterator[str]:
+    """
+    Re-chunk an async stream of text fragments into sentences as soon as each one completes.
+    Whatever is left when the stream ends is emitted as the final piece.
+    """
+    buffer = ""
+    async for chunk in chunks:
+        buffer += chunk
+        sentences, buffer = pop_sentences(buffer, min_chars)
+        for sentence in sentences:
+            yield sentence
+    if buffer.strip():
+        yield buffer.strip()
@@ -0,0 +1,191 @@
+# Local nearest-neighbour classifier for banking service requests.
+#
+# BankingServiceAgent used to send every query to the LLM even though BANKING_SERVICES
+# already lists phrases for each service. ServiceClassifier keeps those phrases, and the
+# phrases of past tickets the ticket system confirmed, as L2-normalised hashed character
+# n-gram rows of one float32 matrix. Classifying a query is one matrix-vector product
+# (cosine similarity to every phrase) followed by a per-service maximum. The answer is
+# used only when the best service is both similar enough (SERVICE_CLASSIFIER_THRESHOLD)
+# and clearly ahead of the runner-up (SERVICE_CLASSIFIER_MARGIN); ambiguous queries go
+# to the LLM as before. N-gram similarity cannot read negation ("I do not want to close
+# my account" is close to "close my account"), so queries with a negation, and services
+# whose ticket cannot be undone, are always left to the LLM.
+#
+# Learned phrases are appended to SERVICE_PHRASE_LOG_PATH and loaded again on start-up.
+# At most SERVICE_CLASSIFIER_MAX_PHRASES are kept; beyond that the oldest is replaced.
+
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import settings
+from text_features import hashed_ngrams, normalize_utterance
+
+# Phrases are short, so a small feature space keeps the matrix compact without many collisions
+N_FEATURES = 4096
+NGRAM_RANGE = (2, 4)
+
+# The LLM's answer for unclear queries; learning it would make the index claim vague queries
+NOT_LEARNED_SERVICES = {"general_banking_support"}
+# Irreversible requests are never raised on a local match alone
+LLM_ONLY_SERVICES = {"account_closure"}
+# Negations, after normalize_utterance ("don't" -> "don t")
+_NEGATIONS = {"not", "no", "never", "nor", "t", "cannot", "dont", "didnt", "doesnt", "cant", "wont", "isnt",
+              "without", "cancel", "stop"}
+
+
+def is_negated(text: str) -> bool:
+    """Whether a query contains a negation the n-gram match would ignore."""
+    return not _NEGATIONS.isdisjoint(normalize_utterance(text).split())
+
+
+def phrase_vector(text: str) -> np.ndarray:
+    """Dense L2-normalised n-gram vector of a raw phrase or query."""
+    indices, values = hashed_ngrams(normalize_utterance(text), N_FEATURES, NGRAM_RANGE)
+    vector = np.zeros(N_FEATURES, dtype=np.float32)
+    vector[indices] = values
+    return vector
+
+
+class ServiceClassifier:
+    """
+    Phrase index over the banking services.
+
+    Parameters:
+        services (dict): Service name -> example phrases (BANKING_SERVICES)
+        threshold (float): Lowest cosine similarity answered locally
+        margin (float): Lowest lead of the best service over the second best
+        log_path (str): JSON-lines file of learned phrases; empty disables persistence
+        max_learned (int): Learned phrases kept
+    """
+
+    def __init__(self, services: Dict[str, List[str]], threshold: Optional[float] = None,
+                 margin: Optional[float] = None, log_path: Optional[str] = None,
+                 max_learned: Optional[int] = None):
+        self.services = list(services)
+        self._service_index = {service: i for i, service in enumerate(self.services)}
+        self.threshold = settings.SERVICE_CLASSIFIER_THRESHOLD if threshold is None else threshold
+        self.margin = settings.SERVICE_CLASSIFIER_MARGIN if margin is None else margin
+        self.log_path = settings.SERVICE_PHRASE_LOG_PATH if log_path is None else log_path
+        self.max_learned = settings.SERVICE_CLASSIFIER_MAX_PHRASES if max_learned is None else max_learned
+        directory = os.path.dirname(self.log_path)
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError as e:
+                print(f"Could not create service phrase log directory {directory}: {e}")
+        self._lock = threading.Lock()
+        self.stats = {"local": 0, "ambiguous": 0, "learned": 0}
+
+        # Seed phrases, plus the service name itself ("email_update" -> "email update")
+        seeds = [(phrase, service) for service, phrases in services.items()
+                 for phrase in list(phrases) + [service.replace("_", " ")]]
+        self._seed_count = len(seeds)
+        self._matrix = np.zeros((self._seed_count + self.max_learned, N_FEATURES), dtype=np.float32)
+        self._labels = np.zeros(self._seed_count + self.max_learned, dtype=np.intp)
+        self._phrases: List[str] = []
+        self._size = 0
+        self._learned_total = 0
+        for phrase, service in seeds:
+            self._add(phrase, service)
+        self._load_log()
+
+    def _add(self, phrase: str, service: str) -> None:
+        # Seeds fill the first rows; learned phrases cycle through the rest
+        if self._size < len(self._labels):
+            row = self._size
+            self._size += 1
+            self._phrases.append(normalize_utterance(phrase))
+        else:
+            row = self._seed_count + self._learned_total % self.max_learned
+            self._phrases[row] = normalize_utterance(phrase)
+        if row >= self._seed_count:
+            self._learned_total += 1
+        self._matrix[row] = phrase_vector(phrase)
+        self._labels[row] = self._service_index[service]
+
+    def _load_log(self) -> None:
+        if not self.log_path or not os.path.exists(self.log_path):
+            return
+        learned: Dict[str, Tuple[str, str]] = {}
+        try:
+            with open(self.log_path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if record.get("service") in self._service_index and record.get("query"):
+                        # Later entries win for a repeated phrase
+                        key = normalize_utterance(record["query"])
+                        learned.pop(key, None)
+                        learned[key] = (record["query"], record["service"])
+        except OSError as e:
+            print(f"Could not read service phrase log {self.log_path}: {e}")
+            return
+        known = set(self._phrases)
+        for key, (query, service) in list(learned.items())[-self.max_learned:] if self.max_learned else []:
+            if key not in known:
+                self._add(query, service)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Highest cosine similarity of `query` to a phrase of each service, in `services` order."""
+        vector = phrase_vector(query)
+        best = np.full(len(self.services), -1.0, dtype=np.float32)
+        with self._lock:
+            similarities = self._matrix[:self._size] @ vector
+            np.maximum.at(best, self._labels[:self._size], similarities)
+        return best
+
+    def predict(self, query: str) -> Tuple[str, float, float]:
+        """Best service for `query`, its similarity and its lead over the second best service."""
+        best = self.scores(query)
+        first, second = np.argsort(-best)[:2]
+        return self.services[first], float(best[first]), float(best[first] - best[second])
+
+    def classify(self, query: str) -> Optional[str]:
+        """
+        The service for `query` when the match is confident, otherwise None (ask the LLM).
+        Negated queries and LLM_ONLY_SERVICES always return None.
+        """
+        if is_negated(query):
+            self.stats["ambiguous"] += 1
+            return None
+        service, similarity, lead = self.predict(query)
+        if similarity >= self.threshold and lead >= self.margin and service not in LLM_ONLY_SERVICES:
+            self.stats["local"] += 1
+            return service
+        self.stats["ambiguous"] += 1
+        return None
+
+    def learn(self, query: str, service: str) -> bool:
+        """
+        Add the phrase of a confirmed ticket to the index (and the log).
+
+        Nothing is added when the index already answers `query` with `service` confidently,
+        the phrase is known or negated, or the service is not one that is learned.
+
+        Returns:
+            bool: Whether the phrase was added
+        """
+        if (service not in self._service_index or service in NOT_LEARNED_SERVICES or self.max_learned <= 0
+                or is_negated(query)):
+            return False
+        predicted, similarity, lead = self.predict(query)
+        if predicted == service and similarity >= self.threshold and lead >= self.margin:
+            return False
+        with self._lock:
+            if normalize_utterance(query) in self._phrases:
+                return False
+            self._add(query, service)
+            self.stats["learned"] += 1
+        if self.log_path:
+            record = json.dumps({"query": query, "service": service, "ts": time.time()})
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as file:
+                    file.write(record + "\n")
+            except OSError as e:
+                print(f"Could not write service phrase log {self.log_path}: {e}")
+        return True
@@ -2,19 +2,21 @@
 
 import asyncio
 import json
-import requests  # For making HTTP requests to the ticket generation system
 from fastapi import FastAPI
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from config import settings
+from llm_client import compile_chain, get_llm_pool
+from result_cache import result_cache
+from ticket_client import get_ticket_client
+from async_utils import run_sync
+from batch_ticketing import aprocess_batch, summarize
+from classification_cache import classification_cache
+from service_classifier import ServiceClassifier
 
 app = FastAPI()
 
-# External API for ticket generation (Replace with actual URL)
-TICKET_API_URL = "https://1998-42-106-207-28.ngrok-free.app/query/process"
-
-# Initialize LLM Model
-LLM_MODEL = ChatGroq(api_key=settings.GROQ_API_KEY, model="llama-3.1-8b-instant")
+# External API for ticket generation (set TICKET_API_URL in the environment)
+TICKET_API_URL = settings.TICKET_API_URL
 
 # Define banking-related services
 BANKING_SERVICES = {
@@ -31,10 +33,17 @@ BANKING_SERVICES = {
     "general_banking_support": ["customer service", "help with banking app", "banking support"]
 }
 
+# Nearest-neighbour index over the phrases above and those of confirmed tickets
+service_classifier = ServiceClassifier(BANKING_SERVICES)
+
 # Service Identification Agent
 class BankingServiceAgent:
-    def __init__(self, model):
+    def __init__(self, model, cache=None, local_classifier=None):
         self.model = model
+        # Optional ClassificationCache shared across agents
+        self.cache = cache
+        # Optional ServiceClassifier; the LLM is only asked when it is not confident
+        self.local_classifier = local_classifier
         self.service_prompt = ChatPromptTemplate.from_messages([
             ("system", """
             You are an AI assistant specializing in banking service requests. 
@@ -66,11 +75,37 @@ class BankingServiceAgent:
             """),
             ("human", "{query}")
         ])
-        self.service_chain = self.service_prompt | self.model
+        self.service_chain = compile_chain(self.model, "service", self.service_prompt)
 
     def get_service(self, query: str) -> str:
+        if self.cache is not None:
+            return self.cache.get_or_compute("service", query, self.classify_service)
+        return self.classify_service(query)
+
+    def classify_service(self, query: str) -> str:
+        if self.local_classifier is not None:
+            service = self.local_classifier.classify(query)
+            if service is not None:
+                return service
         response = self.service_chain.invoke({"query": query})
-        service = response.content.strip().lower()
+        return self._parse_service(response.content)
+
+    async def aget_service(self, query: str) -> str:
+        if self.cache is not None:
+            return await self.cache.aget_or_compute("service", query, self.aclassify_service)
+        return await self.aclassify_service(query)
+
+    async def aclassify_service(self, query: str) -> str:
+        if self.local_classifier is not None:
+            service = self.local_classifier.classify(query)
+            if service is not None:
+                return service
+        response = await self.service_chain.ainvoke({"query": query})
+        return self._parse_service(response.content)
+
+    @staticmethod
+    def _parse_service(content: str) -> str:
+        service = content.strip().lower()
         return service if service in BANKING_SERVICES else "general_banking_support"
 
 
@@ -78,21 +113,34 @@ class BankingServiceAgent:
 def generate_ticket(username: str, query: str, service: str):
     """
     Sends user request details to an external ticketing system and retrieves the ticket number.
-    """
+    Cached query results of the user are dropped, since the request may change their data.
     
-    TICKET_API_URL = "https://1998-42-106-207-28.ngrok-free.app/query/process"
-    payload = {
-        "user_id": username,
-        "query": query
-    }
-    try:
-        response = requests.post(TICKET_API_URL, json=payload)
-        response_data = response.json()
-        print(f"Ticket System Response: {response_data}")
-        return [response_data.get("query_id", "N/A") , service]
-    except Exception as e:
-        print(f"Error contacting ticket system: {e}")
-        return "N/A"
+    Waits at most TICKET_RESPONSE_BUDGET_SECONDS; if the ticket system has not confirmed by
+    then (or is down), the ticket stays in the outbox and the number is "QUEUED-<reference>".
+    """
+    result_cache.invalidate(username)
+    return run_sync(get_ticket_client().submit(username, query, service))
+
+
+async def agenerate_ticket(username: str, query: str, service: str):
+    """
+    Async variant of generate_ticket; returns the same values.
+    """
+    result_cache.invalidate(username)
+    return await get_ticket_client().submit(username, query, service)
+
+
+# API Route to raise tickets for many service requests at once (e.g. a staff bulk import)
+@app.post("/process-banking-requests/batch")
+async def process_banking_requests_batch(request: dict):
+    """
+    Body: {"requests": [{"username": ..., "query": ...}, ...]}
+    Returns a result per request (service, ticket_id, status) and counts per status.
+    """
+    service_agent = BankingServiceAgent(get_llm_pool(), cache=classification_cache,
+                                        local_classifier=service_classifier)
+    results = await aprocess_batch(request.get("requests", []), service_agent)
+    return {"results": results, "summary": summarize(results)}
 
 
 # # API Route to Identify Service and Generate Ticket
@@ -102,7 +150,7 @@ def generate_ticket(username: str, query: str, service: str):
 #     user_query = request.get("query", "")
 
 #     # Identify the service request type
-#     service_agent = BankingServiceAgent(LLM_MODEL)
+#     service_agent = BankingServiceAgent(get_llm_pool())
 #     identified_service = service_agent.get_service(user_query)
 
 #     # Generate a ticket for the request
@@ -115,13 +163,14 @@ def generate_ticket(username: str, query: str, service: str):
 
 
 
-user_query = "I want to apply for a credit card"  # Example user query
-username = "3e0c98bf-c9b9-4d9b-b244-5d3e4906a386" # Example username
+if __name__ == "__main__":
+    user_query = "I want to apply for a credit card"  # Example user query
+    username = "3e0c98bf-c9b9-4d9b-b244-5d3e4906a386" # Example username
 
     # Identify the service request type
-service_agent = BankingServiceAgent(LLM_MODEL)
-identified_service = service_agent.get_service(user_query)
+    service_agent = BankingServiceAgent(get_llm_pool(), local_classifier=service_classifier)
+    identified_service = service_agent.get_service(user_query)
 
     # Generate a ticket for the request
-ticket_number = generate_ticket(username,user_query,identified_service)
-print(f"Ticket Number: {ticket_number} | Service: {identified_service}")
+    ticket_number = generate_ticket(username,user_query,identified_service)
+    print(f"Ticket Number: {ticket_number} | Service: {identified_service}")
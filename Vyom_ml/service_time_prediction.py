@@ -1,3 +1,195 @@
+import numpy as np
+
+# Predefined base resolution times (in minutes)
+BASE_RESOLUTION_TIMES = {
+    "Credit": {
+        "Retail Loans": {1: 40, 2: 80, 3: 120},
+        "Corporate Loans": {1: 35, 2: 70, 3: 105},
+        "Credit Cards": {1: 30, 2: 60, 3: 90},
+        "Mortgage & Secured Loans": {1: 45, 2: 90, 3: 135},
+        "Microfinance & Agricultural Loans": {1: 25, 2: 50, 3: 75}
+    },
+    "General Banking": {
+        "Accounts & Deposits": {1: 10, 2: 20, 3: 30},
+        "Transactions & Payments": {1: 15, 2: 30, 3: 45},
+        "Cards & Banking Services": {1: 12, 2: 24, 3: 36},
+        "KYC & Documentation": {1: 8, 2: 16, 3: 24},
+        "Banking Tech & Digital Services": {1: 10, 2: 20, 3: 30}
+    },
+    "Forex": {
+        "Currency Exchange": {1: 5, 2: 10, 3: 15},
+        "International Transactions": {1: 8, 2: 16, 3: 24},
+        "Trade Finance": {1: 20, 2: 40, 3: 60},
+        "Foreign Investments & NRI Banking": {1: 25, 2: 50, 3: 75}
+    }
+}
+
+
+def _round_one_decimal(values) -> np.ndarray:
+    """
+    Round to one decimal exactly like the built-in round(value, 1).
+
+    np.round scales by 10 first, which can turn a value just below a half (166.05 is
+    stored as 166.0499...) into an exact tie and round it the other way. Values that
+    close to a tie are rounded with the built-in instead.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, 1)
+    scaled = values * 10
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_tie.any():
+        rounded = np.array(rounded, dtype=float)
+        rounded[near_tie] = [round(value, 1) for value in values[near_tie].tolist()]
+    return rounded
+
+
+class ResolutionTimeError(ValueError):
+    """Base class for invalid resolution-time inputs."""
+
+
+class UnknownDepartmentError(ResolutionTimeError):
+    def __init__(self, dept):
+        self.dept = dept
+        super().__init__(f"Department '{dept}' not recognized.")
+
+
+class UnknownSubDepartmentError(ResolutionTimeError):
+    def __init__(self, dept, sub_dept):
+        self.dept = dept
+        self.sub_dept = sub_dept
+        super().__init__(f"Sub-Department '{sub_dept}' not recognized in Department '{dept}'.")
+
+
+class UnknownServiceLevelError(ResolutionTimeError):
+    def __init__(self, dept, sub_dept, service_level):
+        self.dept = dept
+        self.sub_dept = sub_dept
+        self.service_level = service_level
+        super().__init__(f"Service Level '{service_level}' not recognized for Department '{dept}' "
+                         f"and Sub-Department '{sub_dept}'.")
+
+
+class ResolutionTimeEstimator:
+    """
+    Resolution-time formula compiled into an integer-coded lookup tensor.
+
+    The base-time table is compiled once into `base_time_table[dept, sub_dept, level]`
+    (NaN where a combination does not exist). Inputs are encoded to integer codes and
+    a whole batch is scored with a single gather and multiply:
+
+        resolution_time = base_time * (1 + 0.1 * (priority_score - 5))
+    """
+
+    def __init__(self, base_times=None):
+        base_times = base_times or BASE_RESOLUTION_TIMES
+
+        self.departments = list(base_times)
+        self.department_codes = {dept: code for code, dept in enumerate(self.departments)}
+        self.sub_departments = {dept: list(subs) for dept, subs in base_times.items()}
+        self.sub_department_codes = {
+            (dept, sub_dept): code
+            for dept, subs in base_times.items()
+            for code, sub_dept in enumerate(subs)
+        }
+        self.service_levels = sorted({level for subs in base_times.values()
+                                      for levels in subs.values() for level in levels})
+        self.service_level_codes = {level: code for code, level in enumerate(self.service_levels)}
+
+        max_subs = max(len(subs) for subs in base_times.values())
+        self.base_time_table = np.full((len(self.departments), max_subs, len(self.service_levels)), np.nan)
+        for (dept, sub_dept), sub_code in self.sub_department_codes.items():
+            for level, minutes in base_times[dept][sub_dept].items():
+                self.base_time_table[self.department_codes[dept], sub_code, self.service_level_codes[level]] = minutes
+
+    def encode(self, dept, sub_dept, service_level):
+        """
+        Encode department, sub-department and service-level arrays to integer codes.
+        Raises the matching ResolutionTimeError for the first unknown value.
+        """
+        dept = np.atleast_1d(np.asarray(dept, dtype=object))
+        sub_dept = np.atleast_1d(np.asarray(sub_dept, dtype=object))
+        service_level = np.atleast_1d(np.asarray(service_level))
+
+        # Look up each distinct value once; open-ticket batches repeat a handful of values
+        unique_depts, dept_inverse = np.unique(dept.astype(str), return_inverse=True)
+        dept_codes = np.empty(len(unique_depts), dtype=np.intp)
+        for i, name in enumerate(unique_depts):
+            if name not in self.department_codes:
+                raise UnknownDepartmentError(name)
+            dept_codes[i] = self.department_codes[name]
+        dept_codes = dept_codes[dept_inverse]
+
+        pairs = np.char.add(np.char.add(dept.astype(str), "\x1f"), sub_dept.astype(str))
+        unique_pairs, pair_inverse = np.unique(pairs, return_inverse=True)
+        sub_codes = np.empty(len(unique_pairs), dtype=np.intp)
+        for i, pair in enumerate(unique_pairs):
+            dept_name, sub_name = str(pair).split("\x1f", 1)
+            if (dept_name, sub_name) not in self.sub_department_codes:
+                raise UnknownSubDepartmentError(dept_name, sub_name)
+            sub_codes[i] = self.sub_department_codes[(dept_name, sub_name)]
+        sub_codes = sub_codes[pair_inverse]
+
+        unique_levels, level_inverse = np.unique(service_level, return_inverse=True)
+        level_codes = np.empty(len(unique_levels), dtype=np.intp)
+        for i, level in enumerate(unique_levels):
+            level = level.item() if hasattr(level, "item") else level
+            if level not in self.service_level_codes:
+                first = int(np.flatnonzero(level_inverse == i)[0])
+                raise UnknownServiceLevelError(dept[first], sub_dept[first], level)
+            level_codes[i] = self.service_level_codes[level]
+        level_codes = level_codes[level_inverse]
+
+        return dept_codes, sub_codes, level_codes
+
+    def predict_codes(self, priority_score, dept_codes, sub_codes, level_codes):
+        """
+        Score pre-encoded inputs in one vectorized expression.
+        Returns resolution times in minutes (float array, rounded to one decimal).
+        """
+        base_time = self.base_time_table[dept_codes, sub_codes, level_codes]
+        missing = np.isnan(base_time)
+        if missing.any():
+            first = int(np.flatnonzero(missing)[0])
+            dept = self.departments[np.broadcast_to(dept_codes, base_time.shape)[first]]
+            sub_dept = self.sub_departments[dept][np.broadcast_to(sub_codes, base_time.shape)[first]]
+            level = self.service_levels[np.broadcast_to(level_codes, base_time.shape)[first]]
+            raise UnknownServiceLevelError(dept, sub_dept, level)
+
+        multiplier = 1 + 0.1 * (np.asarray(priority_score, dtype=float) - 5)
+        return _round_one_decimal(base_time * multiplier)
+
+    def predict(self, priority_score, dept, sub_dept, service_level):
+        """
+        Predict resolution times (minutes) for arrays of tickets.
+
+        Parameters:
+            priority_score (array-like): 1 (highest priority) to 10 (lowest)
+            dept (array-like): Department names
+            sub_dept (array-like): Sub-Department names within each department
+            service_level (array-like): 1 (very easy), 2 (medium) or 3 (hard)
+
+        Returns:
+            np.ndarray of resolution times rounded to one decimal
+        """
+        return self.predict_codes(priority_score, *self.encode(dept, sub_dept, service_level))
+
+    def predict_one(self, priority_score, dept, sub_dept, service_level) -> float:
+        """Predict a single resolution time; raises ResolutionTimeError for unknown inputs."""
+        if dept not in self.department_codes:
+            raise UnknownDepartmentError(dept)
+        if (dept, sub_dept) not in self.sub_department_codes:
+            raise UnknownSubDepartmentError(dept, sub_dept)
+        if service_level not in self.service_level_codes:
+            raise UnknownServiceLevelError(dept, sub_dept, service_level)
+        codes = (self.department_codes[dept], self.sub_department_codes[(dept, sub_dept)],
+                 self.service_level_codes[service_level])
+        return float(self.predict_codes(priority_score, *codes))
+
+
+# Shared estimator; the lookup tensor is compiled once at import
+resolution_time_estimator = ResolutionTimeEstimator()
+
+
 def predict_resolution_time(priority_score, dept, sub_dept, service_level):
     """
     Predicts query resolution time in minutes based on:
@@ -5,71 +197,32 @@ def predict_resolution_time(priority_score, dept, sub_dept, service_level):
       - dept: Department name (e.g., "Credit", "General Banking", "Forex")
       - sub_dept: Sub-Department name within the department
       - service_level: 1 (very easy), 2 (medium), or 3 (hard)
-    
-    Note: For some services with low base times, a high priority and low service level may result in 
+
+    Note: For some services with low base times, a high priority and low service level may result in
     a resolution time of less than 10 minutes.
-    
+
+    Kept for existing callers: unknown inputs are reported as an error message string.
+    Use `resolution_time_estimator` directly for typed errors and batch scoring.
+
     Returns:
       Predicted resolution time (in minutes) as a float, rounded to one decimal.
     """
-    # Predefined base resolution times (in minutes)
-    base_times = {
-        "Credit": {
-            "Retail Loans": {1: 40, 2: 80, 3: 120},
-            "Corporate Loans": {1: 35, 2: 70, 3: 105},
-            "Credit Cards": {1: 30, 2: 60, 3: 90},
-            "Mortgage & Secured Loans": {1: 45, 2: 90, 3: 135},
-            "Microfinance & Agricultural Loans": {1: 25, 2: 50, 3: 75}
-        },
-        "General Banking": {
-            "Accounts & Deposits": {1: 10, 2: 20, 3: 30},
-            "Transactions & Payments": {1: 15, 2: 30, 3: 45},
-            "Cards & Banking Services": {1: 12, 2: 24, 3: 36},
-            "KYC & Documentation": {1: 8, 2: 16, 3: 24},
-            "Banking Tech & Digital Services": {1: 10, 2: 20, 3: 30}
-        },
-        "Forex": {
-            "Currency Exchange": {1: 5, 2: 10, 3: 15},
-            "International Transactions": {1: 8, 2: 16, 3: 24},
-            "Trade Finance": {1: 20, 2: 40, 3: 60},
-            "Foreign Investments & NRI Banking": {1: 25, 2: 50, 3: 75}
-        }
-    }
-    
-    # Check if the department exists.
-    if dept not in base_times:
-        return f"Department '{dept}' not recognized."
-    
-    # Check if the sub-department exists in the department.
-    if sub_dept not in base_times[dept]:
-        return f"Sub-Department '{sub_dept}' not recognized in Department '{dept}'."
-    
-    # Check if the service level exists for the given sub-department.
-    if service_level not in base_times[dept][sub_dept]:
-        return f"Service Level '{service_level}' not recognized for Department '{dept}' and Sub-Department '{sub_dept}'."
-    
-    # Retrieve the base resolution time.
-    base_time = base_times[dept][sub_dept][service_level]
-    
-    # Compute the priority multiplier.
-    multiplier = 1 + 0.1 * (priority_score - 5)
-    
-    # Calculate the final resolution time.
-    resolution_time = base_time * multiplier
-    
-    # Return the result rounded to one decimal place.
-    return round(resolution_time, 1)
-
-# Example usages:
-
-# 1. Forex, Currency Exchange, Level 1, with highest priority (1)
-# Expected: Base time = 5, multiplier = 0.6, so 5 * 0.6 = 3.0 minutes.
-print("Example 1:", predict_resolution_time(1, "Forex", "Currency Exchange", 1))
-
-# 2. General Banking, Accounts & Deposits, Level 1, with highest priority (1)
-# Expected: Base time = 10, multiplier = 0.6, so 10 * 0.6 = 6.0 minutes.
-print("Example 2:", predict_resolution_time(1, "General Banking", "Accounts & Deposits", 1))
-
-# 3. Credit, Retail Loans, Level 3, with low priority (10)
-# Expected: Base time = 120, multiplier = 1.5, so 120 * 1.5 = 180.0 minutes.
-print("Example 3:", predict_resolution_time(10, "Credit", "Retail Loans", 3))
+    try:
+        return resolution_time_estimator.predict_one(priority_score, dept, sub_dept, service_level)
+    except ResolutionTimeError as e:
+        return str(e)
+
+if __name__ == "__main__":
+    # Example usages:
+
+    # 1. Forex, Currency Exchange, Level 1, with highest priority (1)
+    # Expected: Base time = 5, multiplier = 0.6, so 5 * 0.6 = 3.0 minutes.
+    print("Example 1:", predict_resolution_time(1, "Forex", "Currency Exchange", 1))
+
+    # 2. General Banking, Accounts & Deposits, Level 1, with highest priority (1)
+    # Expected: Base time = 10, multiplier = 0.6, so 10 * 0.6 = 6.0 minutes.
+    print("Example 2:", predict_resolution_time(1, "General Banking", "Accounts & Deposits", 1))
+
+    # 3. Credit, Retail Loans, Level 3, with low priority (10)
+    # Expected: Base time = 120, multiplier = 1.5, so 120 * 1.5 = 180.0 minutes.
+    print("Example 3:", predict_resolution_time(10, "Credit", "Retail Loans", 3))
@@ -0,0 +1,76 @@
+# Server-issued sessions for the voice API.
+#
+# The voice endpoints used to take session_id straight from the request form and use it
+# as the chat-history key, the authentication-state key and the database username, so a
+# caller could claim anyone's session and identity (and callers without one all shared
+# "user123"). Sessions are now issued by the server: the banking app's backend, after its
+# own login, calls POST /sessions with the customer's user id and the issuer key, and
+# hands the returned random token to the client. The voice endpoints only accept tokens
+# found here, and the customer is always the user id bound to the token.
+# Tokens live in the session store (kind "voice_session"), so every worker sees them.
+
+import hmac
+import secrets
+import threading
+import time
+from typing import Optional
+from config import settings
+from session_store import SessionStore, get_session_store
+
+
+class SessionRegistry:
+    """
+    Random session tokens bound to the user id they were issued for.
+
+    Parameters:
+        backend (SessionStore): Where tokens are kept
+        ttl_seconds (float): How long a token stays valid after it was issued
+    """
+
+    KIND = "voice_session"
+
+    def __init__(self, backend: SessionStore, ttl_seconds: Optional[float] = None):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds or settings.SESSION_TTL_SECONDS
+
+    def issue(self, user_id: str) -> str:
+        """Create a session for `user_id` and return its token."""
+        if not user_id:
+            raise ValueError("A session needs a user id")
+        token = secrets.token_urlsafe(32)
+        self.backend.save(self.KIND, token, {"user_id": user_id, "expires_at": time.time() + self.ttl_seconds})
+        return token
+
+    def resolve(self, token: Optional[str]) -> Optional[str]:
+        """User id of a valid session token, or None for unknown or expired tokens."""
+        if not token:
+            return None
+        session = self.backend.load(self.KIND, token)
+        if session is None:
+            return None
+        if session["expires_at"] <= time.time():
+            self.backend.delete(self.KIND, token)
+            return None
+        return session["user_id"]
+
+    def revoke(self, token: str) -> None:
+        self.backend.delete(self.KIND, token)
+
+
+def issuer_key_valid(presented: Optional[str]) -> bool:
+    """Whether `presented` is the configured SESSION_ISSUER_API_KEY (never true while it is unset)."""
+    expected = settings.SESSION_ISSUER_API_KEY
+    return bool(expected) and bool(presented) and hmac.compare_digest(presented, expected)
+
+
+_session_registry: Optional[SessionRegistry] = None
+_session_registry_lock = threading.Lock()
+
+
+def get_session_registry() -> SessionRegistry:
+    """Process-wide SessionRegistry on the configured session store."""
+    global _session_registry
+    with _session_registry_lock:
+        if _session_registry is None:
+            _session_registry = SessionRegistry(get_session_store())
+        return _session_registry
@@ -0,0 +1,322 @@
+# Pluggable storage for per-session state (chat history, authentication state).
+#
+# MessageStore and the AuthenticationState classes keep a local copy of each session and
+# write it through one of these backends, so a restarted process or another uvicorn
+# worker can pick the session up:
+#   memory - process-local (the old behaviour; nothing survives a restart), bounded like
+#            MessageStore by SESSION_MAX_COUNT and SESSION_TTL_SECONDS
+#   sqlite - a WAL-mode SQLite file shared by every worker on the host
+#   shm    - the same SQLite store on tmpfs (/dev/shm): shared between workers at memory
+#            speed, but lost on reboot
+# SQLite writes are write-behind: save() only queues the value, and a background thread
+# commits queued values in batches, so a turn never waits for a disk sync.
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from config import settings
+
+
+def _encode(value: Dict[str, Any]) -> str:
+    # Handler results may hold dates or decimals from the database; store those as text
+    return json.dumps(value, default=str)
+
+
+class SessionStore(ABC):
+    """
+    Interface for session state backends. Values are JSON-serialisable dicts stored
+    under a (kind, session_id) key, e.g. ("history", "user123").
+    """
+
+    @abstractmethod
+    def load(self, kind: str, session_id: str) -> Optional[Dict[str, Any]]:
+        """The value stored under (kind, session_id), or None."""
+
+    @abstractmethod
+    def save(self, kind: str, session_id: str, value: Dict[str, Any]) -> None:
+        """Store `value` under (kind, session_id), replacing any earlier value."""
+
+    @abstractmethod
+    def delete(self, kind: str, session_id: str) -> None:
+        """Remove the value stored under (kind, session_id), if any."""
+
+    def flush(self) -> None:
+        """Make every earlier save() durable."""
+
+    def close(self) -> None:
+        self.flush()
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Process-local backend. Values are stored serialised, so callers never share objects.
+
+    Bounded like MessageStore, since nothing else ever removes a session from it: values
+    not used for ttl_seconds expire, and each kind keeps at most max_sessions values,
+    evicting the least recently used.
+
+    Parameters:
+        max_sessions (int): Values kept per kind
+        ttl_seconds (float): Values not loaded or saved for this long are dropped
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_sessions = max_sessions or settings.SESSION_MAX_COUNT
+        self.ttl_seconds = ttl_seconds or settings.SESSION_TTL_SECONDS
+        # kind -> session_id -> (encoded value, last used), least recently used first
+        self._values: Dict[str, "OrderedDict[str, Tuple[str, float]]"] = {}
+        self._lock = threading.Lock()
+        self.stats = {"expired": 0, "lru": 0}
+
+    def load(self, kind: str, session_id: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            values = self._values.get(kind)
+            entry = values.get(session_id) if values is not None else None
+            if entry is None:
+                return None
+            if now - entry[1] > self.ttl_seconds:
+                del values[session_id]
+                self.stats["expired"] += 1
+                return None
+            values[session_id] = (entry[0], now)
+            values.move_to_end(session_id)
+        return json.loads(entry[0])
+
+    def save(self, kind: str, session_id: str, value: Dict[str, Any]) -> None:
+        encoded = _encode(value)
+        now = time.monotonic()
+        with self._lock:
+            values = self._values.setdefault(kind, OrderedDict())
+            values[session_id] = (encoded, now)
+            values.move_to_end(session_id)
+            self._evict(values, now)
+
+    def delete(self, kind: str, session_id: str) -> None:
+        with self._lock:
+            self._values.get(kind, {}).pop(session_id, None)
+
+    def _evict(self, values: "OrderedDict[str, Tuple[str, float]]", now: float) -> None:
+        while values:
+            session_id, (_, last_used) = next(iter(values.items()))
+            if now - last_used > self.ttl_seconds:
+                self.stats["expired"] += 1
+            elif len(values) > self.max_sessions:
+                self.stats["lru"] += 1
+            else:
+                break
+            del values[session_id]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(values) for values in self._values.values())
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite backend in WAL mode with batched write-behind.
+
+    Parameters:
+        path (str): Database file; every process opening the same file shares the sessions
+        flush_interval (float): Seconds between background commits of queued writes
+        batch_size (int): Queued writes that trigger an immediate commit
+        ttl_seconds (float): Sessions not written for this long are deleted by the flusher
+    """
+
+    def __init__(self, path: Optional[str] = None, flush_interval: Optional[float] = None,
+                 batch_size: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.path = path or settings.SESSION_STORE_PATH
+        self.flush_interval = flush_interval or settings.SESSION_STORE_FLUSH_INTERVAL
+        self.batch_size = batch_size or settings.SESSION_STORE_BATCH_SIZE
+        self.ttl_seconds = ttl_seconds or settings.SESSION_TTL_SECONDS
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL makes NORMAL safe against corruption; a power cut loses at most the last commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS session_state (
+                kind TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                value TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (kind, session_id)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_session_state_updated ON session_state (updated_at)")
+        self._conn_lock = threading.Lock()
+
+        # Queued writes, newest value per key; None marks a delete
+        self._pending: Dict[Tuple[str, str], Optional[str]] = {}
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._last_expiry = 0.0
+        self.stats = {"saves": 0, "commits": 0, "rows_written": 0, "expired": 0}
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="vyom-session-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def load(self, kind: str, session_id: str) -> Optional[Dict[str, Any]]:
+        key = (kind, session_id)
+        with self._pending_lock:
+            if key in self._pending:
+                # Not committed yet; read our own write
+                value = self._pending[key]
+                return json.loads(value) if value is not None else None
+        with self._conn_lock:
+            row = self._conn.execute("SELECT value FROM session_state WHERE kind = ? AND session_id = ?", key).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def save(self, kind: str, session_id: str, value: Dict[str, Any]) -> None:
+        self._queue((kind, session_id), _encode(value))
+
+    def delete(self, kind: str, session_id: str) -> None:
+        self._queue((kind, session_id), None)
+
+    def _queue(self, key: Tuple[str, str], encoded: Optional[str]) -> None:
+        with self._pending_lock:
+            self._pending[key] = encoded
+            self.stats["saves"] += 1
+            backlog = len(self._pending)
+        if backlog >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self) -> None:
+        with self._pending_lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        now = time.time()
+        upserts = [(kind, session_id, value, now) for (kind, session_id), value in batch.items() if value is not None]
+        deletes = [key for key, value in batch.items() if value is None]
+        with self._conn_lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._conn.executemany("""
+                    INSERT INTO session_state (kind, session_id, value, updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (kind, session_id) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+                """, upserts)
+                self._conn.executemany("DELETE FROM session_state WHERE kind = ? AND session_id = ?", deletes)
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                # Requeue, keeping anything written since
+                with self._pending_lock:
+                    self._pending = {**batch, **self._pending}
+                raise
+        self.stats["commits"] += 1
+        self.stats["rows_written"] += len(batch)
+
+    def expire(self) -> int:
+        """Delete sessions not written within ttl_seconds; returns the number of rows removed."""
+        with self._conn_lock:
+            removed = self._conn.execute("DELETE FROM session_state WHERE updated_at < ?",
+                                         (time.time() - self.ttl_seconds,)).rowcount
+        self.stats["expired"] += removed
+        return removed
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if time.monotonic() - self._last_expiry > 60:
+                    self._last_expiry = time.monotonic()
+                    self.expire()
+            except sqlite3.Error as e:
+                print(f"Session store flush failed, will retry: {e}")
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+        with self._conn_lock:
+            self._conn.close()
+
+
+class SharedMemorySessionStore(SQLiteSessionStore):
+    """SQLite backend on tmpfs: shared by the workers on one host, kept in RAM, gone after reboot."""
+
+    def __init__(self, path: Optional[str] = None, **kwargs):
+        super().__init__(path or settings.SESSION_STORE_SHM_PATH, **kwargs)
+
+
+class StateSync:
+    """
+    Keeps a process-local dict of per-session state dicts in step with a SessionStore.
+
+    Each save stamps a new revision; refresh() replaces the local copy only when the stored
+    revision differs, i.e. after a restart or when another worker changed the session.
+
+    Parameters:
+        backend (SessionStore): Where the state is persisted
+        kind (str): Record kind, e.g. "assistant_auth"
+        local (dict): The owner's session_id -> state dict, updated in place
+    """
+
+    def __init__(self, backend: SessionStore, kind: str, local: Dict[str, Any]):
+        self.backend = backend
+        self.kind = kind
+        self.local = local
+        self._revisions: Dict[str, str] = {}
+
+    def refresh(self, session_id: str) -> None:
+        stored = self.backend.load(self.kind, session_id)
+        if stored is not None and stored.get("revision") != self._revisions.get(session_id):
+            self.local[session_id] = stored["state"]
+            self._revisions[session_id] = stored["revision"]
+
+    def save(self, session_id: str) -> None:
+        if session_id not in self.local:
+            return
+        revision = uuid.uuid4().hex
+        self._revisions[session_id] = revision
+        self.backend.save(self.kind, session_id, {"state": self.local[session_id], "revision": revision})
+
+    def delete(self, session_id: str) -> None:
+        self._revisions.pop(session_id, None)
+        self.backend.delete(self.kind, session_id)
+
+
+SESSION_STORE_BACKENDS = {
+    "memory": MemorySessionStore,
+    "sqlite": SQLiteSessionStore,
+    "shm": SharedMemorySessionStore,
+}
+
+_session_store: Optional[SessionStore] = None
+_session_store_lock = threading.Lock()
+
+
+def create_session_store(backend: Optional[str] = None, **kwargs) -> SessionStore:
+    """Create a session store for `backend` ("memory", "sqlite" or "shm"; default from settings)."""
+    backend = backend or settings.SESSION_STORE_BACKEND
+    if backend not in SESSION_STORE_BACKENDS:
+        raise ValueError(f"Unknown session store backend '{backend}'. Choose from {list(SESSION_STORE_BACKENDS)}.")
+    return SESSION_STORE_BACKENDS[backend](**kwargs)
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide session store configured by SESSION_STORE_BACKEND."""
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = create_session_store()
+        return _session_store
@@ -0,0 +1,280 @@
+# Guarded execution of LLM-generated SQL.
+#
+# The SQL the LLM writes runs against the customer database as-is, so one bad generation
+# ("SELECT * FROM transactions") could pull every row into memory and into the reply
+# prompt, and a hallucinated UPDATE would change data. Before a statement runs it is
+# tokenized and checked:
+#   - exactly one statement, starting with SELECT or WITH
+#   - no data-modifying or DDL keyword, no SELECT ... INTO, no row locking clause, and no
+#     function from a short deny list (sleeping, file access, sequences)
+#   - the outermost LIMIT is injected, or clamped when it is larger than allowed
+# Rows are then streamed in batches (a server-side named cursor on Postgres, see
+# ConnectionPool.iter_batches) into a ColumnarResult that stops at the row and byte
+# limits, so memory stays bounded whatever the statement asks for.
+#
+# The deny lists only reject the obvious; a write-capable function missing from them
+# would still pass. Guarded statements therefore also run read-only on the database
+# side (a READ ONLY transaction on Postgres, PRAGMA query_only on SQLite).
+
+import re
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from config import settings
+
+_TOKEN = re.compile(r"""
+      (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>[eE]?'(?:[^']|'')*'|\$(?P<tag>[A-Za-z_]*)\$.*?\$(?P=tag)\$)
+    | (?P<ident>"(?:[^"]|"")*"|`[^`]*`)
+    | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<param>%s|\?|\$\d+)
+    | (?P<word>[A-Za-z_][\w$]*)
+    | (?P<space>\s+)
+    | (?P<punct>::|<>|!=|<=|>=|\|\||.)
+""", re.S | re.X)
+
+# Keywords that only appear in statements that write, change the schema or run other code
+FORBIDDEN_KEYWORDS = {
+    "insert", "update", "delete", "merge", "upsert", "alter", "drop", "create", "truncate",
+    "grant", "revoke", "copy", "call", "do", "execute", "exec", "prepare", "deallocate", "lock", "vacuum",
+    "reindex", "listen", "notify", "attach", "detach", "pragma", "into",
+}
+FORBIDDEN_FUNCTIONS = {
+    "pg_sleep", "pg_sleep_for", "pg_sleep_until", "pg_read_file", "pg_read_binary_file", "pg_ls_dir",
+    "pg_stat_file", "lo_import", "lo_export", "dblink", "dblink_exec", "pg_terminate_backend",
+    "pg_cancel_backend", "set_config", "nextval", "setval", "load_extension", "readfile", "writefile",
+    "lo_unlink", "lo_create", "lo_creat", "lo_put", "lo_from_bytea", "lo_truncate", "lo_open", "lowrite",
+    "pg_advisory_lock", "pg_advisory_xact_lock", "pg_notify", "pg_reload_conf", "pg_rotate_logfile",
+}
+
+
+class SQLGuardError(ValueError):
+    """The statement is not a single read-only SELECT."""
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str
+    start: int
+    end: int
+    depth: int  # parenthesis nesting level
+
+    @property
+    def keyword(self) -> str:
+        return self.text.lower() if self.kind == "word" else ""
+
+
+def tokenize_sql(sql: str) -> List[Token]:
+    """Tokens of `sql` without whitespace and comments; raises SQLGuardError on unbalanced input."""
+    tokens, depth = [], 0
+    for match in _TOKEN.finditer(sql):
+        kind, text = match.lastgroup, match.group(0)
+        if kind in ("space", "comment"):
+            continue
+        if kind == "punct" and (text in ("'", '"', "`", "$") or sql.startswith("/*", match.start())):
+            raise SQLGuardError("Unterminated string, identifier or comment")
+        if text == ")":
+            depth -= 1
+            if depth < 0:
+                raise SQLGuardError("Unbalanced parentheses")
+        tokens.append(Token(kind, text, match.start(), match.end(), depth))
+        if text == "(":
+            depth += 1
+    if depth != 0:
+        raise SQLGuardError("Unbalanced parentheses")
+    return tokens
+
+
+def _check_read_only(tokens: List[Token]) -> None:
+    first = next((token for token in tokens if token.text != "("), None)
+    if first is None or first.keyword not in ("select", "with"):
+        raise SQLGuardError("Only SELECT statements may run")
+    for i, token in enumerate(tokens):
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token.text == ";":
+            raise SQLGuardError("Only a single statement may run")
+        if token.keyword in FORBIDDEN_KEYWORDS:
+            raise SQLGuardError(f"'{token.text.upper()}' is not allowed in a read-only query")
+        if token.keyword in FORBIDDEN_FUNCTIONS and following is not None and following.text == "(":
+            raise SQLGuardError(f"Function '{token.text}' is not allowed")
+        if (token.keyword == "for" and token.depth == 0 and following is not None
+                and following.keyword in ("share", "key", "no")):
+            raise SQLGuardError("Row locking clauses are not allowed")
+
+
+def guard_select(sql: str, limit: int) -> str:
+    """
+    Validate that `sql` is a single read-only SELECT and bound its result to `limit` rows.
+
+    A missing outermost LIMIT is added (before OFFSET, if any) and a literal one above
+    `limit` is lowered. A LIMIT that is a parameter or expression, LIMIT ALL or FETCH FIRST
+    is kept and the statement is wrapped in SELECT * FROM (...) LIMIT `limit`.
+
+    Returns:
+        str: The statement to run (without a trailing semicolon)
+
+    Raises:
+        SQLGuardError: The statement is not allowed
+    """
+    tokens = tokenize_sql(sql)
+    while tokens and tokens[-1].text == ";":
+        tokens.pop()
+    if not tokens:
+        raise SQLGuardError("Empty statement")
+    _check_read_only(tokens)
+    body = sql[:tokens[-1].end]
+
+    top_level = [(i, token) for i, token in enumerate(tokens) if token.depth == 0]
+    limits = [i for i, token in top_level if token.keyword == "limit"]
+    if any(token.keyword == "fetch" for _, token in top_level):
+        return _wrap(body, limit)
+    if not limits:
+        offset = next((token for _, token in top_level if token.keyword == "offset"), None)
+        if offset is not None:
+            return f"{body[:offset.start]}LIMIT {limit} {body[offset.start:]}"
+        # On its own line, so a trailing "-- comment" cannot swallow it
+        return f"{body}\nLIMIT {limit}"
+    value = tokens[limits[-1] + 1] if limits[-1] + 1 < len(tokens) else None
+    after = tokens[limits[-1] + 2] if limits[-1] + 2 < len(tokens) else None
+    if value is None or value.kind != "number" or not value.text.isdigit() or (after is not None and after.text == ","):
+        # Parameter, expression, ALL, or SQLite's "LIMIT offset, count"
+        return _wrap(body, limit)
+    if int(value.text) <= limit:
+        return body
+    return f"{body[:value.start]}{limit}{body[value.end:]}"
+
+
+def _wrap(body: str, limit: int) -> str:
+    return f"SELECT * FROM (\n{body}\n) AS vyom_guarded LIMIT {limit}"
+
+
+class ColumnarResult:
+    """
+    Query result stored column by column. Integer and float columns without NULLs are kept
+    as numpy arrays (8 bytes per value instead of a Python object each).
+
+    Parameters:
+        column_names (list): Column names in select order
+        columns (list): One sequence of values per column
+        truncated (bool): Whether rows were left out because of the row or byte limit
+    """
+
+    def __init__(self, column_names: List[str], columns: List[Sequence[Any]], truncated: bool = False):
+        self.column_names = column_names
+        self.columns = columns
+        self.truncated = truncated
+
+    def __len__(self) -> int:
+        return len(self.columns[0]) if self.columns else 0
+
+    def column(self, name: str) -> List[Any]:
+        values = self.columns[self.column_names.index(name)]
+        return values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+    def rows(self) -> Iterator[Tuple]:
+        plain = [values.tolist() if isinstance(values, np.ndarray) else values for values in self.columns]
+        return zip(*plain) if plain else iter(())
+
+    def to_rows(self) -> List[Tuple]:
+        return list(self.rows())
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the values."""
+        return sum(values.nbytes if isinstance(values, np.ndarray) else sum(len(str(v)) + 16 for v in values)
+                   for values in self.columns)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"column_names": self.column_names, "results": self.to_rows(), "truncated": self.truncated}
+
+    @staticmethod
+    def _compact(values: List[Any]):
+        if values and all(type(v) is int for v in values) and all(-2**63 <= v < 2**63 for v in values):
+            return np.array(values, dtype=np.int64)
+        if values and all(type(v) is float for v in values):
+            return np.array(values, dtype=np.float64)
+        return values
+
+    @classmethod
+    def from_batches(cls, batches: Iterable[Tuple[List[str], List[tuple]]], max_rows: Optional[int] = None,
+                     max_bytes: Optional[int] = None) -> "ColumnarResult":
+        """
+        Build a result from ConnectionPool.iter_batches output, keeping at most `max_rows` rows
+        and about `max_bytes` of values. The iterator is closed as soon as a limit is reached,
+        which releases the cursor and connection.
+        """
+        collector = _Collector(max_rows or settings.SQL_MAX_ROWS, max_bytes or settings.SQL_RESULT_MAX_BYTES)
+        batches = iter(batches)
+        try:
+            for column_names, rows in batches:
+                if not collector.add(column_names, rows):
+                    break
+        finally:
+            close = getattr(batches, "close", None)
+            if close is not None:
+                close()
+        return collector.result()
+
+
+class _Collector:
+    # Appends batches column by column until the row or byte limit is reached
+    def __init__(self, max_rows: int, max_bytes: int):
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.column_names: List[str] = []
+        self.columns: List[List[Any]] = []
+        self.count = 0
+        self.size = 0
+        self.truncated = False
+
+    def add(self, column_names: List[str], rows: List[tuple]) -> bool:
+        """Add a batch; returns False once no more rows are wanted."""
+        if not self.columns:
+            self.column_names = list(column_names)
+            self.columns = [[] for _ in column_names]
+        for row in rows:
+            if self.count >= self.max_rows or self.size >= self.max_bytes:
+                self.truncated = True
+                return False
+            for values, value in zip(self.columns, row):
+                values.append(value)
+            self.size += sum(len(str(value)) + 16 for value in row)
+            self.count += 1
+        return True
+
+    def result(self) -> ColumnarResult:
+        return ColumnarResult(self.column_names, [ColumnarResult._compact(values) for values in self.columns],
+                              self.truncated)
+
+
+def execute_select(pool, sql: str, params: Optional[Sequence[Any]] = None, max_rows: Optional[int] = None,
+                   max_bytes: Optional[int] = None) -> ColumnarResult:
+    """
+    Guard `sql` and stream its rows from a ConnectionPool into a ColumnarResult.
+
+    Parameters:
+        pool (ConnectionPool): Pool to run the statement on
+        max_rows (int): Rows kept (SQL_MAX_ROWS by default); one more is requested to tell
+                        whether the result was truncated
+        max_bytes (int): Approximate size of the values kept (SQL_RESULT_MAX_BYTES by default)
+
+    Raises:
+        SQLGuardError: The statement is not a single read-only SELECT
+    """
+    max_rows = max_rows or settings.SQL_MAX_ROWS
+    guarded = guard_select(sql, max_rows + 1)
+    return ColumnarResult.from_batches(pool.iter_batches(guarded, params, read_only=True), max_rows, max_bytes)
+
+
+async def aexecute_select(pool, sql: str, params: Optional[Sequence[Any]] = None, max_rows: Optional[int] = None,
+                          max_bytes: Optional[int] = None) -> ColumnarResult:
+    """Async variant of execute_select for an AsyncConnectionPool."""
+    max_rows = max_rows or settings.SQL_MAX_ROWS
+    guarded = guard_select(sql, max_rows + 1)
+    collector = _Collector(max_rows, max_bytes or settings.SQL_RESULT_MAX_BYTES)
+    batches: AsyncIterator = pool.iter_batches(guarded, params, read_only=True)
+    try:
+        async for column_names, rows in batches:
+            if not collector.add(column_names, rows):
+                break
+    finally:
+        await batches.aclose()
+    return collector.result()
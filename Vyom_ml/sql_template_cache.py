@@ -0,0 +1,265 @@
+# Cache of LLM-generated SQL as parameterised templates.
+#
+# Most customer questions come in a few shapes ("what is my balance", "show my last 5
+# transactions", "transactions above 2000"). The first time a shape is seen the LLM writes
+# the SQL; the literals it copied from the question (counts, amounts, dates) and the
+# customer's username are then lifted out of the SQL as bind parameters. A later question
+# with the same shape (normalised text with numbers masked) and the same schema version
+# gets the stored template with its own values bound, without calling the LLM.
+#
+# A literal is only lifted when it appears exactly once in the SQL, outside any string;
+# otherwise its value becomes part of the match condition, so a different value falls
+# back to the LLM. Entries are keyed by the schema version (SchemaIntrospector.version, not
+# the per-question schema text), so a schema change makes every older entry unreachable
+# (and they are dropped).
+#
+# Templates are shared between customers, so SQL is only stored when it carries no
+# identity of the customer who asked: the username must have become a bind slot (no
+# trace of it may be left, in any case, inside strings or LIKE patterns), and a question
+# about the customer ("my balance") must have produced a username slot at all. A username
+# the question itself names ("customers named alice", asked by alice) never becomes the
+# slot, since the value may have come from the question; such SQL is not stored.
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from config import settings
+from text_features import normalize_utterance
+
+_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2}|\d{1,2}/\d{1,2}/\d{4})\b")
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+# SQL split into alternating outside/inside-string segments ('' escapes stay inside)
+_SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+_SQL_NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+_TYPED_LITERAL = re.compile(r"(?i)\b(date|timestamp|timestamptz)\s*$")
+# Words that make a question about the asking customer
+_FIRST_PERSON = {"i", "im", "ive", "me", "my", "mine", "myself", "we", "us", "our", "ours"}
+
+
+def schema_hash(schema_version: str) -> str:
+    return hashlib.sha256(schema_version.encode("utf-8")).hexdigest()[:16]
+
+
+def refers_to_customer(question: str) -> bool:
+    """Whether the question is about the customer asking it ("what is my balance")."""
+    return not _FIRST_PERSON.isdisjoint(normalize_utterance(question).split())
+
+
+def names_value(question: str, value: str) -> bool:
+    """Whether `value` appears in the question as one of its words or word sequences (normalised)."""
+    normalized = normalize_utterance(value)
+    return bool(normalized) and f" {normalized} " in f" {normalize_utterance(question)} "
+
+
+def extract_literals(question: str) -> List[Any]:
+    """
+    Literal values in a question, in order of appearance: ISO or D/M/Y dates as strings,
+    other numbers as int or float (thousands separators removed).
+    """
+    found = []
+    for match in _DATE.finditer(question):
+        found.append((match.start(), match.group(1)))
+    remaining = _DATE.sub(lambda m: " " * len(m.group(0)), question)
+    for match in _NUMBER.finditer(remaining):
+        text = match.group(0).replace(",", "")
+        value = float(text) if "." in text else int(text)
+        found.append((match.start(), value))
+    return [value for _, value in sorted(found, key=lambda item: item[0])]
+
+
+def _split_sql(sql: str) -> List[Tuple[bool, str]]:
+    # [(is_string_literal, text), ...] covering the whole statement
+    segments, position = [], 0
+    for match in _SQL_STRING.finditer(sql):
+        if match.start() > position:
+            segments.append((False, sql[position:match.start()]))
+        segments.append((True, match.group(0)))
+        position = match.end()
+    if position < len(sql):
+        segments.append((False, sql[position:]))
+    return segments
+
+
+class SQLTemplate:
+    """
+    SQL split around its bind slots.
+
+    parts has one more element than slots; each slot is ("literal", index into the
+    question's literals) or ("username",). `fixed` maps literal indexes that were not
+    lifted to the value they must equal for the template to apply.
+    """
+
+    def __init__(self, parts: List[str], slots: List[Tuple], fixed: Dict[int, Any], literal_count: int):
+        self.parts = parts
+        self.slots = slots
+        self.fixed = fixed
+        self.literal_count = literal_count
+
+    def has_username_slot(self) -> bool:
+        return any(slot[0] == "username" for slot in self.slots)
+
+    def mentions(self, text: str) -> bool:
+        """Whether `text` still appears anywhere in the fixed SQL (case-insensitive)."""
+        return bool(text) and any(text.lower() in part.lower() for part in self.parts)
+
+    def matches(self, literals: List[Any]) -> bool:
+        return len(literals) == self.literal_count and all(literals[i] == v for i, v in self.fixed.items())
+
+    def render(self, literals: List[Any], username: str, placeholder: str) -> Tuple[str, List[Any]]:
+        """Return (SQL with `placeholder` at each slot, bind parameters)."""
+        parts = self.parts
+        if placeholder == "%s":
+            # psycopg treats every '%' as a placeholder once parameters are passed
+            parts = [part.replace("%", "%%") for part in parts]
+        sql, params = parts[0], []
+        for slot, part in zip(self.slots, parts[1:]):
+            params.append(username if slot[0] == "username" else literals[slot[1]])
+            sql += placeholder + part
+        return sql, params
+
+    @classmethod
+    def from_sql(cls, sql: str, literals: List[Any], username: str, question: str = "") -> "SQLTemplate":
+        """
+        Lift `literals` (the question's values) and `username` out of `sql`. The username
+        is not lifted when `question` names it or it equals one of the literals, since the
+        SQL may then hold it as the question's value rather than as the asker.
+        """
+        segments = _split_sql(sql)
+        # (segment index, start, end, slot) for every span to replace
+        spans = []
+
+        # The customer's username, wherever it appears as a whole string literal
+        quoted_username = "'" + username.replace("'", "''") + "'"
+        from_question = names_value(question, username) or any(str(value) == username for value in literals)
+        for i, (is_string, text) in enumerate(segments):
+            if is_string and text == quoted_username and not from_question:
+                spans.append((i, 0, len(text), ("username",)))
+
+        fixed = {}
+        for index, value in enumerate(literals):
+            if isinstance(value, str):
+                quoted = "'" + value + "'"
+                places = [(i, 0, len(text)) for i, (is_string, text) in enumerate(segments)
+                          if is_string and text == quoted]
+                mentions = sum(value in text for _, text in segments)
+            else:
+                places = [(i, m.start(), m.end()) for i, (is_string, text) in enumerate(segments) if not is_string
+                          for m in _SQL_NUMBER.finditer(text) if float(m.group(0)) == value]
+                mentions = len(places) + sum(bool(re.search(rf"(?<![\d.]){re.escape(str(value))}(?![\d.])", text))
+                                             for is_string, text in segments if is_string)
+            if len(places) == 1 and mentions == 1:
+                spans.append((*places[0], ("literal", index)))
+            else:
+                fixed[index] = value
+
+        parts, slots, current = [], [], ""
+        by_segment: Dict[int, List[Tuple[int, int, Tuple]]] = {}
+        for i, start, end, slot in spans:
+            by_segment.setdefault(i, []).append((start, end, slot))
+        for i, (_, text) in enumerate(segments):
+            position = 0
+            for start, end, slot in sorted(by_segment.get(i, [])):
+                current += text[position:start]
+                typed = _TYPED_LITERAL.search(current)
+                if typed:
+                    # DATE '2024-01-05' -> CAST(? AS DATE); a bind parameter can't follow a type name
+                    current = current[:typed.start()] + "CAST("
+                    parts.append(current)
+                    current = f" AS {typed.group(1).upper()})"
+                else:
+                    parts.append(current)
+                    current = ""
+                slots.append(slot)
+                position = end
+            current += text[position:]
+        parts.append(current)
+        return cls(parts, slots, fixed, len(literals))
+
+
+class SQLTemplateCache:
+    """
+    LRU cache of SQL templates keyed by (schema hash, question shape).
+
+    Parameters:
+        max_entries (int): Templates kept; least recently used are evicted
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.SQL_TEMPLATE_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[Tuple[str, str], SQLTemplate]" = OrderedDict()
+        self._schema_hash: Optional[str] = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "guard_misses": 0, "stored": 0, "refused": 0, "invalidated": 0}
+
+    def _check_schema(self, current: str) -> None:
+        # A new schema makes every stored template suspect; drop them
+        if self._schema_hash != current:
+            if self._schema_hash is not None:
+                self.stats["invalidated"] += len(self._entries)
+                self._entries.clear()
+            self._schema_hash = current
+
+    def lookup(self, question: str, schema_version: str, username: str,
+               placeholder: str = "%s") -> Optional[Tuple[str, List[Any]]]:
+        """
+        SQL and bind parameters for `question` if a matching template is cached, else None.
+
+        Parameters:
+            schema_version (str): Version of the whole database schema the SQL targets
+            placeholder (str): Bind placeholder of the target driver ("%s" or "?")
+        """
+        key = (schema_hash(schema_version), normalize_utterance(question))
+        literals = extract_literals(question)
+        with self._lock:
+            self._check_schema(key[0])
+            template = self._entries.get(key)
+            if template is None:
+                self.stats["misses"] += 1
+                return None
+            if not template.matches(literals):
+                self.stats["guard_misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        return template.render(literals, username, placeholder)
+
+    def contains(self, question: str, schema_version: str) -> bool:
+        """Whether `question` would be answered from the cache (no counters are touched)."""
+        key = (schema_hash(schema_version), normalize_utterance(question))
+        with self._lock:
+            template = self._entries.get(key)
+            return template is not None and self._schema_hash == key[0] and template.matches(extract_literals(question))
+
+    def store(self, question: str, schema_version: str, username: str, sql: str) -> Optional[SQLTemplate]:
+        """
+        Templatize SQL the LLM generated for `question` and cache it.
+
+        Returns:
+            SQLTemplate: The stored template, or None when the SQL is specific to `username`
+                         (the username is left in it, or a question about the customer has
+                         no username slot) and must not be shared
+        """
+        key = (schema_hash(schema_version), normalize_utterance(question))
+        template = SQLTemplate.from_sql(sql.strip().rstrip(";"), extract_literals(question), username, question)
+        if template.mentions(username) or (refers_to_customer(question) and not template.has_username_slot()):
+            with self._lock:
+                self.stats["refused"] += 1
+            return None
+        with self._lock:
+            self._check_schema(key[0])
+            self._entries[key] = template
+            self._entries.move_to_end(key)
+            self.stats["stored"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return template
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by query_postgresql and aquery_postgresql
+sql_template_cache = SQLTemplateCache()
@@ -0,0 +1,80 @@
+# Local stand-in for the Groq chat completions API, for benchmarks and offline runs.
+#
+# Serves POST /openai/v1/chat/completions in the OpenAI-compatible format the Groq SDK
+# expects, answering after a fixed delay. STUB_LLM_RULES optionally maps substrings of the
+# system prompt to replies, e.g. '{"intent classifier": "dbquery", "PostgreSQL": "SELECT 1"}'.
+# Each word of the reply takes STUB_LLM_TOKEN_DELAY_MS to "generate"; streaming requests
+# (stream=true) get the words as server-sent events as they are produced. Point the agents at it with
+#   GROQ_API_BASE=http://127.0.0.1:8100 GROQ_API_KEY=stub
+# and start it with
+#   uvicorn stub_llm_server:app --port 8100
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+app = FastAPI()
+
+# Simulated model latency and reply text
+STUB_DELAY_SECONDS = float(os.getenv("STUB_LLM_DELAY_MS", "0")) / 1000
+STUB_REPLY = os.getenv("STUB_LLM_REPLY", "general")
+STUB_TOKEN_DELAY_SECONDS = float(os.getenv("STUB_LLM_TOKEN_DELAY_MS", "0")) / 1000
+STUB_RULES = json.loads(os.getenv("STUB_LLM_RULES", "{}"))
+
+
+def _reply_for(messages) -> str:
+    system_prompt = " ".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+    for needle, reply in STUB_RULES.items():
+        if needle in system_prompt:
+            return reply
+    return STUB_REPLY
+
+
+async def _stream_reply(completion_id: str, model: str, reply: str):
+    def event(delta, finish_reason=None):
+        chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    yield event({"role": "assistant", "content": ""})
+    words = reply.split(" ")
+    for i, word in enumerate(words):
+        if STUB_TOKEN_DELAY_SECONDS:
+            await asyncio.sleep(STUB_TOKEN_DELAY_SECONDS)
+        yield event({"content": word if i == 0 else " " + word})
+    yield event({}, "stop")
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if STUB_DELAY_SECONDS:
+        await asyncio.sleep(STUB_DELAY_SECONDS)
+    messages = body.get("messages", [])
+    reply = _reply_for(messages)
+    prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in messages)
+    completion_tokens = len(reply.split())
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    if body.get("stream"):
+        return StreamingResponse(_stream_reply(completion_id, body.get("model", "stub"), reply),
+                                 media_type="text/event-stream")
+    if STUB_TOKEN_DELAY_SECONDS:
+        await asyncio.sleep(STUB_TOKEN_DELAY_SECONDS * completion_tokens)
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": reply},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
@@ -0,0 +1,63 @@
+# Local text features for short customer utterances.
+#
+# Utterances are normalised (case, punctuation, whitespace, numerals) and turned into
+# hashed character n-gram vectors. Hashing uses CRC32 rather than Python's hash() so
+# vectors are stable across processes and can be saved alongside trained weights.
+
+import re
+import zlib
+from typing import Iterable, Tuple
+import numpy as np
+
+DEFAULT_N_FEATURES = 1 << 16
+DEFAULT_NGRAM_RANGE = (2, 4)
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_NON_WORD = re.compile(r"[^\w#]+")
+
+
+def normalize_utterance(text: str) -> str:
+    """
+    Canonical form of an utterance: lowercase, digits collapsed to '#', punctuation
+    removed and whitespace collapsed. "What's my balance?" and "whats my  balance"
+    both become "what s my balance".
+    """
+    text = _NUMBER.sub("#", text.lower())
+    return " ".join(_NON_WORD.sub(" ", text).replace("_", " ").split())
+
+
+def hashed_ngrams(text: str, n_features: int = DEFAULT_N_FEATURES,
+                  ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sparse L2-normalised character n-gram vector of an already normalised utterance.
+
+    Returns:
+        (indices, values): unique feature indices and their weights
+    """
+    padded = f" {text} "
+    low, high = ngram_range
+    hashes = [zlib.crc32(padded[i:i + n].encode("utf-8"))
+              for n in range(low, high + 1)
+              for i in range(len(padded) - n + 1)]
+    if not hashes:
+        hashes = [zlib.crc32(padded.encode("utf-8"))]
+    indices, counts = np.unique(np.asarray(hashes, dtype=np.uint64) % n_features, return_counts=True)
+    values = counts.astype(np.float32)
+    values /= np.sqrt(np.dot(values, values))
+    return indices.astype(np.intp), values
+
+
+def hashed_ngram_matrix(texts: Iterable[str], n_features: int = DEFAULT_N_FEATURES,
+                        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE):
+    """
+    Vectorise normalised utterances into CSR-style arrays.
+
+    Returns:
+        (indptr, indices, values): row i uses indices[indptr[i]:indptr[i + 1]]
+    """
+    rows = [hashed_ngrams(text, n_features, ngram_range) for text in texts]
+    indptr = np.zeros(len(rows) + 1, dtype=np.intp)
+    indptr[1:] = np.cumsum([len(indices) for indices, _ in rows])
+    if not rows:
+        return indptr, np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float32)
+    return indptr, np.concatenate([r[0] for r in rows]), np.concatenate([r[1] for r in rows])
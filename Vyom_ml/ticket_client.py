@@ -0,0 +1,406 @@
+# Client for the external ticket system.
+#
+# generate_ticket used to make a blocking requests.post with no timeout and no retry: a
+# slow ticket backend stalled the whole voice turn and a down one lost the ticket ("N/A").
+# TicketClient sends tickets over a pooled keep-alive httpx client with timeouts and
+# jittered exponential backoff, behind a circuit breaker. Every ticket is written to a
+# SQLite outbox before it is sent and removed once the backend accepted it, so nothing is
+# lost while the backend is unavailable (or the process restarts); a background task
+# retries queued tickets in batches. The caller waits at most `budget` seconds: a ticket
+# not confirmed by then keeps going in the background and the caller gets a "QUEUED-..."
+# reference instead of the backend's ticket id.
+#
+# Several uvicorn workers share the outbox and each may run a flusher, so a ticket is only
+# sent by the worker holding its lease: rows are written already leased to the submitting
+# worker, and flushers claim due rows by moving next_attempt_at past the lease in a single
+# UPDATE ... RETURNING. A lease outlives a whole live delivery (TICKET_OUTBOX_LEASE_SECONDS);
+# a sender that dies mid-delivery leaves the ticket to be claimed again once it expires.
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+from config import settings
+
+# Status codes worth retrying; any other 4xx means the backend rejected the ticket
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class TicketRejected(Exception):
+    """The ticket backend refused the ticket; retrying will not help."""
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing backend for a while.
+
+    Closed until `failure_threshold` consecutive failures, then open (calls refused) for
+    `reset_timeout` seconds, then half-open: one trial call is let through, and its
+    outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_timeout: Optional[float] = None):
+        self.failure_threshold = failure_threshold or settings.TICKET_BREAKER_FAILURES
+        self.reset_timeout = reset_timeout or settings.TICKET_BREAKER_RESET_SECONDS
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.reset_timeout else "half_open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class TicketOutbox:
+    """
+    Durable queue of tickets not yet accepted by the backend (SQLite, WAL mode).
+
+    Parameters:
+        path (str): Database file
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.TICKET_OUTBOX_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=10.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ticket_outbox (
+                ticket_key TEXT PRIMARY KEY,
+                username TEXT NOT NULL,
+                query TEXT NOT NULL,
+                service TEXT,
+                created_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT
+            )
+        """)
+        self._lock = threading.Lock()
+
+    def add_many(self, tickets: List[Dict[str, Any]], lease: float = 0.0) -> None:
+        """
+        Queue tickets (dicts with ticket_key, username, query, service) in one transaction,
+        leased to the caller for `lease` seconds before a flusher may claim them.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO ticket_outbox (ticket_key, username, query, service, created_at, next_attempt_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(t["ticket_key"], t["username"], t["query"], t["service"], now, now + lease) for t in tickets])
+                self._conn.execute("COMMIT")
+            except sqlite3.Error:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, limit: int, lease: float) -> List[Dict[str, Any]]:
+        """
+        Lease up to `limit` due tickets, oldest first, for `lease` seconds. The rows are
+        claimed in one statement, so no other process can claim the same ticket.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "UPDATE ticket_outbox SET next_attempt_at = ? WHERE ticket_key IN ("
+                "SELECT ticket_key FROM ticket_outbox WHERE next_attempt_at <= ? ORDER BY created_at LIMIT ?) "
+                "RETURNING ticket_key, username, query, service, attempts, created_at",
+                (now + lease, now, limit)).fetchall()
+        return [{"ticket_key": row[0], "username": row[1], "query": row[2], "service": row[3], "attempts": row[4]}
+                for row in sorted(rows, key=lambda row: row[5])]
+
+    def remove(self, ticket_keys: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM ticket_outbox WHERE ticket_key = ?", [(key,) for key in ticket_keys])
+
+    def release(self, ticket_key: str) -> None:
+        """End the lease on a ticket that was not attempted, making it due again."""
+        with self._lock:
+            self._conn.execute("UPDATE ticket_outbox SET next_attempt_at = ? WHERE ticket_key = ?",
+                               (time.time(), ticket_key))
+
+    def reschedule(self, ticket_key: str, delay: float, error: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE ticket_outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE ticket_key = ?",
+                (time.time() + delay, error, ticket_key))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM ticket_outbox").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def backoff_delay(attempt: int, base: Optional[float] = None, cap: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    base = base or settings.TICKET_BACKOFF_BASE_SECONDS
+    cap = cap or settings.TICKET_BACKOFF_MAX_SECONDS
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def is_confirmed(ticket) -> bool:
+    """Whether a submit() result carries a ticket id issued by the ticket system."""
+    return ticket != "N/A" and ticket[0] != "N/A" and not str(ticket[0]).startswith("QUEUED-")
+
+
+class TicketClient:
+    """
+    Sends tickets to the ticket system with retries, a circuit breaker and an outbox.
+
+    Parameters:
+        url (str): Ticket endpoint
+        timeout (float): Per-request timeout in seconds
+        max_retries (int): Retries of a live submission after the first attempt
+        budget (float): Seconds a caller waits for the ticket id before getting a queued reference
+        outbox (TicketOutbox): Durable queue (default: TICKET_OUTBOX_PATH)
+        breaker (CircuitBreaker): Shared breaker for the backend
+        lease (float): Seconds a ticket being sent is reserved for this client
+                       (default TICKET_OUTBOX_LEASE_SECONDS)
+    """
+
+    def __init__(self, url: Optional[str] = None, timeout: Optional[float] = None, max_retries: Optional[int] = None,
+                 budget: Optional[float] = None, outbox: Optional[TicketOutbox] = None,
+                 breaker: Optional[CircuitBreaker] = None, lease: Optional[float] = None):
+        self.url = url or settings.TICKET_API_URL
+        self.timeout = timeout or settings.TICKET_TIMEOUT_SECONDS
+        self.max_retries = settings.TICKET_MAX_RETRIES if max_retries is None else max_retries
+        self.budget = budget or settings.TICKET_RESPONSE_BUDGET_SECONDS
+        self.outbox = outbox or TicketOutbox()
+        self.breaker = breaker or CircuitBreaker()
+        self.batch_size = settings.TICKET_OUTBOX_BATCH_SIZE
+        self.flush_interval = settings.TICKET_OUTBOX_FLUSH_INTERVAL
+        self.lease = lease or settings.TICKET_OUTBOX_LEASE_SECONDS
+        # httpx clients and flusher tasks belong to one event loop
+        self._clients: "weakref.WeakKeyDictionary[Any, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._flushers: "weakref.WeakKeyDictionary[Any, asyncio.Task]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.stats = {"submitted": 0, "delivered": 0, "queued": 0, "rejected": 0, "retries": 0,
+                      "flushed": 0, "breaker_open": 0}
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                limits = httpx.Limits(max_connections=settings.TICKET_MAX_CONNECTIONS,
+                                      max_keepalive_connections=settings.TICKET_MAX_CONNECTIONS,
+                                      keepalive_expiry=settings.LLM_KEEPALIVE_SECONDS)
+                client = self._clients[loop] = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+            return client
+
+    async def _post(self, ticket: Dict[str, Any]) -> str:
+        # One HTTP attempt; returns the backend's ticket id
+        response = await self._client().post(
+            self.url, json={"user_id": ticket["username"], "query": ticket["query"]},
+            # Lets a backend that supports it drop the duplicate of a retried ticket
+            headers={"Idempotency-Key": ticket["ticket_key"]})
+        if response.status_code in RETRYABLE_STATUS:
+            raise httpx.HTTPStatusError(f"Ticket system returned {response.status_code}",
+                                        request=response.request, response=response)
+        if response.status_code >= 400:
+            raise TicketRejected(f"Ticket system rejected the ticket ({response.status_code}): {response.text[:200]}")
+        # The ticket is accepted at this point; an unreadable body must not cause a retry
+        # (and a duplicate ticket on a backend that ignores Idempotency-Key)
+        try:
+            response_data = response.json()
+        except ValueError:
+            print(f"Ticket System Response ({response.status_code}) is not JSON: {response.text[:200]}")
+            return "N/A"
+        print(f"Ticket System Response: {response_data}")
+        return response_data.get("query_id", "N/A") if isinstance(response_data, dict) else "N/A"
+
+    async def _deliver(self, ticket: Dict[str, Any], retries: int) -> str:
+        """Send one outbox ticket, retrying transient failures; removes it from the outbox once accepted."""
+        key = ticket["ticket_key"]
+        for attempt in range(retries + 1):
+            if not self.breaker.allow():
+                self.stats["breaker_open"] += 1
+                # Give up the lease so any flusher can send it once the breaker closes
+                self.outbox.release(key)
+                raise ConnectionError("Ticket system circuit breaker is open")
+            try:
+                ticket_id = await self._post(ticket)
+            except TicketRejected:
+                self.breaker.record_success()  # the backend is up, it just said no
+                self.outbox.remove([key])
+                self.stats["rejected"] += 1
+                raise
+            except httpx.HTTPError as e:
+                self.breaker.record_failure()
+                if attempt == retries:
+                    self.outbox.reschedule(key, backoff_delay(ticket["attempts"] + attempt + 1), str(e))
+                    raise
+                self.stats["retries"] += 1
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            self.breaker.record_success()
+            self.outbox.remove([key])
+            self.stats["delivered"] += 1
+            return ticket_id
+
+    async def submit(self, username: str, query: str, service: str, budget: Optional[float] = None):
+        """
+        Raise a ticket, waiting at most `budget` seconds (default TICKET_RESPONSE_BUDGET_SECONDS).
+
+        Returns:
+            [ticket id, service]; the ticket id is "QUEUED-<reference>" when the backend did
+            not confirm in time and the ticket stays queued, and "N/A" is returned when the
+            backend rejected it
+        """
+        return (await self.submit_many([(username, query, service)], budget))[0]
+
+    async def submit_many(self, tickets: List[Tuple[str, str, str]], budget: Optional[float] = None,
+                          concurrency: Optional[int] = None) -> List[Any]:
+        """
+        Raise several tickets: they are written to the outbox in one transaction and sent
+        concurrently over the pooled connections, at most `concurrency` (default
+        TICKET_MAX_CONNECTIONS) at a time, each with retries. Waits at most `budget` seconds
+        in total; tickets still unconfirmed then are delivered in the background.
+
+        Parameters:
+            tickets (list): (username, query, service) per ticket
+
+        Returns:
+            list: One result per ticket, in order, as returned by submit()
+        """
+        records = [{"ticket_key": uuid.uuid4().hex, "username": username, "query": query, "service": service,
+                    "attempts": 0} for username, query, service in tickets]
+        self.stats["submitted"] += len(records)
+        if self.breaker.state == "open":
+            # Not sent now; any flusher may claim them
+            self.outbox.add_many(records)
+            self.stats["breaker_open"] += 1
+            self.start_flusher()
+            return [self._queued(record) for record in records]
+        # Leased to this client, so no flusher sends them while they are being delivered here
+        self.outbox.add_many(records, self.lease)
+
+        semaphore = asyncio.Semaphore(concurrency or settings.TICKET_MAX_CONNECTIONS)
+
+        async def deliver(record):
+            async with semaphore:
+                return await self._deliver(record, self.max_retries)
+
+        deliveries = [asyncio.ensure_future(deliver(record)) for record in records]
+        for delivery in deliveries:
+            delivery.add_done_callback(self._after_delivery)
+        # Deliveries still running after the budget carry on; the outbox keeps them if they fail
+        await asyncio.wait(deliveries, timeout=budget or self.budget)
+        return [self._result(record, delivery) for record, delivery in zip(records, deliveries)]
+
+    def _queued(self, record: Dict[str, Any]) -> List[str]:
+        self.stats["queued"] += 1
+        return [f"QUEUED-{record['ticket_key'][:8].upper()}", record["service"]]
+
+    def _result(self, record: Dict[str, Any], delivery: asyncio.Future):
+        if not delivery.done():
+            return self._queued(record)
+        error = delivery.exception()
+        if error is None:
+            return [delivery.result(), record["service"]]
+        if isinstance(error, TicketRejected):
+            print(f"Error contacting ticket system: {error}")
+            return "N/A"
+        print(f"Ticket system unavailable, ticket queued: {error}")
+        return self._queued(record)
+
+    def _after_delivery(self, task: asyncio.Future) -> None:
+        # Whether or not the caller is still waiting, a failed delivery leaves the ticket to the flusher
+        if not task.cancelled() and isinstance(task.exception(), (httpx.HTTPError, ValueError, ConnectionError)):
+            self.start_flusher()
+
+    async def flush(self) -> int:
+        """Send one batch of due outbox tickets concurrently; returns how many were delivered."""
+        if self.breaker.state == "open":
+            return 0
+        tickets = self.outbox.claim(self.batch_size, self.lease)
+        if not tickets:
+            return 0
+        results = await asyncio.gather(*(self._deliver(ticket, 0) for ticket in tickets), return_exceptions=True)
+        delivered = sum(not isinstance(result, BaseException) for result in results)
+        for ticket, result in zip(tickets, results):
+            if isinstance(result, TicketRejected):
+                print(f"Queued ticket {ticket['ticket_key']} rejected by the ticket system: {result}")
+        self.stats["flushed"] += delivered
+        return delivered
+
+    async def _flush_loop(self) -> None:
+        while len(self.outbox):
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Ticket outbox flush failed, will retry: {e}")
+            await asyncio.sleep(self.flush_interval)
+
+    def start_flusher(self) -> None:
+        """Start the background flush task on the running loop unless one is already running."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._flushers.get(loop)
+            if task is None or task.done():
+                self._flushers[loop] = loop.create_task(self._flush_loop())
+
+    def status(self) -> Dict[str, Any]:
+        return {"breaker": self.breaker.state, "outbox": len(self.outbox), **self.stats}
+
+    async def aclose(self) -> None:
+        loop = asyncio.get_running_loop()
+        task = self._flushers.pop(loop, None)
+        if task is not None:
+            task.cancel()
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+_ticket_client: Optional[TicketClient] = None
+_ticket_client_lock = threading.Lock()
+
+
+def get_ticket_client() -> TicketClient:
+    """Process-wide TicketClient for TICKET_API_URL."""
+    global _ticket_client
+    with _ticket_client_lock:
+        if _ticket_client is None:
+            _ticket_client = TicketClient()
+        return _ticket_client
@@ -0,0 +1,276 @@
+# Pure-NumPy inference for the XGBoost priority model.
+# export_xgboost_trees flattens a trained booster into node arrays once (the only part
+# that needs xgboost); CompiledTreeEnsemble then scores whole batches with vectorized
+# indexing, so serving workers can load the exported .npz without importing xgboost.
+
+import json
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+# Rows scored per block; keeps the (trees, rows) working arrays cache-resident
+DEFAULT_BLOCK_SIZE = 256
+
+
+class CompiledTreeEnsemble:
+    """
+    A tree ensemble stored as flat node arrays, with all trees concatenated.
+
+    Node arrays (one entry per node across all trees):
+        feature      (int32)   feature index tested at the node (0 for leaves)
+        threshold    (float32) go left when x < threshold
+        left, right  (int32)   global child indices (leaves point at themselves)
+        default_left (bool)    branch taken when the feature value is missing (NaN)
+        value        (float32) leaf value (0 for internal nodes)
+    Tree arrays:
+        roots        (int32)   global index of each tree's root node
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray, right: np.ndarray,
+                 default_left: np.ndarray, value: np.ndarray, roots: np.ndarray, base_score: float,
+                 max_depth: int, feature_names: Optional[List[str]] = None):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.right = np.asarray(right, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.base_score = np.float32(base_score)
+        self.max_depth = int(max_depth)
+        self.feature_names = list(feature_names) if feature_names else None
+        self._compile_complete_trees()
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def _compile_complete_trees(self) -> None:
+        """
+        Re-lay every tree out as a complete binary tree of depth `max_depth` (heap order:
+        children of slot i are 2i+1 and 2i+2). Leaves above the bottom level are pushed
+        down by copying them into both subtrees, so a batch walk is pure index
+        arithmetic with no child-pointer lookups.
+        """
+        n_internal = (1 << self.max_depth) - 1
+        n_leaves = 1 << self.max_depth
+        heap_feature = np.zeros((self.n_trees, max(n_internal, 1)), dtype=np.int32)
+        heap_threshold = np.zeros((self.n_trees, max(n_internal, 1)), dtype=np.float32)
+        heap_default_left = np.ones((self.n_trees, max(n_internal, 1)), dtype=bool)
+        heap_leaf = np.zeros((self.n_trees, n_leaves), dtype=np.float32)
+
+        for tree, root in enumerate(self.roots):
+            stack = [(int(root), 0)]
+            while stack:
+                node, slot = stack.pop()
+                if slot >= n_internal:
+                    heap_leaf[tree, slot - n_internal] = self.value[node]
+                    continue
+                if self.left[node] == node:
+                    # Leaf above the bottom level: both branches lead to the same value
+                    stack.append((node, 2 * slot + 1))
+                    stack.append((node, 2 * slot + 2))
+                    continue
+                heap_feature[tree, slot] = self.feature[node]
+                heap_threshold[tree, slot] = self.threshold[node]
+                heap_default_left[tree, slot] = self.default_left[node]
+                stack.append((int(self.left[node]), 2 * slot + 1))
+                stack.append((int(self.right[node]), 2 * slot + 2))
+
+        self._n_internal = n_internal
+        self._n_leaves = n_leaves
+        self._heap_feature = heap_feature.ravel()
+        self._heap_threshold = heap_threshold.ravel()
+        self._heap_default_left = heap_default_left.ravel()
+        self._heap_leaf = heap_leaf.ravel()
+
+    def predict(self, X: Any, block_size: int = DEFAULT_BLOCK_SIZE) -> np.ndarray:
+        """
+        Predict raw scores for a 2-D feature matrix or a DataFrame with the model's columns.
+        Results match XGBoost's float32 predictions bit for bit.
+        """
+        X = self._as_matrix(X)
+        out = np.empty(len(X), dtype=np.float32)
+        for start in range(0, len(X), block_size):
+            out[start:start + block_size] = self._predict_block(X[start:start + block_size])
+        return out
+
+    def _predict_block(self, X: np.ndarray) -> np.ndarray:
+        n_rows = len(X)
+        # Feature-major copy so each (tree, row) lookup is a single flat gather
+        columns = np.ascontiguousarray(X.T).ravel()
+        row_ids = np.arange(n_rows, dtype=np.intp)
+        has_missing = bool(np.isnan(columns).any())
+        feature_offsets = self._heap_feature.astype(np.intp) * n_rows
+
+        # node holds the global heap index (tree * n_internal + slot) for every (tree, row)
+        tree_offsets = (np.arange(self.n_trees, dtype=np.intp) * self._n_internal)[:, None]
+        node = np.repeat(tree_offsets, n_rows, axis=1)
+        child_shift = 1 - tree_offsets
+
+        for _ in range(self.max_depth):
+            lookup = feature_offsets[node]
+            lookup += row_ids
+            x = columns[lookup]
+            go_right = x >= self._heap_threshold[node]
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~self._heap_default_left[node], go_right)
+            # Child of slot i is 2i+1 (left) or 2i+2 (right), expressed on global indices
+            node *= 2
+            node += child_shift
+            node += go_right
+
+        # Bottom-level slots map onto each tree's leaf row: tree * n_leaves + slot - n_internal
+        leaves = self._heap_leaf[node + (np.arange(self.n_trees, dtype=np.intp)[:, None] - self._n_internal)]
+
+        # XGBoost accumulates leaf values onto the base score one tree at a time in
+        # float32; a sequential accumulate over the tree axis reproduces the same rounding.
+        margins = np.empty((self.n_trees + 1, n_rows), dtype=np.float32)
+        margins[0] = self.base_score
+        margins[1:] = leaves
+        return np.add.accumulate(margins, axis=0, dtype=np.float32)[-1]
+
+    def _as_matrix(self, X: Any) -> np.ndarray:
+        if hasattr(X, "columns"):
+            if self.feature_names is not None:
+                missing = [name for name in self.feature_names if name not in X.columns]
+                if missing:
+                    raise KeyError(f"Input is missing feature columns: {missing}")
+                X = X[self.feature_names]
+            X = X.to_numpy(dtype=np.float32)
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        n_features = int(self.feature.max()) + 1 if len(self.feature) else 0
+        if X.ndim != 2 or X.shape[1] < n_features:
+            raise ValueError(f"Expected a (rows, {n_features}) feature matrix, got shape {X.shape}.")
+        return X
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Return the ensemble as a dict of arrays (the layout written by `save`)."""
+        return {
+            "feature": self.feature,
+            "threshold": self.threshold,
+            "left": self.left,
+            "right": self.right,
+            "default_left": self.default_left,
+            "value": self.value,
+            "roots": self.roots,
+            "base_score": np.array([self.base_score], dtype=np.float32),
+            "max_depth": np.array([self.max_depth], dtype=np.int32),
+            "feature_names": np.array(json.dumps(self.feature_names)),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "CompiledTreeEnsemble":
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            left=arrays["left"],
+            right=arrays["right"],
+            default_left=arrays["default_left"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            base_score=float(arrays["base_score"][0]),
+            max_depth=int(arrays["max_depth"][0]),
+            feature_names=json.loads(str(arrays["feature_names"])),
+        )
+
+    def save(self, path: str) -> None:
+        """Write the ensemble to an uncompressed .npz file."""
+        np.savez(path, **self.to_arrays())
+
+
+def load_tree_ensemble(path: str) -> CompiledTreeEnsemble:
+    """Load an ensemble written by `CompiledTreeEnsemble.save`."""
+    with np.load(path, allow_pickle=False) as arrays:
+        return CompiledTreeEnsemble.from_arrays({name: arrays[name] for name in arrays.files})
+
+
+def _parse_base_score(raw: str) -> float:
+    # XGBoost >= 2 stores the base score as a one-element vector, e.g. "[3.06E0]"
+    return float(raw.strip("[]").split(",")[0])
+
+
+def export_xgboost_trees(model: Any) -> CompiledTreeEnsemble:
+    """
+    Flatten a trained XGBRegressor (or Booster) into a CompiledTreeEnsemble.
+
+    Only numerical splits with the identity link (reg:squarederror) are supported,
+    which covers the priority model.
+    """
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    config = json.loads(booster.save_raw("json"))
+    learner = config["learner"]
+
+    objective = learner["objective"]["name"]
+    if objective not in ("reg:squarederror", "reg:linear"):
+        raise ValueError(f"Unsupported objective '{objective}'; only identity-link regression can be exported.")
+    gbm = learner["gradient_booster"]
+    if gbm.get("name") != "gbtree":
+        raise ValueError(f"Unsupported booster '{gbm.get('name')}'; only gbtree can be exported.")
+
+    trees = gbm["model"]["trees"]
+    feature, threshold, left, right, default_left, value, roots = [], [], [], [], [], [], []
+    max_depth = 0
+    offset = 0
+
+    for tree in trees:
+        if any(tree.get("split_type", [])):
+            raise ValueError("Categorical splits are not supported by the NumPy tree engine.")
+
+        tree_left = np.asarray(tree["left_children"], dtype=np.int32)
+        tree_right = np.asarray(tree["right_children"], dtype=np.int32)
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        is_leaf = tree_left == -1
+        node_ids = np.arange(len(tree_left), dtype=np.int32)
+
+        feature.append(np.where(is_leaf, 0, tree["split_indices"]).astype(np.int32))
+        threshold.append(np.where(is_leaf, np.float32(0), conditions).astype(np.float32))
+        left.append(np.where(is_leaf, node_ids, tree_left) + offset)
+        right.append(np.where(is_leaf, node_ids, tree_right) + offset)
+        default_left.append(np.asarray(tree["default_left"], dtype=bool))
+        # Leaf values live in split_conditions for leaf nodes
+        value.append(np.where(is_leaf, conditions, np.float32(0)).astype(np.float32))
+        roots.append(offset)
+
+        max_depth = max(max_depth, _tree_depth(tree_left, tree_right))
+        offset += len(tree_left)
+
+    return CompiledTreeEnsemble(
+        feature=np.concatenate(feature),
+        threshold=np.concatenate(threshold),
+        left=np.concatenate(left),
+        right=np.concatenate(right),
+        default_left=np.concatenate(default_left),
+        value=np.concatenate(value),
+        roots=np.asarray(roots, dtype=np.int32),
+        base_score=_parse_base_score(learner["learner_model_param"]["base_score"]),
+        max_depth=max_depth,
+        feature_names=booster.feature_names,
+    )
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth = 0
+    frontier = [0]
+    while True:
+        children = [child for node in frontier for child in (left[node], right[node]) if child != -1]
+        if not children:
+            return depth
+        frontier = children
+        depth += 1
+
+
+if __name__ == "__main__":
+    import argparse
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Export a pickled XGBoost model to NumPy node arrays.")
+    parser.add_argument("model", help="Pickled XGBRegressor (e.g. xgboost_priority_model.pkl)")
+    parser.add_argument("output", help="Destination .npz file")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as file:
+        ensemble = export_xgboost_trees(pickle.load(file))
+    ensemble.save(args.output)
+    print(f"Exported {ensemble.n_trees} trees ({len(ensemble.value)} nodes, depth {ensemble.max_depth}) to {args.output}")
@@ -0,0 +1,53 @@
+# Latency instrumentation for assistant turns.
+#
+# Keeps a bounded window of recent turn latencies per label (e.g. "sequential" vs
+# "speculative") and reports count, mean and P50/P95/P99, so the effect of pipeline
+# changes can be read straight off a running assistant.
+
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+import numpy as np
+
+
+class LatencyRecorder:
+    """
+    Thread-safe rolling window of latencies, grouped by label.
+
+    Parameters:
+        window (int): Most recent samples kept per label
+    """
+
+    def __init__(self, window: int = 10_000):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, label: str, seconds: float) -> None:
+        with self._lock:
+            if label not in self._samples:
+                self._samples[label] = deque(maxlen=self.window)
+            self._samples[label].append(seconds)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self, label: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Latency summary in milliseconds, keyed by label (or for one label only).
+
+        Returns:
+            dict: {"count", "mean_ms", "p50_ms", "p95_ms", "p99_ms"} per label
+        """
+        with self._lock:
+            samples = {name: np.array(values) for name, values in self._samples.items()
+                       if label is None or name == label}
+        report = {}
+        for name, values in samples.items():
+            if not len(values):
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1e3
+            report[name] = {"count": len(values), "mean_ms": float(values.mean() * 1e3),
+                            "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+        return report.get(label, {}) if label else report
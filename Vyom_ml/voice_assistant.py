@@ -1,13 +1,19 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 import tts_with_llm
+from llm_with_intent import BankingAssistant
 import io
 import wave
 import logging
 import os
-from typing import Optional
+import struct
+import uuid
+from typing import AsyncIterator, Optional
 from config import settings
+from sentence_stream import astream_sentences
+from session_auth import get_session_registry, issuer_key_valid
+from ticket_client import get_ticket_client
 import asyncio
 
 # Configure logging
@@ -16,6 +22,9 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Voice Banking Assistant API")
 
+# One assistant per process; sessions are kept apart by their server-issued session_id
+assistant = BankingAssistant(settings.GROQ_API_KEY)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -25,52 +34,175 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Format of Sarvam TTS audio (see tts_with_llm.text_to_speech), used if a chunk has no WAV header
+TTS_SAMPLE_RATE = 22050
+TTS_CHANNELS = 1
+TTS_SAMPLE_WIDTH = 2
+
+
+def _streaming_wav_header(channels: int, sample_width: int, sample_rate: int) -> bytes:
+    """WAV header with unknown (maximum) data length, for audio whose size isn't known upfront."""
+    unknown_size = 0xFFFFFFFF
+    byte_rate = sample_rate * channels * sample_width
+    return (b"RIFF" + struct.pack("<I", unknown_size) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, sample_rate, byte_rate,
+                                    channels * sample_width, sample_width * 8)
+            + b"data" + struct.pack("<I", unknown_size))
+
+
+def _wav_frames(audio_bytes: bytes):
+    """Split TTS output into ((channels, sample_width, sample_rate), PCM frames)."""
+    try:
+        with wave.open(io.BytesIO(audio_bytes)) as wav:
+            params = (wav.getnchannels(), wav.getsampwidth(), wav.getframerate())
+            return params, wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        # Raw PCM
+        return (TTS_CHANNELS, TTS_SAMPLE_WIDTH, TTS_SAMPLE_RATE), audio_bytes
+
+
+async def _synthesize(sentence: str, source_lang: str, target_lang: str) -> Optional[bytes]:
+    translated = await asyncio.to_thread(tts_with_llm.translate_text, sentence, source_lang, target_lang)
+    if not translated:
+        logger.warning(f"Translation failed for: {sentence}")
+        return None
+    return await asyncio.to_thread(tts_with_llm.text_to_speech, translated, target_lang)
+
+
+async def _speech_stream(sentences: AsyncIterator[str], source_lang: str, target_lang: str) -> AsyncIterator[bytes]:
+    """
+    Translate and synthesize sentences as they arrive, yielding one continuous WAV stream.
+
+    Up to STREAM_TTS_PREFETCH later sentences are synthesized while the current one is being
+    sent, and audio is always emitted in sentence order.
+    """
+    pending: asyncio.Queue = asyncio.Queue(maxsize=settings.STREAM_TTS_PREFETCH)
+
+    async def schedule():
+        try:
+            async for sentence in sentences:
+                logger.info(f"AI Response sentence: {sentence}")
+                await pending.put(asyncio.ensure_future(_synthesize(sentence, source_lang, target_lang)))
+        finally:
+            await pending.put(None)
+
+    scheduler = asyncio.ensure_future(schedule())
+    header_sent = False
+    try:
+        while (task := await pending.get()) is not None:
+            audio = await task
+            if not audio:
+                continue
+            params, frames = _wav_frames(audio)
+            if not header_sent:
+                yield _streaming_wav_header(*params)
+                header_sent = True
+            yield frames
+        # Surface errors from the LLM stream
+        await scheduler
+    finally:
+        scheduler.cancel()
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
+
+
+def _validate_languages(target_lang: str, source_lang: Optional[str]) -> None:
+    if target_lang not in settings.SUPPORTED_LANGUAGES.values():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported target language. Supported languages: {list(settings.SUPPORTED_LANGUAGES.values())}"
+        )
+    
+    if source_lang and source_lang not in settings.SUPPORTED_LANGUAGES.values():
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported source language. Supported languages: {list(settings.SUPPORTED_LANGUAGES.values())}"
+        )
+
+
+def _session_user(session_id: str) -> str:
+    """Customer bound to a server-issued session; unknown or expired sessions are rejected."""
+    user_id = get_session_registry().resolve(session_id)
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Unknown or expired session")
+    return user_id
+
+
+async def _transcribe(audio: UploadFile) -> str:
+    """Save the upload to a per-request temp file and run speech-to-text on it."""
+    # One file per request, since requests run concurrently
+    audio_path = f"{os.path.splitext(settings.TEMP_AUDIO_PATH)[0]}_{uuid.uuid4().hex}.wav"
+    try:
+        with open(audio_path, "wb") as f:
+            f.write(await audio.read())
+    except Exception as e:
+        logger.error(f"Error saving audio file: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to save audio file")
+
+    try:
+        # Sarvam calls use blocking requests, so run them off the event loop
+        transcribed_text = await asyncio.to_thread(tts_with_llm.speech_to_text, audio_path)
+    finally:
+        # Clean up temporary file
+        try:
+            os.remove(audio_path)
+        except Exception as e:
+            logger.warning(f"Failed to remove temporary file: {str(e)}")
+
+    if not transcribed_text:
+        raise HTTPException(status_code=500, detail="Speech-to-text conversion failed")
+
+    logger.info(f"Transcribed text: {transcribed_text}")
+    return transcribed_text
+
+
+@app.post("/sessions")
+async def create_session(
+    user_id: str = Form(...),
+    x_session_issuer_key: Optional[str] = Header(None)
+):
+    """
+    Issue a voice session for a customer the caller has already authenticated.
+
+    Only the banking app's backend may call this; it presents SESSION_ISSUER_API_KEY in the
+    X-Session-Issuer-Key header and passes the returned session_id on to the client.
+    """
+    if not settings.SESSION_ISSUER_API_KEY:
+        raise HTTPException(status_code=503, detail="Session issuing is not configured")
+    if not issuer_key_valid(x_session_issuer_key):
+        raise HTTPException(status_code=403, detail="Invalid session issuer key")
+    registry = get_session_registry()
+    return {"session_id": registry.issue(user_id), "expires_in": registry.ttl_seconds}
+
 @app.post("/process_audio/")
 async def process_audio(
     target_lang: str = Form(...),
     audio: UploadFile = File(...),
-    source_lang: Optional[str] = Form(None)
+    source_lang: Optional[str] = Form(None),
+    session_id: str = Form(...)
 ):
     """Process audio input and return AI-generated speech response."""
     try:
+        user_id = _session_user(session_id)
+
         # Validate language codes
-        if target_lang not in settings.SUPPORTED_LANGUAGES.values():
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported target language. Supported languages: {list(settings.SUPPORTED_LANGUAGES.values())}"
-            )
-        
-        if source_lang and source_lang not in settings.SUPPORTED_LANGUAGES.values():
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported source language. Supported languages: {list(settings.SUPPORTED_LANGUAGES.values())}"
-            )
-
-        # Save received audio file
-        audio_path = settings.TEMP_AUDIO_PATH
-        try:
-            with open(audio_path, "wb") as f:
-                f.write(await audio.read())
-        except Exception as e:
-            logger.error(f"Error saving audio file: {str(e)}")
-            raise HTTPException(status_code=500, detail="Failed to save audio file")
+        _validate_languages(target_lang, source_lang)
 
         # Convert speech to text
-        transcribed_text = tts_with_llm.speech_to_text(audio_path)
-        if not transcribed_text:
-            raise HTTPException(status_code=500, detail="Speech-to-text conversion failed")
-
-        logger.info(f"Transcribed text: {transcribed_text}")
+        transcribed_text = await _transcribe(audio)
 
         # Process AI response
-        ai_response = tts_with_llm.chat_func(transcribed_text)
+        ai_response = await assistant.aprocess_message(session_id, transcribed_text, user_id=user_id)
         if not ai_response:
             raise HTTPException(status_code=500, detail="AI processing failed")
 
         logger.info(f"AI Response: {ai_response}")
 
         # Translate AI response if needed
-        translated_response = tts_with_llm.translate_text(
+        translated_response = await asyncio.to_thread(
+            tts_with_llm.translate_text,
             ai_response, 
             source_lang or "en-IN", 
             target_lang
@@ -79,16 +211,10 @@ async def process_audio(
             raise HTTPException(status_code=500, detail="Translation failed")
 
         # Convert AI response to speech
-        tts_audio = tts_with_llm.text_to_speech(translated_response, target_lang)
+        tts_audio = await asyncio.to_thread(tts_with_llm.text_to_speech, translated_response, target_lang)
         if not tts_audio:
             raise HTTPException(status_code=500, detail="Text-to-speech conversion failed")
 
-        # Clean up temporary file
-        try:
-            os.remove(audio_path)
-        except Exception as e:
-            logger.warning(f"Failed to remove temporary file: {str(e)}")
-
         # Return AI-generated speech
         return StreamingResponse(
             io.BytesIO(tts_audio),
@@ -104,6 +230,45 @@ async def process_audio(
         logger.error(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/process_audio_stream/")
+async def process_audio_stream(
+    target_lang: str = Form(...),
+    audio: UploadFile = File(...),
+    source_lang: Optional[str] = Form(None),
+    session_id: str = Form(...)
+):
+    """
+    Streaming variant of /process_audio/: the reply is translated and spoken sentence by
+    sentence while the LLM is still generating, and returned as one chunked WAV stream.
+    """
+    try:
+        user_id = _session_user(session_id)
+        _validate_languages(target_lang, source_lang)
+        transcribed_text = await _transcribe(audio)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    # Errors after this point can only end the stream early, since the response has started
+    reply = assistant.astream_message(session_id, transcribed_text, user_id=user_id)
+    sentences = astream_sentences(reply, settings.STREAM_MIN_SENTENCE_CHARS)
+    return StreamingResponse(
+        _speech_stream(sentences, source_lang or "en-IN", target_lang),
+        media_type="audio/wav",
+        headers={
+            "Content-Disposition": f'attachment; filename="response_{target_lang}.wav"'
+        }
+    )
+
+@app.on_event("startup")
+async def resume_ticket_outbox():
+    """Resume sending tickets that were still queued when the process stopped."""
+    ticket_client = get_ticket_client()
+    if len(ticket_client.outbox):
+        ticket_client.start_flusher()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""